@@ -1,3 +1,3 @@
-"""
-XDM Template Modules Package
-"""
+"""
+XDM Template Modules Package
+"""
@@ -1,175 +1,248 @@
-"""Command line interface for data-driven generator"""
-
-import os
-import sys
-import argparse
-import json
-import yaml
-from pathlib import Path
-from typing import Dict, Any, Union
-
-# 获取当前文件所在目录（modules目录）
-current_dir = os.path.dirname(os.path.abspath(__file__))
-# 获取项目根目录（xdm_template目录）
-project_root = os.path.dirname(current_dir)
-# 获取顶级包目录（code目录）
-code_dir = os.path.dirname(project_root)
-
-# 将顶级包目录添加到Python路径
-sys.path.insert(0, code_dir)
-
-from modules.core.data_driven_generator import DataDrivenGenerator, DataDrivenGeneratorConfig
-from modules.core.types import DataHandlerType, TemplateHandlerType
-from modules.core import GeneratorError
-
-def load_config(file_path: str) -> Dict[str, Any]:
-    """加载配置文件并处理路径
-    
-    支持JSON和YAML格式的配置文件，自动处理相对路径
-    
-    Args:
-        file_path: 配置文件路径
-        
-    Returns:
-        Dict[str, Any]: 配置内容
-        
-    Raises:
-        ValueError: 如果文件格式不支持或解析失败
-    """
-    path = Path(file_path).resolve()
-    if not path.exists():
-        raise ValueError(f"Config file not found: {file_path}")
-        
-    try:
-        # 加载配置
-        with open(path, 'r', encoding='utf-8') as f:
-            if path.suffix.lower() == '.json':
-                config = json.load(f)
-            elif path.suffix.lower() in ['.yaml', '.yml']:
-                config = yaml.safe_load(f)
-            else:
-                raise ValueError(f"Unsupported file type: {path.suffix}")
-        
-        # 处理相对路径
-        config_dir = path.parent
-        if 'data_config' in config:
-            if 'root_path' in config['data_config']:
-                root_path = Path(config['data_config']['root_path'])
-                if not root_path.is_absolute():
-                    config['data_config']['root_path'] = str(config_dir / root_path)
-                    
-        if 'template_config' in config:
-            if 'template_dir' in config['template_config']:
-                template_dir = Path(config['template_config']['template_dir'])
-                if not template_dir.is_absolute():
-                    config['template_config']['template_dir'] = str(config_dir / template_dir)
-                    
-        if 'output_dir' in config:
-            output_dir = Path(config['output_dir'])
-            if not output_dir.is_absolute():
-                config['output_dir'] = str(config_dir / output_dir)
-                
-        return config
-        
-    except Exception as e:
-        raise ValueError(f"Failed to parse config file: {str(e)}")
-
-def save_output(output_dir: str, results: Dict[str, str]) -> None:
-    """保存渲染结果到文件
-    
-    Args:
-        output_dir: 输出目录
-        results: 渲染结果字典，键为文件名，值为内容
-    """
-    out_path = Path(output_dir)
-    out_path.mkdir(parents=True, exist_ok=True)
-    
-    for name, content in results.items():
-        file_path = out_path / f"{name}.xml"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        print(f"Generated: {file_path}")
-
-def main():
-    """命令行入口函数"""
-    parser = argparse.ArgumentParser(
-        description="Data-driven generator command line tool",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-配置文件格式示例 (JSON):
-{
-    "data_type": "yaml",
-    "data_config": {
-        "root_path": "path/to/yaml/files",
-        "file_pattern": ["*.yaml"]
-    },
-    "template_type": "jinja",
-    "template_config": {
-        "template_dir": "path/to/templates"
-    },
-    "patterns": ["root.yaml", "**/*.yaml"],
-    "output_dir": "path/to/output"
-}
-
-配置文件格式示例 (YAML):
-data_type: yaml
-data_config:
-    root_path: path/to/yaml/files
-    file_pattern: ["*.yaml"]
-template_type: jinja
-template_config:
-    template_dir: path/to/templates
-patterns: ["root.yaml", "**/*.yaml"]
-output_dir: path/to/output
-""")
-    
-    parser.add_argument(
-        'config',
-        help='配置文件路径 (支持.json或.yaml/.yml)'
-    )
-    
-    args = parser.parse_args()
-    
-    try:
-        # 1. 加载配置
-        config = load_config(args.config)
-        
-        # 2. 验证必要字段
-        required_fields = [
-            'data_type', 'data_config',
-            'template_type', 'template_config',
-            'patterns', 'output_dir'
-        ]
-        missing = [f for f in required_fields if f not in config]
-        if missing:
-            raise ValueError(f"Missing required fields: {', '.join(missing)}")
-        
-        # 3. 创建生成器配置
-        gen_config = DataDrivenGeneratorConfig(
-            data_type=DataHandlerType(config['data_type']),
-            data_config=config['data_config'],
-            template_type=TemplateHandlerType(config['template_type']),
-            template_config=config['template_config']
-        )
-        
-        # 4. 初始化生成器
-        generator = DataDrivenGenerator(gen_config)
-        print("\n==============Serialized File Tree==============")
-        print(generator.data_handler.file_tree.serialize_tree())
-        # 5. 处理每个模式
-        for pattern in config['patterns']:
-            print(f"\nProcessing pattern: {pattern}")
-            results = generator.render(pattern)
-            
-            # 6. 保存结果
-            save_output(config['output_dir'], results)
-            
-    except (ValueError, GeneratorError) as e:
-        print(f"Error: {str(e)}", file=sys.stderr)
-        sys.exit(1)
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}", file=sys.stderr)
-        sys.exit(2)
-
-if __name__ == '__main__':
-    main()
+"""Command line interface for data-driven generator"""
+
+import os
+import sys
+import argparse
+import json
+import yaml
+from pathlib import Path
+from typing import Dict, Any, Union
+
+# 获取当前文件所在目录（modules目录）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+# 获取项目根目录（xdm_template目录）
+project_root = os.path.dirname(current_dir)
+# 获取顶级包目录（code目录）
+code_dir = os.path.dirname(project_root)
+
+# 将顶级包目录添加到Python路径
+sys.path.insert(0, code_dir)
+
+from modules.core.data_driven_generator import DataDrivenGenerator, DataDrivenGeneratorConfig
+from modules.core.handler_factory import HandlerFactory
+from modules.core.types import DataHandlerType, TemplateHandlerType, TemplatePreloadMode
+from modules.core import GeneratorError
+from modules.core.fragment import RenderedFragment
+
+def load_config(file_path: str) -> Dict[str, Any]:
+    """加载配置文件并处理路径
+    
+    支持JSON和YAML格式的配置文件，自动处理相对路径
+    
+    Args:
+        file_path: 配置文件路径
+        
+    Returns:
+        Dict[str, Any]: 配置内容
+        
+    Raises:
+        ValueError: 如果文件格式不支持或解析失败
+    """
+    path = Path(file_path).resolve()
+    if not path.exists():
+        raise ValueError(f"Config file not found: {file_path}")
+        
+    try:
+        # 加载配置
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.suffix.lower() == '.json':
+                config = json.load(f)
+            elif path.suffix.lower() in ['.yaml', '.yml']:
+                config = yaml.safe_load(f)
+            else:
+                raise ValueError(f"Unsupported file type: {path.suffix}")
+        
+        # 处理相对路径
+        config_dir = path.parent
+        if 'data_config' in config:
+            if 'root_path' in config['data_config']:
+                root_path = Path(config['data_config']['root_path'])
+                if not root_path.is_absolute():
+                    config['data_config']['root_path'] = str(config_dir / root_path)
+                    
+        if 'template_config' in config:
+            if 'template_dir' in config['template_config']:
+                template_dir = Path(config['template_config']['template_dir'])
+                if not template_dir.is_absolute():
+                    config['template_config']['template_dir'] = str(config_dir / template_dir)
+            for key in ['bytecode_cache_dir', 'compiled_templates', 'fragment_cache_dir']:
+                if config['template_config'].get(key):
+                    key_path = Path(config['template_config'][key])
+                    if not key_path.is_absolute():
+                        config['template_config'][key] = str(config_dir / key_path)
+                    
+        if 'output_dir' in config:
+            output_dir = Path(config['output_dir'])
+            if not output_dir.is_absolute():
+                config['output_dir'] = str(config_dir / output_dir)
+                
+        return config
+        
+    except Exception as e:
+        raise ValueError(f"Failed to parse config file: {str(e)}")
+
+def save_output(output_dir: str, results: Dict[str, Union[str, RenderedFragment]]) -> None:
+    """保存渲染结果到文件
+    
+    Args:
+        output_dir: 输出目录
+        results: 渲染结果字典，键为文件名，值为内容或渲染片段（片段将流式写出）
+    """
+    out_path = Path(output_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    
+    for name, content in results.items():
+        file_path = out_path / f"{name}.xml"
+        with open(file_path, 'w', encoding='utf-8') as f:
+            if isinstance(content, RenderedFragment):
+                content.write_to(f)
+            else:
+                f.write(content)
+        print(f"Generated: {file_path}")
+
+def compile_templates(config: Dict[str, Any], target: str) -> None:
+    """将模板目录预编译为可导入的模块
+    
+    Args:
+        config: 配置内容, 只使用template_type和template_config
+        target: 输出路径, 以.zip结尾时生成zip文件, 否则生成目录
+        
+    Raises:
+        ValueError: 如果缺少模板配置或模板处理器不支持预编译
+    """
+    missing = [f for f in ['template_type', 'template_config'] if f not in config]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+    
+    handler = HandlerFactory.create_template_handler(
+        TemplateHandlerType(config['template_type']), config['template_config']
+    )
+    compile_func = getattr(handler, 'compile_templates', None)
+    if compile_func is None:
+        raise ValueError(f"Template type {config['template_type']} does not support compilation")
+    
+    report = compile_func(target)
+    for name in report.compiled:
+        print(f"Compiled: {name}")
+    for name in report.skipped:
+        print(f"Skipped (not a template): {name}")
+    print(f"Compiled templates written to: {target}")
+
+def main():
+    """命令行入口函数"""
+    parser = argparse.ArgumentParser(
+        description="Data-driven generator command line tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+配置文件格式示例 (JSON):
+{
+    "data_type": "yaml",
+    "data_config": {
+        "root_path": "path/to/yaml/files",
+        "file_pattern": ["*.yaml"]
+    },
+    "template_type": "jinja",
+    "template_config": {
+        "template_dir": "path/to/templates"
+    },
+    "patterns": ["root.yaml", "**/*.yaml"],
+    "output_dir": "path/to/output"
+}
+
+配置文件格式示例 (YAML):
+data_type: yaml
+data_config:
+    root_path: path/to/yaml/files
+    file_pattern: ["*.yaml"]
+template_type: jinja
+template_config:
+    template_dir: path/to/templates
+    bytecode_cache_dir: path/to/cache  # 可选, 持久化模板字节码缓存
+    compiled_templates: path/to/templates.zip  # 可选, 使用--compile-templates生成的预编译模板
+    template_extensions: [".j2"]  # 可选, --compile-templates编译的模板扩展名
+    cache_size: 400  # 可选, 内存中缓存的模板数量, 0表示不缓存, 负数表示不限制
+    auto_reload: true  # 可选, 命中缓存时是否检查模板源文件是否更新
+    fragment_cache_size: 100  # 可选, {% cache %}块在内存中缓存的片段数量
+    fragment_cache_dir: path/to/fragments  # 可选, {% cache %}块的磁盘缓存目录
+    batch_expressions: false  # 可选, expr_eval对同级节点批量求值
+    lazy_plugins: false  # 可选, 按插件目录中的manifest.yaml延迟导入插件模块
+    function_stats: table  # 可选, 统计插件函数的调用次数与耗时, 在运行汇总中以table或json输出
+patterns: ["root.yaml", "**/*.yaml"]
+output_dir: path/to/output
+splice_output: false  # 可选, 以占位符拼接子节点输出并流式写出
+render_globals: {}  # 可选, 所有模板共享的变量
+dedupe_renders: false  # 可选, 复用输入完全相同的节点的渲染结果
+preload_templates: none  # 可选, 渲染前预加载模板: none/tree/all
+""")
+    
+    parser.add_argument(
+        'config',
+        help='配置文件路径 (支持.json或.yaml/.yml)'
+    )
+    parser.add_argument(
+        '--compile-templates',
+        metavar='TARGET',
+        help='预编译template_dir下的所有模板到TARGET (.zip或目录) 后退出'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        # 1. 加载配置
+        config = load_config(args.config)
+        
+        if args.compile_templates:
+            compile_templates(config, args.compile_templates)
+            return
+        
+        # 2. 验证必要字段
+        required_fields = [
+            'data_type', 'data_config',
+            'template_type', 'template_config',
+            'patterns', 'output_dir'
+        ]
+        missing = [f for f in required_fields if f not in config]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        
+        # 3. 创建生成器配置
+        gen_config = DataDrivenGeneratorConfig(
+            data_type=DataHandlerType(config['data_type']),
+            data_config=config['data_config'],
+            template_type=TemplateHandlerType(config['template_type']),
+            template_config=config['template_config'],
+            splice_output=config.get('splice_output', False),
+            render_globals=config.get('render_globals') or {},
+            dedupe_renders=config.get('dedupe_renders', False),
+            preload_templates=TemplatePreloadMode(config.get('preload_templates', 'none'))
+        )
+        
+        # 4. 初始化生成器
+        generator = DataDrivenGenerator(gen_config)
+        print("\n==============Serialized File Tree==============")
+        print(generator.data_handler.file_tree.serialize_tree())
+        # 5. 一次性处理所有模式, 同一文件只解析一次
+        all_results = generator.render_many(
+            config['patterns'], fragments=gen_config.splice_output
+        )
+        for pattern, results in all_results.items():
+            print(f"\nProcessing pattern: {pattern}")
+            
+            # 6. 保存结果
+            save_output(config['output_dir'], results)
+
+        # 7. 运行汇总
+        cache_info = generator.template_handler.show_cache_info()
+        if cache_info:
+            print("\n==============Run Summary==============")
+            print(cache_info, end="")
+            
+    except (ValueError, GeneratorError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}", file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""pytest根配置
+
+在modules目录下运行pytest时当前目录会被加入sys.path, 其中的yaml包会遮蔽PyYAML,
+因此移除该路径, 统一以modules包的形式导入。
+"""
+
+import sys
+from pathlib import Path
+
+_PACKAGE_DIR = Path(__file__).resolve().parent
+sys.path[:] = [
+    entry for entry in sys.path if Path(entry or ".").resolve() != _PACKAGE_DIR
+]
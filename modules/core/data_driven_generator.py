@@ -1,159 +1,474 @@
-"""Data-driven generator module for Jinja Template"""
-
-from typing import Dict, Any, List, Tuple, Union
-from dataclasses import dataclass
-from . import (
-    GeneratorError,
-    GeneratorErrorType,
-    DataHandler,
-    TemplateHandler,
-    validate_data_context,
-    validate_render_result,
-)
-from .handler_factory import HandlerFactory
-from .types import DataHandlerType, TemplateHandlerType
-from ..node.data_node import DataNode
-from ..jinja.user_func.func_handler import UserFunctionInfo, UserFunctionResolver
-
-
-@dataclass
-class DataDrivenGeneratorConfig:
-    """Configuration for the DataDrivenGenerator"""
-
-    data_type: DataHandlerType
-    data_config: Dict[str, Any]
-    template_type: TemplateHandlerType
-    template_config: Dict[str, Any]
-
-
-class DataDrivenGenerator:
-    """Data-driven generator class
-    This class is responsible for generating data-driven templates based on provided data.
-    """
-
-    def __init__(
-        self,
-        config: DataDrivenGeneratorConfig,
-    ) -> None:
-        """Initialize the generator with configuration
-
-        Args:
-            config: Configuration for data and template handlers
-        """
-        self.data_handler = HandlerFactory.create_data_handler(
-            config.data_type, config.data_config
-        )
-        self.template_handler = HandlerFactory.create_template_handler(
-            config.template_type, config.template_config
-        )
-
-        # 存储渲染结果的映射
-        self._rendered_contents: Dict[DataNode, str] = {}
-
-    def render(self, pattern: str) -> Dict[str, str]:
-        """渲染模板并返回结果
-
-        Args:
-            pattern: 用于查找数据文件的模式，如 "root.yaml"
-
-        Returns:
-            Dict[str, str]: 文件名到渲染结果的映射
-
-        Raises:
-            GeneratorError: 如果数据验证或渲染失败
-        """
-        # 清空之前的渲染结果
-        self._rendered_contents.clear()
-        results = {}
-
-        # 1. 创建数据树
-        trees = self.data_handler.create_data_tree(pattern)
-        if not trees:
-            raise GeneratorError(
-                GeneratorErrorType.DATA_INIT_ERROR,
-                f"No data files found matching pattern: {pattern}",
-            )
-
-        # 2. 对每个树进行后序遍历和渲染
-        for tree in trees:
-            self._process_node(tree)
-            key = f"{tree.name}"
-            results[key] = self._rendered_contents[tree]
-
-        if not results:
-            raise GeneratorError(
-                GeneratorErrorType.RENDER_ERROR, "No templates were rendered"
-            )
-
-        return results
-
-    def _process_node(self, node: DataNode) -> None:
-        """处理单个节点及其子节点
-
-        采用后序遍历（先处理子节点再处理父节点）
-
-        Args:
-            node: 要处理的数据节点
-        """
-        # 1. 先处理所有子节点
-        for child in node.children:
-            if isinstance(child, DataNode):
-                self._process_node(child)
-
-        # 2. 验证数据
-        validate_data_context(node.data, self.data_handler.preserved_template_key)
-
-        # 3. 准备渲染上下文
-        data = node.data
-
-        # 4. 收集子节点渲染结果
-        
-        print(f"Processing node: {node.name} with children{node.children_group_number}: {[child.name for child in node.children]}")        
-        
-        # 给子节点编号?
-        current_children_index = 0
-        for group_index, group_number in enumerate(node.children_group_number):
-            children_content: Union[List[str], str] = []
-            print(f"    Processing group {group_index}: {group_number}")
-            # 从children中取number个子节点
-            for child_index in range(current_children_index, current_children_index + group_number):
-                if child_index < len(node.children):
-                    child = node.children[child_index]
-                    if isinstance(child, DataNode) and child in self._rendered_contents:
-                        children_content.append(self._rendered_contents[child])
-
-            # 5. 添加子节点内容到上下文
-            data[self.template_handler.preserved_children_key + str(group_index)] = "\n".join(
-                children_content
-            )
-            # 更新当前子节点索引
-            current_children_index += group_number
-
-        try:
-            template_path = node.data[self.data_handler.preserved_template_key]
-
-            # 6. 渲染模板
-            result = self.template_handler.render_template(
-                template_path, node, self.data_handler
-            )
-
-            # 7. 验证结果并保存
-            validate_render_result(result, template_path)
-            self._rendered_contents[node] = result
-
-        except Exception as e:
-            raise GeneratorError(
-                GeneratorErrorType.RENDER_ERROR,
-                f"Failed to render {template_path}: {str(e)}",
-            )
-
-    # def _create_node_resolver(self, node: DataNode) -> UserFunctionResolver:
-    #     """为当前节点创建独立的函数解析器
-
-    #     Args:
-    #         node: 当前处理的节点
-    #     Returns:
-    #         UserFunctionResolver: 节点特定的函数解析器
-    #     """
-
-    #     return self.resolver_factory.create_resolver(node, self.data_handler)
+"""Data-driven generator module for Jinja Template"""
+
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+from dataclasses import dataclass, field
+from collections import ChainMap
+import asyncio
+from . import (
+    GeneratorError,
+    GeneratorErrorType,
+    DataHandler,
+    TemplateHandler,
+    validate_data_context,
+    validate_render_result,
+)
+from .handler_factory import HandlerFactory
+from .fragment import FragmentAssembler, RenderedFragment
+from .types import DataHandlerType, TemplateHandlerType, TemplatePreloadMode
+from ..node.data_node import DataNode
+from ..lib import canonical_fingerprint
+from ..jinja.user_func.func_handler import UserFunctionInfo, UserFunctionResolver, BatchScope
+
+
+@dataclass
+class DataDrivenGeneratorConfig:
+    """Configuration for the DataDrivenGenerator"""
+
+    data_type: DataHandlerType
+    data_config: Dict[str, Any]
+    template_type: TemplateHandlerType
+    template_config: Dict[str, Any]
+    splice_output: bool = False  # 使用占位符拼接子节点输出, 避免逐级复制字符串
+    render_globals: Dict[str, Any] = field(default_factory=dict)  # 所有节点共享的渲染变量
+    dedupe_renders: bool = False  # 复用同一次渲染中输入相同的节点的渲染结果
+    preload_templates: TemplatePreloadMode = TemplatePreloadMode.NONE  # 渲染前预加载模板
+
+
+@dataclass
+class _RenderJob:
+    """单个节点的渲染任务（同步与异步渲染共用）"""
+
+    template_path: str
+    context: ChainMap
+    children_groups: List[RenderedFragment]
+    render_key: Tuple[Any, ...]
+    splice: bool = False  # 是否以占位符渲染后拼接子节点片段
+    reusable: bool = False  # 子树的结果是否只取决于子树的内容, 可按子树指纹复用
+
+
+class DataDrivenGenerator:
+    """Data-driven generator class
+    This class is responsible for generating data-driven templates based on provided data.
+    """
+
+    def __init__(
+        self,
+        config: DataDrivenGeneratorConfig,
+    ) -> None:
+        """Initialize the generator with configuration
+
+        Args:
+            config: Configuration for data and template handlers
+        """
+        self.data_handler = HandlerFactory.create_data_handler(
+            config.data_type, config.data_config
+        )
+        self.template_handler = HandlerFactory.create_template_handler(
+            config.template_type, config.template_config
+        )
+
+        self.splice_output = config.splice_output
+        self.render_globals = config.render_globals
+        self.dedupe_renders = config.dedupe_renders
+        self.preload_mode = config.preload_templates
+        self._assembler = FragmentAssembler()
+
+        # 存储渲染结果的映射
+        self._rendered_contents: Dict[DataNode, Union[str, RenderedFragment]] = {}
+
+        # (模板, 模板读取的数据, 子节点输出) 及 ("subtree", 子树指纹) 到渲染结果的映射,
+        # 仅在dedupe_renders时使用
+        self._render_cache: Dict[Tuple[Any, ...], Union[str, RenderedFragment]] = {}
+        # 子树中所有模板的分析都完整（不调用用户函数）的节点, 其结果可按子树指纹复用
+        self._reusable_subtrees: Set[DataNode] = set()
+
+    def render(self, pattern: str) -> Dict[str, str]:
+        """渲染模板并返回结果
+
+        Args:
+            pattern: 用于查找数据文件的模式，如 "root.yaml"
+
+        Returns:
+            Dict[str, str]: 文件名到渲染结果的映射
+
+        Raises:
+            GeneratorError: 如果数据验证或渲染失败
+        """
+        return self.render_many([pattern])[pattern]
+
+    def render_fragments(self, pattern: str) -> Dict[str, RenderedFragment]:
+        """渲染模板并返回未展开的片段, 用于流式写出输出文件
+
+        在splice_output模式下, 子节点文本只在写出时复制一次。
+
+        Args:
+            pattern: 用于查找数据文件的模式，如 "root.yaml"
+
+        Returns:
+            Dict[str, RenderedFragment]: 文件名到渲染片段的映射
+
+        Raises:
+            GeneratorError: 如果数据验证或渲染失败
+        """
+        return self.render_many([pattern], fragments=True)[pattern]
+
+    def render_many(
+        self, patterns: List[str], fragments: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """在一次遍历中渲染多个模式
+
+        每个模式的结果与单独调用render相同; 各模式的树独立构建, 同一文件只解析一次,
+        开启dedupe_renders时不依赖所在树的渲染结果在各模式之间复用。
+
+        Args:
+            patterns: 用于查找数据文件的模式列表
+            fragments: 为True时返回RenderedFragment而不是字符串
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 模式到(文件名到渲染结果的映射)的映射
+
+        Raises:
+            GeneratorError: 如果数据验证或渲染失败
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for pattern, contents in self._render_trees(patterns).items():
+            if fragments:
+                results[pattern] = {
+                    key: value if isinstance(value, RenderedFragment) else RenderedFragment([value])
+                    for key, value in contents.items()
+                }
+            else:
+                results[pattern] = {key: str(value) for key, value in contents.items()}
+        return results
+
+    async def async_render(self, pattern: str) -> Dict[str, str]:
+        """异步渲染模板并返回结果
+
+        使用模板处理器的异步渲染接口, 同一节点的子节点在事件循环中并发渲染,
+        插件中的I/O等待可以相互重叠。
+
+        Args:
+            pattern: 用于查找数据文件的模式，如 "root.yaml"
+
+        Returns:
+            Dict[str, str]: 文件名到渲染结果的映射
+
+        Raises:
+            GeneratorError: 如果数据验证或渲染失败
+        """
+        pattern_trees = self._create_trees([pattern], enable_async=True)
+
+        results: Dict[str, str] = {}
+        # 根节点依次处理, 避免被复用为子树的根节点被并发渲染两次
+        for tree in pattern_trees[pattern]:
+            await self._process_node_async(tree)
+            results[f"{tree.name}"] = str(self._rendered_contents[tree])
+        return results
+
+    def _create_trees(
+        self, patterns: List[str], enable_async: bool = False
+    ) -> Dict[str, List[DataNode]]:
+        """清空渲染状态并为所有模式创建数据树, 按配置预加载模板"""
+        # 清空之前的渲染结果
+        self._rendered_contents.clear()
+        self._render_cache.clear()
+        self._reusable_subtrees.clear()
+
+        pattern_trees = self.data_handler.create_data_trees(patterns)
+        for pattern in patterns:
+            if not pattern_trees.get(pattern):
+                raise GeneratorError(
+                    GeneratorErrorType.DATA_INIT_ERROR,
+                    f"No data files found matching pattern: {pattern}",
+                )
+
+        if self.preload_mode != TemplatePreloadMode.NONE:
+            self._preload_templates(pattern_trees, enable_async)
+
+        # 登记根节点组与整棵树, 供批量用户函数一次计算
+        for pattern in patterns:
+            trees = pattern_trees[pattern]
+            self.template_handler.prepare_batch(trees, self.data_handler, BatchScope.SIBLINGS)
+            for tree in trees:
+                self.template_handler.prepare_batch(
+                    tree.iter_data_nodes(), self.data_handler, BatchScope.TREE
+                )
+        return pattern_trees
+
+    def _prepare_children_batches(self, node: DataNode) -> None:
+        """在渲染子节点前登记每个子节点组, 批量用户函数对一组子节点只调用一次"""
+        start = 0
+        for group_number in node.children_group_number:
+            group = [
+                child
+                for child in node.children[start : start + group_number]
+                if isinstance(child, DataNode)
+            ]
+            start += group_number
+            if group:
+                self.template_handler.prepare_batch(
+                    group, self.data_handler, BatchScope.SIBLINGS
+                )
+
+    def _preload_templates(
+        self, pattern_trees: Dict[str, List[DataNode]], enable_async: bool
+    ) -> None:
+        """在渲染开始前加载模板, 一次性报告所有模板错误
+
+        Args:
+            pattern_trees: 本次渲染的数据树
+            enable_async: 是否预热异步渲染使用的环境
+
+        Raises:
+            GeneratorError: 如果有模板加载或编译失败
+        """
+        template_paths: Optional[List[str]] = None
+        if self.preload_mode == TemplatePreloadMode.TREE:
+            template_key = self.data_handler.preserved_template_key
+            paths: Dict[str, None] = {}  # 保持顺序的去重
+            for trees in pattern_trees.values():
+                for tree in trees:
+                    for node in tree.iter_data_nodes():
+                        if template_key in node.data:
+                            paths[node.data[template_key]] = None
+            template_paths = list(paths)
+
+        report = self.template_handler.preload_templates(template_paths, enable_async)
+        for name, elapsed in report.timings.items():
+            print(f"Preloaded template: {name} ({elapsed * 1000:.1f} ms)")
+
+        if report.errors:
+            details = "; ".join(f"{name}: {error}" for name, error in report.errors.items())
+            raise GeneratorError(
+                GeneratorErrorType.TEMPLATE_INIT_ERROR,
+                f"Failed to preload {len(report.errors)} template(s): {details}",
+            )
+
+    def _render_trees(
+        self, patterns: List[str]
+    ) -> Dict[str, Dict[str, Union[str, RenderedFragment]]]:
+        """创建数据树并渲染, 返回每个模式下根节点的渲染结果"""
+        results: Dict[str, Dict[str, Union[str, RenderedFragment]]] = {}
+
+        # 1. 创建数据树
+        pattern_trees = self._create_trees(patterns)
+
+        # 2. 对每个树进行后序遍历和渲染, 已渲染的节点不会重复渲染
+        for pattern in patterns:
+            results[pattern] = {}
+            for tree in pattern_trees[pattern]:
+                self._process_node(tree)
+                key = f"{tree.name}"
+                results[pattern][key] = self._rendered_contents[tree]
+
+            if not results[pattern]:
+                raise GeneratorError(
+                    GeneratorErrorType.RENDER_ERROR, "No templates were rendered"
+                )
+
+        return results
+
+    def _process_node(self, node: DataNode) -> None:
+        """处理单个节点及其子节点
+
+        采用后序遍历（先处理子节点再处理父节点）
+
+        Args:
+            node: 要处理的数据节点
+        """
+        # 0. 跳过本次渲染中已经处理过的节点
+        if node in self._rendered_contents or self._reuse_subtree(node):
+            return
+
+        # 1. 先处理所有子节点
+        self._prepare_children_batches(node)
+        for child in node.children:
+            if isinstance(child, DataNode):
+                self._process_node(child)
+
+        job = self._prepare_render(node)
+        if job is None:
+            return
+
+        try:
+            # 6. 渲染模板
+            result = self.template_handler.render_template(
+                job.template_path, node, self.data_handler, job.context
+            )
+            self._finish_render(node, job, result)
+        except Exception as e:
+            raise GeneratorError(
+                GeneratorErrorType.RENDER_ERROR,
+                f"Failed to render {job.template_path}: {str(e)}",
+            )
+
+    async def _process_node_async(self, node: DataNode) -> None:
+        """_process_node的异步版本, 子节点并发处理
+
+        Args:
+            node: 要处理的数据节点
+        """
+        if node in self._rendered_contents or self._reuse_subtree(node):
+            return
+
+        self._prepare_children_batches(node)
+        await asyncio.gather(
+            *(
+                self._process_node_async(child)
+                for child in node.children
+                if isinstance(child, DataNode)
+            )
+        )
+
+        job = self._prepare_render(node)
+        if job is None:
+            return
+
+        try:
+            result = await self.template_handler.render_template_async(
+                job.template_path, node, self.data_handler, job.context
+            )
+            self._finish_render(node, job, result)
+        except Exception as e:
+            raise GeneratorError(
+                GeneratorErrorType.RENDER_ERROR,
+                f"Failed to render {job.template_path}: {str(e)}",
+            )
+
+    def _prepare_render(self, node: DataNode) -> Optional["_RenderJob"]:
+        """收集子节点结果并准备节点的渲染上下文
+
+        Args:
+            node: 子节点均已处理完毕的数据节点
+
+        Returns:
+            Optional[_RenderJob]: 渲染任务; 若复用了已有结果则返回None
+        """
+        # 2. 验证数据
+        validate_data_context(node.data, self.data_handler.preserved_template_key)
+        template_path = node.data[self.data_handler.preserved_template_key]
+        # 模板读取的变量与子节点组, 分析不完整时使用全部数据与子节点组
+        analysis = self.template_handler.analyze_template(template_path)
+
+        # 3. 准备渲染上下文: 子节点输出 -> 节点数据 -> 全局变量, 不修改node.data
+        children_context: Dict[str, Any] = {}
+        context = ChainMap(children_context, node.data, self.render_globals)
+
+        # 4. 收集子节点渲染结果
+        
+        print(f"Processing node: {node.name} with children{node.children_group_number}: {[child.name for child in node.children]}")        
+        
+        # 模板对子节点内容使用过滤器、测试等时, 占位符会改变结果, 改为放入子节点文本
+        splice = self.splice_output and analysis.children_plain
+
+        # 给子节点编号?
+        current_children_index = 0
+        children_groups: List[RenderedFragment] = []
+        children_ids: List[Tuple[int, ...]] = []
+        for group_index, group_number in enumerate(node.children_group_number):
+            children_content: List[Union[str, RenderedFragment]] = []
+            print(f"    Processing group {group_index}: {group_number}")
+            if analysis.complete and group_index not in analysis.children_slots:
+                # 模板不使用该子节点组, 不拼接也不放入上下文
+                children_groups.append(RenderedFragment([]))
+                current_children_index += group_number
+                continue
+            # 从children中取number个子节点
+            for child_index in range(current_children_index, current_children_index + group_number):
+                if child_index < len(node.children):
+                    child = node.children[child_index]
+                    if isinstance(child, DataNode) and child in self._rendered_contents:
+                        children_content.append(self._rendered_contents[child])
+            children_ids.append(tuple(id(content) for content in children_content))
+
+            # 5. 添加子节点内容到上下文
+            key = self.template_handler.preserved_children_key + str(group_index)
+            if splice:
+                # 只放入占位符, 渲染后再拼接子节点片段
+                children_context[key] = self._assembler.placeholder(group_index)
+                children_groups.append(self._assembler.join(children_content))
+            else:
+                children_context[key] = "\n".join(str(content) for content in children_content)
+            # 更新当前子节点索引
+            current_children_index += group_number
+
+        # 子节点结果在本次渲染中保持存活并被复用, 以对象标识比较即可
+        render_key: Tuple[Any, ...] = ()
+        reusable = False
+        if self.dedupe_renders:
+            if analysis.complete:
+                # 只对模板读取的键计算指纹, 忽略模板不使用的大块数据
+                used_data = {
+                    key: node.data[key] for key in analysis.variables if key in node.data
+                }
+                data_key: Tuple[str, Any] = ("data", canonical_fingerprint(used_data))
+            else:
+                # 经由不同父节点到达的同一文件共享数据对象
+                data_key = ("id", id(node.data))
+            render_key = (template_path, data_key, tuple(children_ids))
+            # 分析完整的模板只读取节点数据与子节点输出, 子树指纹相同时结果相同
+            reusable = analysis.complete and all(
+                child in self._reusable_subtrees
+                for child in node.children
+                if isinstance(child, DataNode)
+            )
+            cached = self._render_cache.get(render_key)
+            if cached is not None:
+                self._rendered_contents[node] = cached
+                if reusable:
+                    self._remember_subtree(node)
+                return None
+
+        return _RenderJob(
+            template_path, context, children_groups, render_key, splice, reusable
+        )
+
+    def _finish_render(self, node: DataNode, job: "_RenderJob", result: str) -> None:
+        """验证渲染结果并保存"""
+        # 7. 验证结果并保存
+        validate_render_result(result, job.template_path)
+        if job.splice:
+            self._rendered_contents[node] = self._assembler.splice(
+                result, job.children_groups
+            )
+        else:
+            self._rendered_contents[node] = result
+        # 读取了父节点、同级节点或整棵树的渲染结果只属于这个位置, 不放入缓存
+        if self.dedupe_renders and not self.template_handler.depends_on_tree(node):
+            self._render_cache[job.render_key] = self._rendered_contents[node]
+            if job.reusable:
+                self._remember_subtree(node)
+
+    def _reuse_subtree(self, node: DataNode) -> bool:
+        """子树指纹与已渲染的可复用子树相同时复用其结果, 不再处理子节点
+
+        只有子树中所有模板的分析都完整时才按指纹记录结果; 调用用户函数的模板
+        可能读取父节点或整棵树, 仍按逐节点的键复用。
+
+        Returns:
+            bool: 是否复用了已有结果
+        """
+        if not self.dedupe_renders or node.fingerprint is None:
+            return False
+        cached = self._render_cache.get(("subtree", node.fingerprint))
+        if cached is None:
+            return False
+        self._rendered_contents[node] = cached
+        self._reusable_subtrees.add(node)
+        return True
+
+    def _remember_subtree(self, node: DataNode) -> None:
+        self._reusable_subtrees.add(node)
+        if node.fingerprint is not None:
+            self._render_cache[("subtree", node.fingerprint)] = self._rendered_contents[node]
+
+    # def _create_node_resolver(self, node: DataNode) -> UserFunctionResolver:
+    #     """为当前节点创建独立的函数解析器
+
+    #     Args:
+    #         node: 当前处理的节点
+    #     Returns:
+    #         UserFunctionResolver: 节点特定的函数解析器
+    #     """
+
+    #     return self.resolver_factory.create_resolver(node, self.data_handler)
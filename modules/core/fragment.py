@@ -0,0 +1,90 @@
+"""Rendered fragment (rope) support for the data driven generator
+
+父节点渲染时只嵌入占位符, 子节点的渲染结果以引用的方式拼接,
+最终文档在输出时一次性流式写出, 避免子节点文本在每一级祖先中被重复拷贝。
+"""
+
+import re
+import secrets
+from typing import Iterator, List, TextIO, Union
+
+FragmentPart = Union[str, "RenderedFragment"]
+
+
+class RenderedFragment:
+    """渲染片段
+
+    由字符串和子片段组成的树(rope), 子片段以引用的方式共享, 不复制文本。
+    """
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: List[FragmentPart]) -> None:
+        self.parts = parts
+
+    def iter_chunks(self) -> Iterator[str]:
+        """按文档顺序迭代所有字符串块（非递归, 不受树深度限制）"""
+        stack: List[Iterator[FragmentPart]] = [iter(self.parts)]
+        while stack:
+            for part in stack[-1]:
+                if isinstance(part, RenderedFragment):
+                    stack.append(iter(part.parts))
+                    break
+                if part:
+                    yield part
+            else:
+                stack.pop()
+
+    def write_to(self, stream: TextIO) -> None:
+        """将片段流式写入文件对象"""
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+
+    def __str__(self) -> str:
+        return "".join(self.iter_chunks())
+
+
+class FragmentAssembler:
+    """占位符生成与拼接
+
+    每个实例使用随机的nonce生成占位符, 避免与数据中的文本冲突。
+    对子节点内容使用过滤器（如indent）的模板不能使用占位符, 生成器根据模板分析
+    (TemplateAnalysis.children_plain) 对这类模板改为直接放入子节点文本。
+    """
+
+    def __init__(self) -> None:
+        nonce = secrets.token_hex(8)
+        self._prefix = f"\x00{nonce}:"
+        self._pattern = re.compile(re.escape(self._prefix) + r"(\d+)\x00")
+
+    def placeholder(self, group_index: int) -> str:
+        """返回子节点组的占位符"""
+        return f"{self._prefix}{group_index}\x00"
+
+    @staticmethod
+    def join(children: List[FragmentPart], separator: str = "\n") -> RenderedFragment:
+        """以分隔符连接一组子节点片段（与str.join语义一致）"""
+        parts: List[FragmentPart] = []
+        for index, child in enumerate(children):
+            if index:
+                parts.append(separator)
+            parts.append(child)
+        return RenderedFragment(parts)
+
+    def splice(self, rendered: str, groups: List[RenderedFragment]) -> RenderedFragment:
+        """将渲染结果中的占位符替换为对应子节点组的片段引用
+
+        Args:
+            rendered: 使用占位符渲染得到的字符串
+            groups: 子节点组片段, 下标与占位符编号对应
+
+        Returns:
+            RenderedFragment: 拼接后的片段
+        """
+        pieces = self._pattern.split(rendered)
+        parts: List[FragmentPart] = [pieces[0]]
+        # re.split返回 [文本, 组号, 文本, 组号, ..., 文本]
+        for index in range(1, len(pieces), 2):
+            parts.append(groups[int(pieces[index])])
+            parts.append(pieces[index + 1])
+        return RenderedFragment(parts)
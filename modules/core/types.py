@@ -1,11 +1,49 @@
-"""Core type definitions for the data driven generator"""
-
-from enum import Enum
-
-class DataHandlerType(Enum):
-    """Enum for data handler types"""
-    YAML_HANDLER = "yaml"  # 简化值以匹配配置文件
-
-class TemplateHandlerType(Enum):
-    """Enum for template handler types"""
-    JINJA_HANDLER = "jinja"  # 简化值以匹配配置文件
+"""Core type definitions for the data driven generator"""
+
+from enum import Enum
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Tuple
+
+class DataHandlerType(Enum):
+    """Enum for data handler types"""
+    YAML_HANDLER = "yaml"  # 简化值以匹配配置文件
+
+class TemplateHandlerType(Enum):
+    """Enum for template handler types"""
+    JINJA_HANDLER = "jinja"  # 简化值以匹配配置文件
+
+class TemplatePreloadMode(Enum):
+    """Enum for template preload modes"""
+    NONE = "none"  # 不预加载, 模板在首次使用时加载
+    TREE = "tree"  # 预加载数据树中引用的模板
+    ALL = "all"  # 预加载模板目录中的所有模板
+
+@dataclass
+class TemplatePreloadReport:
+    """模板预加载结果"""
+    timings: Dict[str, float] = field(default_factory=dict)  # 模板名到加载耗时(秒)
+    errors: Dict[str, str] = field(default_factory=dict)  # 模板名到错误信息
+
+
+@dataclass
+class TemplateCompileReport:
+    """模板预编译结果"""
+    compiled: List[str] = field(default_factory=list)  # 已编译的模板名
+    skipped: List[str] = field(default_factory=list)  # 扩展名不是模板的文件, 未编译
+
+
+@dataclass(frozen=True)
+class TemplateAnalysis:
+    """模板静态分析结果
+
+    变量与子节点组包含通过include/import/extends间接引用的模板。
+    complete为False时（动态引用的模板、读取整个渲染上下文的过滤器等）
+    分析结果不能用于裁剪上下文或构建缓存键。
+    """
+    template_path: str
+    variables: FrozenSet[str] = frozenset()  # 模板读取的顶层变量
+    children_slots: FrozenSet[int] = frozenset()  # 模板使用的子节点组编号
+    referenced_templates: Tuple[str, ...] = ()  # 直接或间接引用的模板
+    complete: bool = False  # 分析结果是否覆盖模板的全部输入
+    # 子节点组变量是否只以{{ CHILDREN_CONTEXTn }}形式直接输出（可以用占位符拼接）
+    children_plain: bool = False
@@ -1,31 +1,128 @@
-from typing import Dict, Any, Callable, Protocol, List, Optional, Tuple
-from dataclasses import dataclass
-from ..node.expr_node import ExprASTParser, ExprPrintVistor
-from .user_func.func_handler import UserFunctionResolver
-
-
-def expr_filter_factory(resolver: UserFunctionResolver) -> Callable:
-    """ Expr Filter Factory for jinja2 filter register.
-    Args:
-        user_function_resolver: Dict[str, Callable] 
-            Resolver dict for calling the user function in FunctionNode
-    Return: Callable
-        
-    """
-    def expr_filter(*args: Tuple[Any, ...], **kwargs: Dict) -> str:
-        """
-        Jinja filter to process expressions.
-
-        Args:
-            *args: Positional arguments for the filter.
-            **kwargs: Keyword arguments for the filter.
-
-        Returns:
-            str: Processed expression as a string.
-        """
-
-        parser = ExprASTParser()
-        node = parser.parse(args[0])
-        return node.accept(ExprPrintVistor(resolver))
-
-    return expr_filter
+from typing import Dict, Any, Callable, Protocol, List, Optional, Tuple
+from contextvars import ContextVar
+from dataclasses import dataclass
+from jinja2 import pass_context
+from jinja2.runtime import Context
+from ..node.expr_compiler import ExprCompiler, CompiledExpression
+from ..node.expr_batch import MISSING
+from .user_func.func_handler import (
+    UserFunctionResolver,
+    UserFunctionError,
+    UserFunctionErrorType,
+)
+
+# 渲染上下文中保存当前节点函数解析器的键名
+RESOLVER_CONTEXT_KEY = "__expr_resolver__"
+
+# 当前正在渲染的节点的函数解析器, 在每次节点渲染期间设置;
+# 不带上下文导入的宏（{% import ... %}）看不到渲染上下文, 从这里取得解析器
+current_resolver: ContextVar[Optional[UserFunctionResolver]] = ContextVar(
+    "current_resolver", default=None
+)
+
+# 环境未提供表达式编译器时使用的默认编译器, 同一表达式只解析和编译一次
+expr_compiler = ExprCompiler()
+
+
+def _context_resolver(context: Context) -> UserFunctionResolver:
+    """从渲染上下文中取得当前节点的函数解析器, 上下文中没有时使用current_resolver"""
+    resolver = context.get(RESOLVER_CONTEXT_KEY) or current_resolver.get()
+    if resolver is None:
+        raise UserFunctionError(
+            UserFunctionErrorType.RESOLVER_INIT_ERROR,
+            message="expr_filter used outside of a node render context",
+        )
+    return resolver
+
+
+def _context_compiler(context: Context) -> ExprCompiler:
+    """取得环境的表达式编译器（JinjaTemplateHandler设置, 可折叠纯静态函数）"""
+    return getattr(context.environment, "expr_compiler", None) or expr_compiler
+
+
+def _batched_value(
+    context: Context, compiled: CompiledExpression, resolver: UserFunctionResolver
+) -> Any:
+    """环境启用了批量求值时, 取得当前节点与其同级节点一起求值的结果"""
+    batch = getattr(context.environment, "expr_batch", None)
+    if batch is None:
+        return MISSING
+    return batch.lookup(compiled, resolver.node)
+
+
+@pass_context
+def expr_filter(context: Context, expr: Any) -> Any:
+    """上下文感知的expr_filter, 在环境中只注册一次
+
+    函数解析器从渲染上下文的RESOLVER_CONTEXT_KEY中获取, 因此同一个过滤器
+    可以被并发渲染的多个节点共享, 无需在每次渲染时替换过滤器。
+
+    Args:
+        context: Jinja渲染上下文
+        expr: 表达式字典
+
+    Returns:
+        Any: 表达式的处理结果
+    """
+    return _context_compiler(context).compile(expr)(_context_resolver(context))
+
+
+@pass_context
+async def async_expr_filter(context: Context, expr: Any) -> Any:
+    """异步环境中使用的expr_filter, 支持async用户函数
+
+    Args:
+        context: Jinja渲染上下文
+        expr: 表达式字典
+
+    Returns:
+        Any: 表达式的处理结果
+    """
+    resolver = _context_resolver(context)
+    return await _context_compiler(context).compile(expr).evaluate_async(resolver)
+
+
+@pass_context
+def expr_eval(context: Context, expr: Any) -> Any:
+    """按ExpressionOperator语义计算表达式的值
+
+    与expr_filter返回表达式的字符串形式不同, 操作符会被实际计算,
+    &&与||短路, 右侧的函数调用只在需要时执行; XPath读取当前节点的数据。
+    启用batch_expressions时, 只由数据与运算组成的表达式对同级节点批量求值。
+
+    Args:
+        context: Jinja渲染上下文
+        expr: 表达式字典
+
+    Returns:
+        Any: 表达式的值
+    """
+    resolver = _context_resolver(context)
+    compiled = _context_compiler(context).compile(expr)
+    if compiled.reads_outside_node:
+        resolver.mark_tree_dependent()
+    value = _batched_value(context, compiled, resolver)
+    if value is not MISSING:
+        return value
+    return compiled.evaluate_value(resolver)
+
+
+@pass_context
+async def async_expr_eval(context: Context, expr: Any) -> Any:
+    """异步环境中使用的expr_eval, 支持async用户函数
+
+    Args:
+        context: Jinja渲染上下文
+        expr: 表达式字典
+
+    Returns:
+        Any: 表达式的值
+    """
+    resolver = _context_resolver(context)
+    compiled = _context_compiler(context).compile(expr)
+    if compiled.reads_outside_node:
+        resolver.mark_tree_dependent()
+    value = _batched_value(context, compiled, resolver)
+    if value is not MISSING:
+        return value
+    return await compiled.evaluate_value_async(resolver)
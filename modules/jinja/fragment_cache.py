@@ -0,0 +1,232 @@
+"""Jinja片段缓存扩展
+
+提供 {% cache key %}...{% endcache %} 块, 以显式的键和块的版本号缓存渲染结果:
+
+    {% cache "lookup-table", table_name %}
+        ...昂贵的渲染...
+    {% endcache %}
+
+块的版本号由模板名和块内容的语法树计算, 并在渲染时加入块中包含或导入的
+模板（递归）的源码校验和, 修改块内容或其引用的模板、宏后旧的缓存自动失效。
+键只需描述块读取的数据; 块内不应使用CHILDREN_CONTEXT等逐节点变化的内容。
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from jinja2 import TemplateNotFound, TemplateSyntaxError, meta, nodes
+from jinja2.ext import Extension
+from jinja2.parser import Parser
+from jinja2.utils import LRUCache
+
+from modules.lib import canonical_fingerprint
+
+
+@dataclass
+class FragmentCacheStats:
+    """片段缓存统计"""
+
+    hits: int = 0  # 内存缓存命中次数
+    disk_hits: int = 0  # 内存未命中但磁盘缓存命中的次数
+    misses: int = 0  # 需要渲染块内容的次数
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.disk_hits + self.misses
+
+    def __str__(self) -> str:
+        rate = (self.hits + self.disk_hits) / self.lookups if self.lookups else 0.0
+        return (
+            f"fragment cache: {self.hits} hits, {self.disk_hits} disk hits, "
+            f"{self.misses} misses ({rate:.1%} hit rate)"
+        )
+
+
+class FragmentCache:
+    """片段存储: 进程内LRU缓存, 可选的磁盘缓存目录"""
+
+    def __init__(self, size: int, directory: Optional[Path] = None) -> None:
+        """
+        Args:
+            size: 内存中缓存的片段数量, 0表示不使用内存缓存
+            directory: 磁盘缓存目录, 为None时不使用
+        """
+        self._memory: Optional[LRUCache] = LRUCache(size) if size > 0 else None
+        self.directory = directory
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+        self.stats = FragmentCacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self._memory is not None or self.directory is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """查找片段, 磁盘命中的片段会放入内存缓存"""
+        if self._memory is not None:
+            value = self._memory.get(key)
+            if value is not None:
+                self.stats.hits += 1
+                return value
+        if self.directory is not None:
+            try:
+                value = self._path(key).read_text(encoding="utf-8")
+            except OSError:
+                pass
+            else:
+                self.stats.disk_hits += 1
+                if self._memory is not None:
+                    self._memory[key] = value
+                return value
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """保存片段, 磁盘文件先写入临时文件再替换, 避免并发读到不完整内容"""
+        if self._memory is not None:
+            self._memory[key] = value
+        if self.directory is not None:
+            path = self._path(key)
+            temp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            temp.write_text(value, encoding="utf-8")
+            os.replace(temp, path)
+
+    def _path(self, key: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}.fragment"
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key[, key...] %}...{% endcache %} 片段缓存块
+
+    使用的存储通过environment.fragment_cache提供, 为None或未启用时
+    块内容每次都会渲染。同步与异步环境共用同一个存储。
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment: Any) -> None:
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+        # 模板名到(源码校验和, 引用的模板, uptodate)的缓存
+        self._sources: Dict[str, Tuple[str, Tuple[Optional[str], ...], Any]] = {}
+
+    def parse(self, parser: Parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+
+        # 一个或多个键表达式, 组合为元组
+        keys: List[nodes.Expr] = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            keys.append(parser.parse_expression())
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        # 语法树的repr包含块中的全部节点, 内容变化时版本号随之变化
+        version = hashlib.blake2b(
+            f"{parser.name}\n{body!r}".encode("utf-8"), digest_size=8
+        ).hexdigest()
+
+        # 块中引用的模板, 其源码可能在本模板编译后才修改, 校验和在渲染时计算;
+        # 无法静态确定的引用记为None
+        referenced = tuple(
+            sorted(
+                set(meta.find_referenced_templates(nodes.Template(body))),
+                key=lambda name: (name is None, name or ""),
+            )
+        )
+
+        args = [
+            nodes.Tuple(keys, "load"),
+            nodes.Const(version),
+            nodes.Const(referenced),
+        ]
+        return nodes.CallBlock(
+            self.call_method("_cache_support", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(
+        self,
+        key: Any,
+        version: str,
+        referenced: Tuple[Optional[str], ...],
+        caller: Callable,
+    ) -> Any:
+        """查找或渲染片段; 异步环境中caller返回协程, 因此返回协程交由模板等待"""
+        store: Optional[FragmentCache] = self.environment.fragment_cache  # type: ignore
+        if store is None or not store.enabled:
+            return caller()
+
+        if referenced:
+            version = f"{version}-{self._referenced_checksum(referenced)}"
+        cache_key = f"{version}-{canonical_fingerprint(key)}"
+        if self.environment.is_async:
+            return self._cache_support_async(store, cache_key, caller)
+
+        value = store.get(cache_key)
+        if value is None:
+            value = caller()
+            store.set(cache_key, value)
+        return value
+
+    def _referenced_checksum(self, names: Tuple[Optional[str], ...]) -> str:
+        """计算块引用的模板及其递归引用的模板的源码校验和
+
+        动态引用的模板无法静态确定, 此时计入加载器能列举的全部模板。
+        """
+        checksums: Dict[str, str] = {}
+        pending: List[Optional[str]] = list(names)
+        while pending:
+            name = pending.pop()
+            if name is None:
+                try:
+                    pending.extend(self.environment.list_templates())
+                except TypeError:
+                    pass
+                continue
+            if name in checksums:
+                continue
+            checksums[name], referenced = self._source_info(name)
+            pending.extend(referenced)
+
+        digest = hashlib.blake2b(digest_size=8)
+        for name, checksum in sorted(checksums.items()):
+            digest.update(f"{name}\0{checksum}\0".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _source_info(self, name: str) -> Tuple[str, Tuple[Optional[str], ...]]:
+        """取得模板源码的校验和及其引用的模板, 源文件未更新时使用缓存"""
+        cached = self._sources.get(name)
+        if cached is not None and (cached[2] is None or cached[2]()):
+            return cached[0], cached[1]
+
+        loader = self.environment.loader
+        try:
+            if loader is None:
+                raise TemplateNotFound(name)
+            source, _, uptodate = loader.get_source(self.environment, name)
+        except (TemplateNotFound, RuntimeError):
+            # 模板不存在（ignore missing）或加载器不提供源码（如ModuleLoader）
+            return "", ()
+
+        checksum = hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+        try:
+            referenced = tuple(
+                meta.find_referenced_templates(self.environment.parse(source, name))
+            )
+        except TemplateSyntaxError:
+            # 语法错误在渲染引用的模板时报告
+            referenced = ()
+        self._sources[name] = (checksum, referenced, uptodate)
+        return checksum, referenced
+
+    @staticmethod
+    async def _cache_support_async(
+        store: FragmentCache, cache_key: str, caller: Callable
+    ) -> str:
+        value = store.get(cache_key)
+        if value is None:
+            value = await caller()
+            store.set(cache_key, value)
+        return value
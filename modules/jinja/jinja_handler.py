@@ -1,143 +1,667 @@
-from jinja2 import (
-    Environment,
-    FileSystemLoader,
-    Template,
-    pass_context,
-    StrictUndefined,
-)
-from typing import Dict, Any, Callable, Optional
-from dataclasses import dataclass
-from pathlib import Path
-
-from .expr_filter import expr_filter_factory
-from modules.node.data_node import DataNode
-from modules.core import DataHandler
-
-
-@dataclass
-class JinjaConfig:
-    """Jinja模板配置"""
-
-    template_dir: Path  # 模板目录路径
-    encoding: str  # 文件编码
-    autoescape: bool  # XML转义开关
-    preserved_children_key: str  # 子节点内容的占位符
-
-    @classmethod
-    def validate(cls, config: Dict[str, Any]) -> "JinjaConfig":
-        """验证配置并返回配置对象
-
-        Args:
-            config: 配置字典，必须包含template_dir
-
-        Returns:
-            JinjaConfig: 配置对象
-
-        Raises:
-            ValueError: 如果配置无效
-        """
-        if "template_dir" not in config:
-            raise ValueError("Missing required field 'template_dir'")
-
-        template_dir = Path(config["template_dir"])
-        if not template_dir.exists():
-            raise ValueError(f"template_dir {template_dir} does not exist")
-
-        return cls(
-            template_dir=template_dir,
-            encoding=config.get("encoding", "utf-8"),
-            autoescape=config.get("autoescape", False),
-            preserved_children_key=config.get(
-                "preserved_children_key", "CHILDREN_CONTEXT"
-            ),
-        )
-
-
-class JinjaTemplateHandler:
-    """Jinja模板处理器"""
-
-    def __init__(self, config: Dict[str, Any]) -> None:
-        """初始化Jinja环境
-
-        Args:
-            config: 配置字典，必须包含template_dir
-
-        Raises:
-            ValueError: 如果配置无效
-        """
-        self.config = JinjaConfig.validate(config)
-
-        # 创建Jinja环境
-        self.env = Environment(
-            loader=FileSystemLoader(
-                str(self.config.template_dir), encoding=self.config.encoding
-            ),
-            autoescape=self.config.autoescape,
-            trim_blocks=True,  # 移除块级标签后的第一个换行
-            lstrip_blocks=True,  # 移除块级标签前的空白
-            keep_trailing_newline=True,  # 保留文件末尾的换行
-            undefined=StrictUndefined,  # 严格模式，未定义变量会抛出错误
-        )
-        from ..jinja.user_func.resolver import UserFunctionResolverFactory
-
-        self.resolver_factory = UserFunctionResolverFactory()
-
-        print(self.resolver_factory.show_function_info())
-        # self.register_filter("expr_filter", expr_filter_factory("Expr Filter: "))  # 注册默认过滤器
-
-    @property
-    def preserved_children_key(self) -> str:
-        return self.config.preserved_children_key
-
-    def register_filter(self, name: str, func: Callable) -> None:
-        """注册自定义过滤器
-
-        Args:
-            name: 过滤器名称
-            func: 过滤器函数
-        """
-        self.env.filters[name] = func
-
-    def render_template(
-        self, template_path: str, node: DataNode, data_handler: DataHandler
-    ) -> str:
-        """渲染模板
-
-        Args:
-            template_path: 模板文件路径（相对于template_dir）
-            data: 渲染上下文数据
-            resolver: 可选的解析器字典，用于注册额外的过滤器
-
-        Returns:
-            str: 渲染结果
-
-        Raises:
-            jinja2.TemplateNotFound: 如果模板不存在
-            jinja2.TemplateError: 如果渲染过程出错
-        """
-        node_resolver = self.resolver_factory.create_resolver(node, data_handler)
-
-        filters = {"expr_filter": expr_filter_factory(node_resolver)}
-
-        data = node.data  # 获取节点数据
-
-        if filters:
-            # 保存当前的过滤器字典（浅拷贝）
-            original_filters = self.env.filters.copy()
-            try:
-                # 注册新的过滤器
-                for key, value in filters.items():
-                    self.register_filter(key, value)
-                template = self.env.get_template(template_path)
-                return template.render(data)
-            finally:
-                # 无论是否发生异常，都恢复原始过滤器
-                self.env.filters = original_filters
-        else:
-            template = self.env.get_template(template_path)
-            return template.render(data)
-        # if resolver:
-        #     for key, value in resolver.items():
-        #         self.register_filter(key, value)
-        # template = self.env.get_template(template_path)
-        # return template.render(data)
+from jinja2 import (
+    BaseLoader,
+    Environment,
+    FileSystemLoader,
+    ModuleLoader,
+    Template,
+    pass_context,
+    StrictUndefined,
+    meta,
+    nodes,
+)
+from typing import Dict, Any, Callable, Iterable, Optional, Mapping, List, Set, Tuple
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .expr_filter import (
+    expr_filter,
+    async_expr_filter,
+    expr_eval,
+    async_expr_eval,
+    RESOLVER_CONTEXT_KEY,
+    current_resolver,
+)
+from .template_cache import CountingBytecodeCache, CountingLRUCache
+from .fragment_cache import FragmentCache, FragmentCacheExtension
+from modules.node.expr_compiler import ExprCompiler
+from modules.node.expr_batch import ExprBatchCache
+from modules.node.data_node import DataNode
+from modules.jinja.user_func.func_handler import BatchScope
+from modules.core import DataHandler
+from modules.core.types import TemplatePreloadReport, TemplateCompileReport, TemplateAnalysis
+
+
+@dataclass
+class JinjaConfig:
+    """Jinja模板配置"""
+
+    template_dir: Path  # 模板目录路径
+    encoding: str  # 文件编码
+    autoescape: bool  # XML转义开关
+    preserved_children_key: str  # 子节点内容的占位符
+    bytecode_cache_dir: Optional[Path] = None  # 持久化字节码缓存目录, 为空时不使用
+    compiled_templates: Optional[Path] = None  # 预编译模板(zip或目录), 设置后通过ModuleLoader加载
+    template_extensions: Tuple[str, ...] = (".j2", ".jinja", ".jinja2")  # 预编译的模板文件扩展名
+    cache_size: int = 400  # 内存中缓存的模板数量, 0表示不缓存, 负数表示不限制
+    auto_reload: bool = True  # 命中缓存时是否检查模板源文件是否更新
+    fragment_cache_size: int = 100  # {% cache %}块在内存中缓存的片段数量, 0表示不使用
+    fragment_cache_dir: Optional[Path] = None  # {% cache %}块的磁盘缓存目录, 为空时不使用
+    batch_expressions: bool = False  # expr_eval对同级节点批量求值（可使用NumPy）
+    lazy_plugins: bool = False  # 按插件清单延迟导入插件模块
+    function_stats: Optional[str] = None  # 统计插件函数调用并在运行汇总中输出: table或json
+
+    @classmethod
+    def validate(cls, config: Dict[str, Any]) -> "JinjaConfig":
+        """验证配置并返回配置对象
+
+        Args:
+            config: 配置字典，必须包含template_dir
+
+        Returns:
+            JinjaConfig: 配置对象
+
+        Raises:
+            ValueError: 如果配置无效
+        """
+        if "template_dir" not in config:
+            raise ValueError("Missing required field 'template_dir'")
+
+        template_dir = Path(config["template_dir"])
+        compiled_templates = (
+            Path(config["compiled_templates"])
+            if config.get("compiled_templates")
+            else None
+        )
+        if compiled_templates is not None:
+            # 使用预编译模板时可以不提供模板源码
+            if not compiled_templates.exists():
+                raise ValueError(
+                    f"compiled_templates {compiled_templates} does not exist"
+                )
+        elif not template_dir.exists():
+            raise ValueError(f"template_dir {template_dir} does not exist")
+
+        function_stats = config.get("function_stats") or None
+        if function_stats not in (None, "table", "json"):
+            raise ValueError(
+                f"function_stats must be 'table' or 'json', got {function_stats!r}"
+            )
+
+        cache_size = config.get("cache_size", 400)
+        if not isinstance(cache_size, int) or isinstance(cache_size, bool):
+            raise ValueError(f"cache_size must be an integer, got {cache_size!r}")
+
+        return cls(
+            template_dir=template_dir,
+            encoding=config.get("encoding", "utf-8"),
+            autoescape=config.get("autoescape", False),
+            preserved_children_key=config.get(
+                "preserved_children_key", "CHILDREN_CONTEXT"
+            ),
+            bytecode_cache_dir=(
+                Path(config["bytecode_cache_dir"])
+                if config.get("bytecode_cache_dir")
+                else None
+            ),
+            compiled_templates=compiled_templates,
+            template_extensions=tuple(
+                config.get("template_extensions", cls.template_extensions)
+            ),
+            cache_size=cache_size,
+            auto_reload=bool(config.get("auto_reload", True)),
+            fragment_cache_size=int(config.get("fragment_cache_size", 100)),
+            fragment_cache_dir=(
+                Path(config["fragment_cache_dir"])
+                if config.get("fragment_cache_dir")
+                else None
+            ),
+            batch_expressions=bool(config.get("batch_expressions", False)),
+            lazy_plugins=bool(config.get("lazy_plugins", False)),
+            function_stats=function_stats,
+        )
+
+
+class JinjaTemplateHandler:
+    """Jinja模板处理器"""
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """初始化Jinja环境
+
+        Args:
+            config: 配置字典，必须包含template_dir
+
+        Raises:
+            ValueError: 如果配置无效
+        """
+        self.config = JinjaConfig.validate(config)
+
+        # 字节码缓存, 同步与异步环境编译出的代码不同, 分别存放
+        self.bytecode_cache: Optional[CountingBytecodeCache] = None
+        self._async_bytecode_cache: Optional[CountingBytecodeCache] = None
+        if self.config.bytecode_cache_dir is not None:
+            self.bytecode_cache = self._create_bytecode_cache(self.config.bytecode_cache_dir)
+
+        # {% cache %}块使用的片段存储, 同步与异步环境共用
+        self.fragment_cache = FragmentCache(
+            self.config.fragment_cache_size, self.config.fragment_cache_dir
+        )
+
+        from ..jinja.user_func.resolver import UserFunctionResolverFactory
+        from ..jinja.user_func.func_handler import FunctionProfiler
+
+        self.resolver_factory = UserFunctionResolverFactory(
+            lazy=self.config.lazy_plugins,
+            profiler=FunctionProfiler() if self.config.function_stats else None,
+        )
+
+        print(self.resolver_factory.show_function_info())
+        # expr_filter使用的表达式编译器, 纯静态函数的常量调用在编译时折叠
+        # (延迟加载的插件在编译时尚未导入, 其函数不折叠)
+        self.expr_compiler = ExprCompiler(
+            pure_functions={
+                name: info
+                for name, info in self.resolver_factory.static_functions.items()
+                if info.pure
+            }
+        )
+
+        # expr_eval的同级节点批量求值结果
+        self.expr_batch: Optional[ExprBatchCache] = (
+            ExprBatchCache() if self.config.batch_expressions else None
+        )
+
+        # 通过register_filter注册的自定义过滤器, 之后创建的环境同样安装
+        self._custom_filters: Dict[str, Callable] = {}
+
+        # 创建Jinja环境
+        self.env = self._create_environment()
+        # 异步渲染使用的环境, 首次异步渲染时创建
+        self._async_env: Optional[Environment] = None
+        # 模板名到静态分析结果的缓存
+        # 模板名到(分析结果, 模板及其引用的模板的uptodate检查)
+        self._analysis_cache: Dict[
+            str, Tuple[TemplateAnalysis, Tuple[Callable[[], bool], ...]]
+        ] = {}
+
+    def _create_environment(
+        self, enable_async: bool = False, from_source: bool = False
+    ) -> Environment:
+        """按配置创建Jinja环境
+
+        配置了compiled_templates时, 同步环境通过ModuleLoader加载预编译模板,
+        不再检查文件修改时间也不解析源码; 预编译代码只适用于同步环境,
+        异步环境仍从template_dir加载源码。
+
+        Args:
+            enable_async: 是否创建异步环境
+            from_source: 强制从template_dir加载模板源码
+        """
+        loader: BaseLoader
+        compiled = (
+            self.config.compiled_templates is not None
+            and not enable_async
+            and not from_source
+        )
+        if compiled:
+            loader = ModuleLoader(str(self.config.compiled_templates))
+        else:
+            loader = FileSystemLoader(
+                str(self.config.template_dir), encoding=self.config.encoding
+            )
+
+        bytecode_cache = self.bytecode_cache
+        if enable_async and self.config.bytecode_cache_dir is not None:
+            self._async_bytecode_cache = self._create_bytecode_cache(
+                self.config.bytecode_cache_dir / "async"
+            )
+            bytecode_cache = self._async_bytecode_cache
+        # 预编译模板不需要检查源文件是否更新
+        auto_reload = self.config.auto_reload and not compiled
+        env = Environment(
+            loader=loader,
+            autoescape=self.config.autoescape,
+            trim_blocks=True,  # 移除块级标签后的第一个换行
+            lstrip_blocks=True,  # 移除块级标签前的空白
+            keep_trailing_newline=True,  # 保留文件末尾的换行
+            undefined=StrictUndefined,  # 严格模式，未定义变量会抛出错误
+            enable_async=enable_async,
+            bytecode_cache=bytecode_cache,
+            auto_reload=auto_reload,
+        )
+        self._install_extensions(env, enable_async)
+        if self.config.cache_size != 0:
+            # 替换默认的LRUCache以统计命中率, 负数表示不限制缓存大小
+            env.cache = CountingLRUCache(
+                self.config.cache_size if self.config.cache_size > 0 else None,
+                auto_reload,
+            )
+        else:
+            env.cache = None
+        return env
+
+    def _install_extensions(self, env: Environment, enable_async: bool) -> None:
+        """为环境安装扩展、过滤器及其使用的共享对象
+
+        渲染、异步渲染与预编译使用的环境都经由这里配置,
+        保证预编译的模板能够引用与渲染时相同的过滤器。
+
+        Args:
+            env: 要配置的Jinja环境
+            enable_async: 环境是否为异步环境
+        """
+        env.add_extension(FragmentCacheExtension)
+        env.fragment_cache = self.fragment_cache  # type: ignore
+        env.expr_compiler = self.expr_compiler  # type: ignore
+        env.expr_batch = self.expr_batch  # type: ignore
+        # 默认过滤器, 函数解析器通过渲染上下文传入
+        env.filters["expr_filter"] = async_expr_filter if enable_async else expr_filter
+        env.filters["expr_eval"] = async_expr_eval if enable_async else expr_eval
+        env.filters.update(self._custom_filters)
+
+    def compile_templates(self, target: str) -> TemplateCompileReport:
+        """将template_dir下的模板预编译为可导入的Python模块
+
+        只编译扩展名在template_extensions中的文件, 模板目录中的README、
+        数据文件等其他文件被跳过并在结果中列出。
+
+        Args:
+            target: 输出路径, 以.zip结尾时写入zip文件, 否则写入目录
+
+        Returns:
+            TemplateCompileReport: 已编译与跳过的文件
+
+        Raises:
+            jinja2.TemplateSyntaxError: 如果模板存在语法错误
+        """
+        env = self._create_environment(from_source=True)
+        report = TemplateCompileReport()
+        for name in env.list_templates():
+            if name.endswith(self.config.template_extensions):
+                report.compiled.append(name)
+            else:
+                report.skipped.append(name)
+        compiled = set(report.compiled)
+        env.compile_templates(
+            target,
+            zip="deflated" if target.lower().endswith(".zip") else None,
+            filter_func=compiled.__contains__,
+            log_function=lambda message: None,
+            ignore_errors=False,
+        )
+        return report
+
+    @staticmethod
+    def _create_bytecode_cache(directory: Path) -> CountingBytecodeCache:
+        """创建字节码缓存目录及缓存对象"""
+        directory.mkdir(parents=True, exist_ok=True)
+        return CountingBytecodeCache(str(directory))
+
+    def preload_templates(
+        self,
+        template_paths: Optional[List[str]] = None,
+        enable_async: bool = False,
+    ) -> TemplatePreloadReport:
+        """并行加载并编译模板到环境缓存中
+
+        编译结果进入Environment的模板缓存（及字节码缓存）, 渲染时直接命中;
+        所有模板的错误会被收集后一并返回, 而不是在渲染中途才发现。
+
+        Args:
+            template_paths: 要加载的模板, 为None时加载模板目录中的所有模板
+            enable_async: 是否预热异步渲染使用的环境
+
+        Returns:
+            TemplatePreloadReport: 每个模板的加载耗时及错误
+        """
+        env = self.async_env if enable_async else self.env
+        if template_paths is None:
+            try:
+                template_paths = env.list_templates()
+            except TypeError:
+                # 加载器不支持列举模板（如ModuleLoader）
+                template_paths = []
+
+        def load(name: str) -> Tuple[str, float, Optional[str]]:
+            start = time.perf_counter()
+            try:
+                env.get_template(name)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            return name, time.perf_counter() - start, error
+
+        report = TemplatePreloadReport()
+        # Jinja的模板缓存是线程安全的, 文件读取和编译可以在线程池中交错进行
+        with ThreadPoolExecutor() as executor:
+            for name, elapsed, error in executor.map(load, template_paths):
+                report.timings[name] = elapsed
+                if error is not None:
+                    report.errors[name] = error
+        return report
+
+    def prepare_batch(
+        self, nodes: Iterable[DataNode], data_handler: DataHandler, scope: BatchScope
+    ) -> None:
+        """登记一组节点, 插件的批量函数在组内首次调用时对整组节点计算一次
+
+        Args:
+            nodes: 同一子节点组的节点或整棵数据树的节点
+            data_handler: 数据处理器
+            scope: 节点组的范围
+        """
+        self.resolver_factory.prepare_batch(nodes, scope)
+
+    def analyze_template(self, template_path: str) -> TemplateAnalysis:
+        """静态分析模板读取的变量与子节点组
+
+        使用jinja2.meta找出模板未声明（即从渲染上下文读取）的变量及引用的模板,
+        引用的模板被递归分析并合并到结果中。分析结果按模板缓存, auto_reload时
+        模板或其引用的模板的源文件更新后重新分析, 与环境重新加载模板的时机一致。
+
+        Args:
+            template_path: 模板文件路径（相对于template_dir）
+
+        Returns:
+            TemplateAnalysis: 分析结果, 无法获取模板源码时complete为False
+        """
+        cached = self._cached_analysis(template_path)
+        if cached is None:
+            cached = self._analyze(template_path, set())
+            self._analysis_cache[template_path] = cached
+        return cached[0]
+
+    def _cached_analysis(
+        self, template_path: str
+    ) -> Optional[Tuple[TemplateAnalysis, Tuple[Callable[[], bool], ...]]]:
+        """返回仍然有效的缓存分析结果, 源文件已更新时丢弃并返回None"""
+        cached = self._analysis_cache.get(template_path)
+        if cached is not None and self.config.auto_reload:
+            if not all(uptodate() for uptodate in cached[1]):
+                del self._analysis_cache[template_path]
+                return None
+        return cached
+
+    def _analyze(
+        self, template_path: str, visiting: Set[str]
+    ) -> Tuple[TemplateAnalysis, Tuple[Callable[[], bool], ...]]:
+        """analyze_template的递归实现, visiting用于跳过循环引用
+
+        Returns:
+            分析结果, 以及模板与其引用的模板的uptodate检查
+        """
+        try:
+            source, _, uptodate = self.env.loader.get_source(self.env, template_path)  # type: ignore
+            ast = self.env.parse(source, template_path)
+        except Exception:
+            # 预编译模板没有源码, 不存在的模板留到渲染时报错
+            return TemplateAnalysis(template_path), ()
+        checks: List[Callable[[], bool]] = [uptodate] if uptodate is not None else []
+
+        variables = set(meta.find_undeclared_variables(ast))
+        complete = not self._reads_whole_context(ast)
+        slot_pattern = re.compile(re.escape(self.preserved_children_key) + r"(\d+)")
+        children_plain = self._children_plain(ast, slot_pattern)
+        referenced: List[str] = []
+        visiting = visiting | {template_path}
+        for name in meta.find_referenced_templates(ast):
+            if name is None:
+                # 模板名在渲染时才能确定
+                complete = False
+                children_plain = False
+                continue
+            if name in visiting or name in referenced:
+                continue
+            sub, sub_checks = self._cached_analysis(name) or self._analyze(name, visiting)
+            checks.extend(sub_checks)
+            referenced.append(name)
+            referenced.extend(n for n in sub.referenced_templates if n not in referenced)
+            variables |= sub.variables
+            complete = complete and sub.complete
+            children_plain = children_plain and sub.children_plain
+
+        slots = set()
+        for variable in variables:
+            match = slot_pattern.fullmatch(variable)
+            if match:
+                slots.add(int(match.group(1)))
+
+        return TemplateAnalysis(
+            template_path=template_path,
+            variables=frozenset(variables),
+            children_slots=frozenset(slots),
+            referenced_templates=tuple(referenced),
+            complete=complete,
+            children_plain=children_plain,
+        ), tuple(checks)
+
+    # 其中的输出会被捕获为字符串再使用（过滤、赋值、宏与调用块、自动转义设置）
+    _CAPTURING_NODES = (
+        nodes.FilterBlock,
+        nodes.AssignBlock,
+        nodes.Macro,
+        nodes.CallBlock,
+        nodes.EvalContextModifier,
+    )
+
+    def _children_plain(self, ast: nodes.Template, slot_pattern: "re.Pattern[str]") -> bool:
+        """子节点组变量是否只在{{ }}中直接输出, 没有经过过滤器、测试、赋值等使用
+
+        只有这种用法下以占位符渲染再拼接子节点片段与直接放入子节点文本的结果相同;
+        位于过滤块、赋值块、宏、调用块或自动转义设置块中的输出会被再次处理, 不算直接输出。
+        开启自动转义时子节点文本会被转义, 同样不能使用占位符。
+        """
+        if self.config.autoescape:
+            return False
+        slot_names = [
+            node
+            for node in ast.find_all(nodes.Name)
+            if slot_pattern.fullmatch(node.name)
+        ]
+        if not slot_names:
+            return True
+
+        # 从模板根节点遍历, 跳过捕获输出的节点及其内部
+        plain: Set[int] = set()
+        pending: List[nodes.Node] = [ast]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, self._CAPTURING_NODES):
+                continue
+            if isinstance(node, nodes.Output):
+                plain.update(id(child) for child in node.nodes if isinstance(child, nodes.Name))
+            pending.extend(node.iter_child_nodes())
+        return all(id(node) in plain for node in slot_names)
+
+    def _reads_whole_context(self, ast: nodes.Template) -> bool:
+        """模板是否使用了以pass_context方式读取整个渲染上下文的过滤器/测试/函数
+
+        如expr_filter通过上下文取得当前节点的函数解析器, 其结果依赖节点本身。
+        未注册的过滤器同样按读取整个上下文处理。
+        """
+        def reads_context(func: Any) -> bool:
+            if func is None:
+                return True
+            pass_arg = getattr(func, "jinja_pass_arg", None)
+            return getattr(pass_arg, "name", None) == "context"
+
+        for node in ast.find_all((nodes.Filter, nodes.Test, nodes.Call)):
+            if isinstance(node, nodes.Filter):
+                if reads_context(self.env.filters.get(node.name)):
+                    return True
+            elif isinstance(node, nodes.Test):
+                if reads_context(self.env.tests.get(node.name)):
+                    return True
+            elif isinstance(node.node, nodes.Name) and node.node.name in self.env.globals:
+                if reads_context(self.env.globals[node.node.name]):
+                    return True
+        return False
+
+    def depends_on_tree(self, node: DataNode) -> bool:
+        """节点的渲染是否调用了tree_dependent函数或读取了子树以外的XPath"""
+        return node in self.resolver_factory.tree_dependent_nodes
+
+    def show_cache_info(self) -> str:
+        """返回模板缓存统计信息"""
+        result = ""
+        if isinstance(self.env.cache, CountingLRUCache):
+            result += f"{self.env.cache.stats}\n"
+        if self._async_env is not None and isinstance(
+            self._async_env.cache, CountingLRUCache
+        ):
+            result += f"async {self._async_env.cache.stats}\n"
+        if self.bytecode_cache is not None:
+            result += f"{self.bytecode_cache.stats}\n"
+        if self.expr_compiler.stats.hits or self.expr_compiler.stats.compiles:
+            result += f"{self.expr_compiler.stats}\n"
+        if self.expr_batch is not None:
+            result += f"{self.expr_batch.stats}\n"
+        result += self.resolver_factory.show_memo_info()
+        profiler = self.resolver_factory.profiler
+        if profiler is not None and profiler.stats:
+            if self.config.function_stats == "json":
+                result += profiler.to_json() + "\n"
+            else:
+                result += profiler.format_table()
+        if self.fragment_cache.stats.lookups:
+            result += f"{self.fragment_cache.stats}\n"
+        if self._async_bytecode_cache is not None:
+            result += f"async {self._async_bytecode_cache.stats}\n"
+        return result
+
+    @property
+    def async_env(self) -> Environment:
+        """异步渲染使用的Jinja环境（enable_async=True）"""
+        if self._async_env is None:
+            self._async_env = self._create_environment(enable_async=True)
+        return self._async_env
+
+    @property
+    def preserved_children_key(self) -> str:
+        return self.config.preserved_children_key
+
+    def register_filter(self, name: str, func: Callable) -> None:
+        """注册自定义过滤器
+
+        Args:
+            name: 过滤器名称
+            func: 过滤器函数
+        """
+        self._custom_filters[name] = func
+        self.env.filters[name] = func
+        if self._async_env is not None:
+            self._async_env.filters[name] = func
+
+    def render_template(
+        self,
+        template_path: str,
+        node: DataNode,
+        data_handler: DataHandler,
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> str:
+        """渲染模板
+
+        Args:
+            template_path: 模板文件路径（相对于template_dir）
+            node: 当前渲染的数据节点
+            data_handler: 数据处理器
+            context: 分层渲染上下文, 默认为node.data。不会被修改或复制
+
+        Returns:
+            str: 渲染结果
+
+        Raises:
+            jinja2.TemplateNotFound: 如果模板不存在
+            jinja2.TemplateError: 如果渲染过程出错
+        """
+        node_resolver = self.resolver_factory.create_resolver(node, data_handler)
+
+        if context is None:
+            context = node.data  # 获取节点数据
+
+        template = self.env.get_template(template_path)
+        token = current_resolver.set(node_resolver)
+        try:
+            return self._render(template, context, {RESOLVER_CONTEXT_KEY: node_resolver})
+        finally:
+            current_resolver.reset(token)
+
+    async def render_template_async(
+        self,
+        template_path: str,
+        node: DataNode,
+        data_handler: DataHandler,
+        context: Optional[Mapping[str, Any]] = None,
+    ) -> str:
+        """在异步环境中渲染模板
+
+        模板中的expr_filter可以调用async用户函数, 多个节点可以在同一个
+        事件循环中并发渲染。
+
+        Args:
+            template_path: 模板文件路径（相对于template_dir）
+            node: 当前渲染的数据节点
+            data_handler: 数据处理器
+            context: 分层渲染上下文, 默认为node.data。不会被修改或复制
+
+        Returns:
+            str: 渲染结果
+
+        Raises:
+            jinja2.TemplateNotFound: 如果模板不存在
+            jinja2.TemplateError: 如果渲染过程出错
+        """
+        env = self.async_env
+        node_resolver = self.resolver_factory.create_resolver(node, data_handler)
+        if context is None:
+            context = node.data
+
+        template = env.get_template(template_path)
+        ctx = template.new_context(
+            self._layers(template, context, {RESOLVER_CONTEXT_KEY: node_resolver}),
+            shared=True,
+        )
+        # 并发渲染的节点各自运行在独立的任务中, 设置的值互不影响
+        token = current_resolver.set(node_resolver)
+        try:
+            return env.concat(  # type: ignore
+                [chunk async for chunk in template.root_render_func(ctx)]  # type: ignore
+            )
+        except Exception:
+            env.handle_exception()
+        finally:
+            current_resolver.reset(token)
+
+    @staticmethod
+    def _layers(
+        template: Template, context: Mapping[str, Any], *extra: Mapping[str, Any]
+    ) -> ChainMap:
+        """组合渲染上下文的各层, 模板全局变量作为最低优先级"""
+        if isinstance(context, ChainMap):
+            return ChainMap(*extra, *context.maps, template.globals)
+        return ChainMap(*extra, context, template.globals)
+
+    def _render(
+        self,
+        template: Template,
+        context: Mapping[str, Any],
+        *extra: Mapping[str, Any],
+    ) -> str:
+        """以共享方式渲染模板, 上下文按层查找而不复制成新的字典
+
+        Template.render会将上下文复制为dict, 这里直接以ChainMap作为
+        Jinja Context的parent, 并将模板全局变量作为最低优先级的一层。
+
+        Args:
+            template: 要渲染的模板
+            context: 分层渲染上下文
+            *extra: 优先级最高的额外上下文层（如当前节点的函数解析器）
+        """
+        ctx = template.new_context(self._layers(template, context, *extra), shared=True)  # type: ignore[arg-type]
+        try:
+            return self.env.concat(template.root_render_func(ctx))  # type: ignore
+        except Exception:
+            self.env.handle_exception()
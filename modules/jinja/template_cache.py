@@ -0,0 +1,111 @@
+"""Jinja模板缓存相关的辅助类"""
+
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+from jinja2 import FileSystemBytecodeCache
+from jinja2.bccache import Bucket
+from jinja2.utils import LRUCache
+
+
+@dataclass
+class BytecodeCacheStats:
+    """字节码缓存统计"""
+
+    hits: int = 0  # 从缓存加载字节码的次数
+    compiles: int = 0  # 缓存未命中, 需要编译模板的次数
+
+    def __str__(self) -> str:
+        total = self.hits + self.compiles
+        rate = self.hits / total if total else 0.0
+        return f"bytecode cache: {self.hits} hits, {self.compiles} compiles ({rate:.1%} hit rate)"
+
+
+class CountingBytecodeCache(FileSystemBytecodeCache):
+    """记录命中与编译次数的文件系统字节码缓存
+
+    跨进程持久化模板编译结果, 模板源码未变化时跳过编译。
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__(directory)
+        self.stats = BytecodeCacheStats()
+        # 预加载时多个线程同时加载模板, 统计在锁内更新
+        self._stats_lock = threading.Lock()
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        super().load_bytecode(bucket)
+        # 缓存文件不存在、版本不匹配或源码校验和变化时bucket.code为None
+        with self._stats_lock:
+            if bucket.code is None:
+                self.stats.compiles += 1
+            else:
+                self.stats.hits += 1
+
+
+@dataclass
+class TemplateCacheStats:
+    """模板(内存LRU)缓存统计"""
+
+    hits: int = 0  # 缓存中找到且无需重新加载的次数
+    misses: int = 0  # 缓存中不存在, 需要加载模板的次数
+    evictions: int = 0  # 缓存已满时淘汰最久未使用模板的次数
+    reload_checks: int = 0  # 命中时检查源文件是否更新(auto_reload)的次数
+    reloads: int = 0  # 源文件已更新, 重新加载模板的次数
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses + self.reloads
+        rate = self.hits / total if total else 0.0
+        return (
+            f"template cache: {self.hits} hits, {self.misses} misses, "
+            f"{self.evictions} evictions, {self.reload_checks} reload checks, "
+            f"{self.reloads} reloads ({rate:.1%} hit rate)"
+        )
+
+
+class CountingLRUCache(LRUCache):
+    """记录命中、未命中、淘汰与重载检查次数的模板缓存
+
+    Environment在get_template时先调用get查找缓存, 未找到或模板已过期时
+    加载模板并通过__setitem__写回, 据此区分未命中与重新加载。
+    预加载在线程池中并发使用缓存, 统计在单独的锁内更新（LRUCache自身的锁不可重入）。
+    """
+
+    def __init__(self, capacity: Optional[int], auto_reload: bool) -> None:
+        # capacity为None表示不限制大小
+        super().__init__(sys.maxsize if capacity is None else capacity)
+        self.auto_reload = auto_reload
+        self.stats = TemplateCacheStats()
+
+    def _postinit(self) -> None:
+        super()._postinit()
+        self._stats_lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = super().get(key)
+        with self._stats_lock:
+            if value is None:
+                self.stats.misses += 1
+                return default
+            if self.auto_reload:
+                self.stats.reload_checks += 1
+            self.stats.hits += 1
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        # 判断是重新加载还是淘汰与写入一起在锁内完成, 避免与其他线程的写入交错
+        with self._stats_lock:
+            if key in self._mapping:
+                # 命中但模板已过期, 撤销get中记录的命中
+                self.stats.hits -= 1
+                self.stats.reloads += 1
+            elif len(self._mapping) >= self.capacity:
+                self.stats.evictions += 1
+            super().__setitem__(key, value)
+
+    def copy(self) -> "CountingLRUCache":
+        rv = self.__class__(self.capacity, self.auto_reload)
+        rv._mapping.update(self._mapping)
+        rv._queue.extend(self._queue)
+        return rv
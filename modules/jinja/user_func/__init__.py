@@ -1,5 +1,5 @@
-"""
-User Function Package - Contains function registry and handler implementations
-"""
-
-
+"""
+User Function Package - Contains function registry and handler implementations
+"""
+
+
@@ -1,114 +1,418 @@
-from typing import Dict, Any, Callable, Protocol, List, Optional, Tuple
-from dataclasses import dataclass
-from enum import Enum
-from functools import wraps
-
-
-class UserFunctionErrorType(Enum):
-    """Error types for generator"""
-
-    RESOLVER_INIT_ERROR = "resolver_init_error"
-    FUNCTION_NOT_FOUND = "function_not_found"
-    PARAMS_NUM_UNEXPECPED = "params_number_unexpected"
-    PARAM_INVALID = ("param_invalid",)
-    EXECUTION_FAILED = "execution_failed"
-
-
-class UserFunctionError(Exception):
-    """Base class for generator errors"""
-
-    def __init__(self, error_type: UserFunctionErrorType, message: str) -> None:
-        self.error_type = error_type
-        self.message = message
-        super().__init__(f"{error_type.value}: {message}")
-
-
-@dataclass
-class UserFunctionInfo:
-    """用户定义函数信息"""
-
-    name: str
-    arg_range: tuple
-    description: str
-    handler: Callable
-
-
-class UserFunctionResolver:
-    """用户定义函数解析器"""
-
-    def __init__(self, function_info: List[UserFunctionInfo]):
-        self.info: Dict[str, UserFunctionInfo] = {}
-        for info in function_info:
-            if info.name in self.info:
-                raise UserFunctionError(
-                    UserFunctionErrorType.RESOLVER_INIT_ERROR,
-                    message=f"Duplicate function found: {info.name}",
-                )
-            else:
-                self.info[info.name] = info
-
-    def add_function(self, function_info: UserFunctionInfo) -> bool:
-        if function_info.name not in self.info:
-            self.info[function_info.name] = function_info
-            return True
-        else:
-            raise UserFunctionError(
-                UserFunctionErrorType.RESOLVER_INIT_ERROR,
-                message=f"Duplicate function found: {function_info.name}",
-            )
-            # return False
-
-    def get_handler(self, func_name: str) -> Callable:
-        """获取带验证的用户函数处理器
-
-        Args:
-            func_name: 用户函数名称
-
-        Returns:
-            Callable: 包装后的处理器函数
-
-        Raises:
-            UserFunctionError: 函数未找到或参数验证失败
-        """
-        # 1. 提前获取函数信息
-        if func_name not in self.info:
-            raise UserFunctionError(
-                error_type=UserFunctionErrorType.FUNCTION_NOT_FOUND,
-                message=f"Function {func_name} not found!",
-            )
-
-        info = self.info[func_name]
-        handler = info.handler
-
-        # 2. 使用闭包安全捕获当前值
-        min_args, max_args = info.arg_range
-
-        # 3. 使用装饰器模式避免重复定义
-        @wraps(handler)  # 保留原函数元数据
-        def wrapped_handler(*args: Tuple[Any, ...]) -> Any:
-            """包装后的用户函数处理器"""
-            argc = len(args)
-            if argc < info.arg_range[0] or argc > info.arg_range[1]:
-                raise UserFunctionError(
-                    error_type=UserFunctionErrorType.PARAMS_NUM_UNEXPECPED,
-                    message=f"Function expect [{info.arg_range[0]}~{info.arg_range[1]}] params but get {argc}",
-                )
-
-            # 参数类型/值验证
-            # if not info.validate(*args):
-            #     raise UserFunctionError(
-            #         error_type=UserFunctionErrorType.PARAM_INVALID,
-            #         message=f"Invalid parameter values for {func_name}",
-            #     )
-
-            try:
-                # 执行实际处理函数
-                return handler(*args)
-            except Exception as e:
-                # 捕获执行异常
-                raise UserFunctionError(
-                    error_type=UserFunctionErrorType.EXECUTION_FAILED,
-                    message=f"Error executing {func_name}: {str(e)}",
-                ) from e
-
-        return wrapped_handler
+from typing import Dict, Any, Callable, Protocol, List, Optional, Sequence, Tuple, Hashable
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import wraps
+from time import perf_counter
+import inspect
+import json
+
+from modules.lib import canonical_fingerprint
+
+
+class UserFunctionErrorType(Enum):
+    """Error types for generator"""
+
+    RESOLVER_INIT_ERROR = "resolver_init_error"
+    FUNCTION_NOT_FOUND = "function_not_found"
+    PARAMS_NUM_UNEXPECPED = "params_number_unexpected"
+    PARAM_INVALID = ("param_invalid",)
+    EXECUTION_FAILED = "execution_failed"
+
+
+class UserFunctionError(Exception):
+    """Base class for generator errors"""
+
+    def __init__(self, error_type: UserFunctionErrorType, message: str) -> None:
+        self.error_type = error_type
+        self.message = message
+        super().__init__(f"{error_type.value}: {message}")
+
+
+@dataclass
+class FunctionMemoStats:
+    """纯函数调用缓存统计"""
+
+    hits: int = 0  # 直接返回缓存结果的次数
+    misses: int = 0  # 实际调用函数的次数
+
+    def __str__(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1%} hit rate)"
+
+
+class FunctionMemo:
+    """纯函数调用结果的有界缓存（LRU）, 以参数为键"""
+
+    # 可以直接作为键的参数类型, 其他参数使用规范化指纹
+    _SCALARS = (str, int, float, bool, type(None))
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._results: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.stats = FunctionMemoStats()
+
+    @classmethod
+    def make_key(cls, args: Tuple[Any, ...]) -> Hashable:
+        """由参数生成缓存键, 键包含参数类型, 避免1、1.0与True共用结果"""
+        return tuple(
+            (type(arg), arg) if type(arg) in cls._SCALARS else ("fingerprint", canonical_fingerprint(arg))
+            for arg in args
+        )
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """查找缓存结果, 返回(是否找到, 结果)"""
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.stats.hits += 1
+            return True, self._results[key]
+        self.stats.misses += 1
+        return False, None
+
+    def store(self, key: Hashable, value: Any) -> None:
+        self._results[key] = value
+        if len(self._results) > self.size:
+            self._results.popitem(last=False)
+
+
+@dataclass
+class FunctionCallStats:
+    """单个用户函数的调用统计"""
+
+    plugin: Optional[str] = None  # 提供函数的插件
+    calls: int = 0  # 实际执行处理器的次数（不含调用缓存命中）
+    errors: int = 0  # 执行抛出异常的次数
+    total_time: float = 0.0  # 累计耗时（秒）
+    max_time: float = 0.0  # 单次最大耗时（秒）
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+    def add(self, elapsed: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "plugin": self.plugin,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "mean_time": self.mean_time,
+            "max_time": self.max_time,
+        }
+
+
+class FunctionProfiler:
+    """用户函数调用统计, 按函数名汇总, 可按插件合计"""
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, FunctionCallStats] = {}
+
+    def record(self, info: "UserFunctionInfo", elapsed: float, failed: bool = False) -> None:
+        """记录一次处理器执行"""
+        stats = self.stats.get(info.name)
+        if stats is None:
+            stats = self.stats[info.name] = FunctionCallStats(plugin=info.plugin)
+        stats.add(elapsed, failed)
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def plugin_stats(self) -> Dict[str, FunctionCallStats]:
+        """按插件合计的统计, max_time为插件内函数的单次最大耗时"""
+        totals: Dict[str, FunctionCallStats] = {}
+        for stats in self.stats.values():
+            plugin = stats.plugin or ""
+            total = totals.setdefault(plugin, FunctionCallStats(plugin=stats.plugin))
+            total.calls += stats.calls
+            total.errors += stats.errors
+            total.total_time += stats.total_time
+            total.max_time = max(total.max_time, stats.max_time)
+        return totals
+
+    def _sorted(self, stats: Dict[str, FunctionCallStats]) -> List[Tuple[str, FunctionCallStats]]:
+        """按累计耗时从高到低排序"""
+        return sorted(stats.items(), key=lambda item: item[1].total_time, reverse=True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "functions": {name: stats.to_dict() for name, stats in self._sorted(self.stats)},
+            "plugins": {
+                name: stats.to_dict() for name, stats in self._sorted(self.plugin_stats())
+            },
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def format_table(self) -> str:
+        """以表格形式返回统计, 时间单位为毫秒
+
+        函数按插件分组, 每组之后是该插件的合计行, 插件按累计耗时从高到低排列。
+        """
+        header = f"{'function':<32} {'plugin':<24} {'calls':>8} {'errors':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"
+        lines = [header, "-" * len(header)]
+        for plugin, total in self._sorted(self.plugin_stats()):
+            for name, stats in self._sorted(self.stats):
+                if (stats.plugin or "") == plugin:
+                    lines.append(self._format_row(name, stats))
+            lines.append(self._format_row("(subtotal)", total))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _format_row(label: str, stats: FunctionCallStats) -> str:
+        return (
+            f"{label:<32} {stats.plugin or '-':<24} {stats.calls:>8} {stats.errors:>6} "
+            f"{stats.total_time * 1000:>10.3f} {stats.mean_time * 1000:>9.3f} "
+            f"{stats.max_time * 1000:>9.3f}"
+        )
+
+
+@dataclass
+class UserFunctionInfo:
+    """用户定义函数信息
+
+    handler可以是普通函数, 也可以是async函数（仅在异步渲染中可用）。
+    pure表示结果只取决于参数且没有副作用, 静态纯函数的常量调用会在表达式编译时折叠。
+    pure函数的调用结果按参数缓存, 最多保存memo_size个（0表示不缓存）; 静态函数的缓存
+    在整棵数据树的渲染中共享, 动态函数随节点创建, 缓存只在节点内有效。
+    lazy_args为True时参数以无参函数传入, 只有被调用的参数才会求值
+    (异步渲染中调用参数函数返回awaitable)。
+    tree_dependent表示结果依赖节点子树以外的数据（父节点、同级节点或整棵树）,
+    调用了这类函数的节点不参与dedupe_renders的结果复用。
+    """
+
+    name: str
+    arg_range: tuple
+    description: str
+    handler: Callable
+    pure: bool = False
+    lazy_args: bool = False
+    memo_size: int = 256
+    plugin: Optional[str] = None  # 提供函数的插件名, 未指定时由解析器工厂填写
+    tree_dependent: bool = False
+    # 调用统计, 为None时不统计; 由解析器工厂按配置设置
+    profiler: Optional[FunctionProfiler] = field(default=None, repr=False, compare=False)
+    _memo: Optional[FunctionMemo] = field(default=None, init=False, repr=False, compare=False)
+    # 参数数量（None表示逐次检查）到包装后处理器的缓存
+    _wrapped: Dict[Optional[int], Callable] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @property
+    def memo(self) -> Optional[FunctionMemo]:
+        """pure函数的调用缓存, 不缓存时为None"""
+        if not self.pure or self.lazy_args or self.memo_size <= 0:
+            return None
+        if self._memo is None:
+            self._memo = FunctionMemo(self.memo_size)
+        return self._memo
+
+    @property
+    def is_async(self) -> bool:
+        """处理器是否为协程函数"""
+        return inspect.iscoroutinefunction(self.handler)
+
+    def check_args(self, argc: int) -> None:
+        """检查参数数量, arg_range的上限为None时不限制"""
+        min_args, max_args = self.arg_range
+        if argc < min_args or (max_args is not None and argc > max_args):
+            raise UserFunctionError(
+                error_type=UserFunctionErrorType.PARAMS_NUM_UNEXPECPED,
+                message=f"Function expect [{min_args}~{max_args}] params but get {argc}",
+            )
+
+    def wrapped_handler(self, argc: Optional[int] = None) -> Callable:
+        """取得包装后的处理器, 包装结果缓存在函数信息上
+
+        静态函数的信息由所有解析器共享, 因此其包装只创建一次。
+
+        Args:
+            argc: 为None时处理器在每次调用时检查参数数量; 否则在此检查一次,
+                返回不做检查的处理器
+
+        Raises:
+            UserFunctionError: 参数数量不符合arg_range
+        """
+        wrapped = self._wrapped.get(argc)
+        if wrapped is None:
+            if argc is not None:
+                self.check_args(argc)
+            wrapped = self._wrapped[argc] = self._wrap(check=argc is None)
+        return wrapped
+
+    def _wrap(self, check: bool) -> Callable:
+        func_name = self.name
+        handler = self.handler
+        check_args = self.check_args
+        memo = self.memo
+        profiler = self.profiler
+        info = self
+
+        if self.is_async:
+
+            @wraps(handler)
+            async def async_wrapped_handler(*args: Tuple[Any, ...]) -> Any:
+                """包装后的异步用户函数处理器"""
+                if check:
+                    check_args(len(args))
+                if memo is not None:
+                    key = memo.make_key(args)
+                    found, value = memo.lookup(key)
+                    if found:
+                        return value
+                start = perf_counter() if profiler is not None else 0.0
+                try:
+                    result = await handler(*args)
+                except Exception as e:
+                    if profiler is not None:
+                        profiler.record(info, perf_counter() - start, failed=True)
+                    raise UserFunctionError(
+                        error_type=UserFunctionErrorType.EXECUTION_FAILED,
+                        message=f"Error executing {func_name}: {str(e)}",
+                    ) from e
+                if profiler is not None:
+                    profiler.record(info, perf_counter() - start)
+                if memo is not None:
+                    memo.store(key, result)
+                return result
+
+            return async_wrapped_handler
+
+        # 使用装饰器模式避免重复定义
+        @wraps(handler)  # 保留原函数元数据
+        def wrapped_handler(*args: Tuple[Any, ...]) -> Any:
+            """包装后的用户函数处理器"""
+            if check:
+                check_args(len(args))
+            if memo is not None:
+                key = memo.make_key(args)
+                found, value = memo.lookup(key)
+                if found:
+                    return value
+
+            # 参数类型/值验证
+            # if not info.validate(*args):
+            #     raise UserFunctionError(
+            #         error_type=UserFunctionErrorType.PARAM_INVALID,
+            #         message=f"Invalid parameter values for {func_name}",
+            #     )
+
+            start = perf_counter() if profiler is not None else 0.0
+            try:
+                # 执行实际处理函数
+                result = handler(*args)
+            except Exception as e:
+                if profiler is not None:
+                    profiler.record(info, perf_counter() - start, failed=True)
+                # 捕获执行异常
+                raise UserFunctionError(
+                    error_type=UserFunctionErrorType.EXECUTION_FAILED,
+                    message=f"Error executing {func_name}: {str(e)}",
+                ) from e
+            if profiler is not None:
+                profiler.record(info, perf_counter() - start)
+            if memo is not None:
+                memo.store(key, result)
+            return result
+
+        return wrapped_handler
+
+
+class BatchScope(Enum):
+    """批量函数一次调用处理的节点范围"""
+
+    SIBLINGS = "siblings"  # 同一父节点下同一子节点组的节点（根节点为同一模式的所有根节点）
+    TREE = "tree"  # 整棵数据树的所有数据节点
+
+
+@dataclass
+class BatchFunctionInfo:
+    """批量用户函数信息
+
+    handler以一组数据节点为参数, 返回与节点一一对应的结果序列, 适用于一次查询即可
+    得到所有节点结果的场景（如数据库批量查询、聚合计算）。模板中以无参函数调用,
+    返回当前节点的结果; 每组节点只在其中某个节点首次调用时执行一次handler。
+    handler必须是同步函数。
+    """
+
+    name: str
+    description: str
+    handler: Callable[[List[Any]], Sequence[Any]]
+    scope: BatchScope = BatchScope.SIBLINGS
+    plugin: Optional[str] = None  # 提供函数的插件名, 未指定时由解析器工厂填写
+
+
+class UserFunctionResolver:
+    """用户定义函数解析器"""
+
+    def __init__(self, function_info: List[UserFunctionInfo], node: Optional[Any] = None):
+        """
+        Args:
+            function_info: 可调用的用户函数
+            node: 解析器所属的数据节点, 表达式中的XPath相对于该节点求值
+        """
+        self.node = node
+        # 渲染中是否读取了节点子树以外的数据
+        self.tree_dependent = False
+        self.info: Dict[str, UserFunctionInfo] = {}
+        for info in function_info:
+            if info.name in self.info:
+                raise UserFunctionError(
+                    UserFunctionErrorType.RESOLVER_INIT_ERROR,
+                    message=f"Duplicate function found: {info.name}",
+                )
+            else:
+                self.info[info.name] = info
+
+    def add_function(self, function_info: UserFunctionInfo) -> bool:
+        if function_info.name not in self.info:
+            self.info[function_info.name] = function_info
+            return True
+        else:
+            raise UserFunctionError(
+                UserFunctionErrorType.RESOLVER_INIT_ERROR,
+                message=f"Duplicate function found: {function_info.name}",
+            )
+            # return False
+
+    def find_info(self, func_name: str) -> Optional[UserFunctionInfo]:
+        """按名称查找函数信息, 未找到时返回None"""
+        return self.info.get(func_name)
+
+    def mark_tree_dependent(self) -> None:
+        """记录本次渲染读取了节点子树以外的数据, 其结果不能在其他位置复用"""
+        self.tree_dependent = True
+
+    def is_lazy(self, func_name: str) -> bool:
+        """函数是否以无参函数的形式接收参数"""
+        info = self.find_info(func_name)
+        return info is not None and info.lazy_args
+
+    def get_handler(self, func_name: str, argc: Optional[int] = None) -> Callable:
+        """获取带验证的用户函数处理器
+
+        Args:
+            func_name: 用户函数名称
+            argc: 调用时的参数数量; 给出时在此检查一次, 返回的处理器不再逐次检查
+
+        Returns:
+            Callable: 包装后的处理器函数
+
+        Raises:
+            UserFunctionError: 函数未找到或参数验证失败
+        """
+        # 1. 提前获取函数信息
+        info = self.find_info(func_name)
+        if info is None:
+            raise UserFunctionError(
+                error_type=UserFunctionErrorType.FUNCTION_NOT_FOUND,
+                message=f"Function {func_name} not found!",
+            )
+
+        return info.wrapped_handler(argc)
@@ -1,11 +1,11 @@
-from typing import (
-    Protocol,
-    Dict,
-    Any,
-    List,
-    Optional,
-    Iterator,
-    runtime_checkable,
-    Callable,
-)
-
+from typing import (
+    Protocol,
+    Dict,
+    Any,
+    List,
+    Optional,
+    Iterator,
+    runtime_checkable,
+    Callable,
+)
+
@@ -0,0 +1,51 @@
+from modules.jinja.user_func.func_handler import UserFunctionInfo
+from modules.jinja.user_func.resolver import FunctionPlugin
+from modules.node.data_index import tree_index
+from modules.node.data_node import DataNode
+from typing import Any, Dict, List, Optional
+
+
+class DataIndexPlugin(FunctionPlugin):
+    """数据索引插件，按数据属性查找当前数据树中的节点"""
+
+    @classmethod
+    def dynamic_functions(cls, node: DataNode) -> List[UserFunctionInfo]:
+        """按属性查找的函数（在当前节点所在的数据树中查找）"""
+
+        def find(key: str, value: Any) -> Optional[Dict[str, Any]]:
+            found = tree_index(node).find_one(key, value)
+            return found.data if found is not None else None
+
+        def find_all(key: str, value: Any) -> List[Dict[str, Any]]:
+            return [found.data for found in tree_index(node).find(key, value)]
+
+        def count(key: str, value: Any) -> int:
+            return len(tree_index(node).find(key, value))
+
+        return [
+            UserFunctionInfo(
+                name="data:find",
+                arg_range=(2, 2),
+                description="Get data of the first node whose data[key] equals value",
+                handler=find,
+                tree_dependent=True,
+            ),
+            UserFunctionInfo(
+                name="data:find_all",
+                arg_range=(2, 2),
+                description="Get data of all nodes whose data[key] equals value",
+                handler=find_all,
+                tree_dependent=True,
+            ),
+            UserFunctionInfo(
+                name="data:count",
+                arg_range=(2, 2),
+                description="Count nodes whose data[key] equals value",
+                handler=count,
+                tree_dependent=True,
+            ),
+        ]
+
+    @classmethod
+    def on_plugin_load(cls):
+        print("DataIndexPlugin loaded")
@@ -1,222 +1,594 @@
-from .func_handler import UserFunctionResolver, UserFunctionInfo
-from modules.core import DataHandler
-from modules.node.data_node import DataNode
-from typing import Dict, Callable, List, Type
-import importlib
-import os
-import sys
-from pathlib import Path
-
-
-# 增强版插件接口
-class FunctionPlugin:
-    """插件基类，支持静态和动态函数"""
-
-    @classmethod
-    def static_functions(cls) -> List[UserFunctionInfo]:
-        """返回插件提供的静态函数列表（与节点无关）"""
-        return []
-
-    @classmethod
-    def dynamic_functions(cls, node: DataNode) -> List[UserFunctionInfo]:
-        """返回插件提供的动态函数列表（需要节点上下文）"""
-        return []
-
-    @classmethod
-    def on_plugin_load(cls):
-        """插件加载时的初始化操作（可选）"""
-        pass
-
-    @classmethod
-    def on_plugin_unload(cls):
-        """插件卸载时的清理操作（可选）"""
-        pass
-
-
-# 增强版工厂类
-class UserFunctionResolverFactory:
-    def __init__(self, plugins_dir: str = str(Path(__file__).parent / "plugins")):
-        self.plugins_dir = plugins_dir
-        self.plugin_classes: List[Type[FunctionPlugin]] = []
-        self.static_functions: Dict[str, UserFunctionInfo] = {}
-
-        # 初始化时加载所有插件
-        self._load_plugins()
-        # 收集所有静态函数
-        self._collect_static_functions()
-
-    @staticmethod
-    def _serialize_function_info(info: UserFunctionInfo, indent: int) -> str:
-        result: str = (
-            f"{' ' * indent}{info.name}[{info.arg_range[0]},{info.arg_range[1]}]: {info.description}"
-        )
-        return result
-
-    def show_function_info(self) -> str:
-        result = ""
-        result += f"========Static functions========\n"
-        for key, value in self.static_functions.items():
-            result += self._serialize_function_info(value, indent=0) + "\n"
-
-        result += f"========Dynamic functions========\n"
-        for info in self._create_dynamic_functions(None, None):
-            result += self._serialize_function_info(info, indent=0) + "\n"
-
-        return result
-
-    def _load_plugins(self):
-        """扫描并加载插件目录中的所有有效插件"""
-        plugins_path = Path(self.plugins_dir)
-
-        if not plugins_path.exists():
-            os.makedirs(plugins_path, exist_ok=True)
-            return
-
-        # 确保插件目录在Python路径中
-        if str(plugins_path) not in sys.path:
-            sys.path.append(str(plugins_path))
-
-        # 扫描所有.py文件（排除__init__.py）
-        loaded_modules = set()
-        for file_path in plugins_path.glob("*.py"):
-            if file_path.name == "__init__.py":
-                continue
-
-            module_name = file_path.stem
-            try:
-                # 防止重复加载
-                if module_name in loaded_modules:
-                    continue
-
-                module = importlib.import_module(module_name)
-                loaded_modules.add(module_name)
-                self._register_plugin(module)
-            except Exception as e:
-                print(f"Failed to load plugin {module_name}: {str(e)}")
-
-    def _register_plugin(self, module):
-        """注册插件模块"""
-        for attr_name in dir(module):
-            attr = getattr(module, attr_name)
-
-            if (
-                isinstance(attr, type)
-                and issubclass(attr, FunctionPlugin)
-                and attr != FunctionPlugin
-            ):
-
-                plugin_class = attr
-                try:
-                    # 调用插件初始化方法
-                    plugin_class.on_plugin_load()
-                    self.plugin_classes.append(plugin_class)
-                    print(f"Loaded plugin: {plugin_class.__name__}")
-                except Exception as e:
-                    print(
-                        f"Error initializing plugin {plugin_class.__name__}: {str(e)}"
-                    )
-
-    def _collect_static_functions(self):
-        """收集所有插件的静态函数"""
-        # 内置静态函数
-        # builtin_static = {
-        #     "user:double": UserFunctionInfo(
-        #         name="user:double",
-        #         arg_range=[1, 1],
-        #         description="Double the input value",
-        #         handler=lambda x: 2 * x.value,
-        #     ),
-        #     "util:uppercase": UserFunctionInfo(
-        #         name="util:uppercase",
-        #         arg_range=[1, 1],
-        #         description="Convert string to uppercase",
-        #         handler=lambda s: s.upper(),
-        #     ),
-        # }
-
-        # 收集插件静态函数
-        plugin_static = {}
-        for plugin_class in self.plugin_classes:
-            try:
-                for func_info in plugin_class.static_functions():
-                    # 防止函数名冲突
-                    if func_info.name in plugin_static:
-                        print(
-                            f"Warning: Duplicate static function name '{func_info.name}' in plugin {plugin_class.__name__}"
-                        )
-                    else:
-                        plugin_static[func_info.name] = func_info
-            except Exception as e:
-                print(
-                    f"Error collecting static functions from {plugin_class.__name__}: {str(e)}"
-                )
-
-        # 合并所有静态函数
-        self.static_functions = {**plugin_static}
-
-    def _create_dynamic_functions(
-        self, node: DataNode, data_handler: DataHandler
-    ) -> List[UserFunctionInfo]:
-        """创建内置和插件的动态函数"""
-        # 内置动态函数
-        # builtin_dynamic = [
-        #     UserFunctionInfo(
-        #         name="node:name",
-        #         arg_range=[0, 0],
-        #         description="Get current node name",
-        #         handler=lambda: node.name,
-        #     ),
-        #     UserFunctionInfo(
-        #         name="node:path",
-        #         arg_range=[0, 0],
-        #         description="Get node absolute path",
-        #         handler=lambda: node.get_absolute_path(),
-        #     ),
-        #     UserFunctionInfo(
-        #         name="node:get_rel",
-        #         arg_range=[1, 1],
-        #         description="Find node by relative path",
-        #         handler=lambda x: self.data_handler.find_by_file_path(node, x)[0],
-        #     ),
-        #     UserFunctionInfo(
-        #         name="node:get_attr",
-        #         arg_range=[2, 2],
-        #         description="Get node attribute",
-        #         handler=lambda x, attr: str(x.data.get(attr, "")),
-        #     ),
-        # ]
-
-        # 插件动态函数
-        plugin_dynamic = []
-        for plugin_class in self.plugin_classes:
-            try:
-                # 获取插件的动态函数
-                funcs = plugin_class.dynamic_functions(node)
-                plugin_dynamic.extend(funcs)
-            except Exception as e:
-                print(
-                    f"Error creating dynamic functions from {plugin_class.__name__}: {str(e)}"
-                )
-
-        return plugin_dynamic
-
-    def create_resolver(
-        self, node: DataNode, data_handler: DataHandler
-    ) -> UserFunctionResolver:
-        """创建函数解析器"""
-        static_funcs = list(self.static_functions.values())
-        dynamic_funcs = self._create_dynamic_functions(node, data_handler)
-        return UserFunctionResolver(static_funcs + dynamic_funcs)
-
-    def reload_plugins(self):
-        """重新加载所有插件"""
-        # 清理现有插件
-        for plugin_class in self.plugin_classes:
-            try:
-                plugin_class.on_plugin_unload()
-            except Exception as e:
-                print(f"Error unloading plugin {plugin_class.__name__}: {str(e)}")
-
-        self.plugin_classes.clear()
-        self._load_plugins()
-        self._collect_static_functions()
+from .func_handler import (
+    BatchFunctionInfo,
+    BatchScope,
+    FunctionProfiler,
+    UserFunctionResolver,
+    UserFunctionInfo,
+    UserFunctionError,
+    UserFunctionErrorType,
+)
+from modules.core import DataHandler
+from modules.node.data_node import DataNode
+from typing import Any, Dict, Callable, Iterable, List, Mapping, Optional, Set, Tuple, Type
+from types import MappingProxyType
+from functools import partial
+import importlib
+import inspect
+import weakref
+import os
+import sys
+from pathlib import Path
+
+import yaml
+
+# 插件目录中的插件清单文件: 函数命名空间到插件模块名的映射
+PLUGIN_MANIFEST = "manifest.yaml"
+
+
+# 增强版插件接口
+class FunctionPlugin:
+    """插件基类，支持静态和动态函数"""
+
+    @classmethod
+    def static_functions(cls) -> List[UserFunctionInfo]:
+        """返回插件提供的静态函数列表（与节点无关）"""
+        return []
+
+    @classmethod
+    def dynamic_functions(cls, node: DataNode) -> List[UserFunctionInfo]:
+        """返回插件提供的动态函数列表（需要节点上下文）"""
+        return []
+
+    @classmethod
+    def batch_functions(cls) -> List[BatchFunctionInfo]:
+        """返回插件提供的批量函数列表（一次调用处理一组节点）"""
+        return []
+
+    @classmethod
+    def on_plugin_load(cls):
+        """插件加载时的初始化操作（可选）"""
+        pass
+
+    @classmethod
+    def on_plugin_unload(cls):
+        """插件卸载时的清理操作（可选）"""
+        pass
+
+
+# 增强版工厂类
+class UserFunctionResolverFactory:
+    def __init__(
+        self,
+        plugins_dir: str = str(Path(__file__).parent / "plugins"),
+        lazy: bool = False,
+        profiler: Optional[FunctionProfiler] = None,
+    ):
+        """
+        Args:
+            plugins_dir: 插件目录
+            lazy: 为True时插件清单中列出的模块延迟到首次解析其命名空间中的函数时导入,
+                未列出的模块仍在初始化时导入
+            profiler: 记录插件函数调用次数与耗时, 为None时不统计
+        """
+        self.plugins_dir = plugins_dir
+        self.lazy = lazy
+        self.profiler = profiler
+        self.plugin_classes: List[Type[FunctionPlugin]] = []
+        self._loaded_modules: Set[str] = set()
+        # 尚未导入的命名空间到插件模块名
+        self.pending_namespaces: Dict[str, List[str]] = {}
+        self.static_functions: Dict[str, UserFunctionInfo] = {}
+        # 所有解析器共享的只读静态函数表
+        self.static_table: Mapping[str, UserFunctionInfo] = MappingProxyType(
+            self.static_functions
+        )
+        # 命名空间到提供该命名空间动态函数的插件, 键None为无法确定命名空间的插件
+        self.dynamic_namespaces: Dict[Optional[str], List[Type[FunctionPlugin]]] = {}
+        self.batch_functions: Dict[str, BatchFunctionInfo] = {}
+        self.batch_store = BatchFunctionStore()
+        # 渲染时读取了子树以外数据的节点（调用了tree_dependent或批量函数等）
+        self.tree_dependent_nodes: "weakref.WeakSet[DataNode]" = weakref.WeakSet()
+
+        # 初始化时加载所有插件
+        self._load_plugins()
+        # 收集所有静态函数
+        self._collect_static_functions()
+        # 记录动态函数所在的命名空间
+        self._collect_dynamic_namespaces()
+        # 收集批量函数
+        self._collect_batch_functions()
+
+    @staticmethod
+    def _serialize_function_info(info: UserFunctionInfo, indent: int) -> str:
+        result: str = (
+            f"{' ' * indent}{info.name}[{info.arg_range[0]},{info.arg_range[1]}]: {info.description}"
+        )
+        return result
+
+    def show_function_info(self) -> str:
+        result = ""
+        result += f"========Static functions========\n"
+        for key, value in self.static_functions.items():
+            result += self._serialize_function_info(value, indent=0) + "\n"
+
+        result += f"========Dynamic functions========\n"
+        for info in self._create_dynamic_functions(None, None):
+            result += self._serialize_function_info(info, indent=0) + "\n"
+
+        if self.batch_functions:
+            result += f"========Batch functions========\n"
+            for info in self.batch_functions.values():
+                result += f"{info.name}[{info.scope.value}]: {info.description}\n"
+
+        if self.pending_namespaces:
+            result += f"========Lazy namespaces========\n"
+            for namespace, module_names in self.pending_namespaces.items():
+                result += f"{namespace}: {', '.join(module_names)}\n"
+
+        return result
+
+    def show_memo_info(self) -> str:
+        """返回静态纯函数调用缓存的命中统计, 没有调用记录时为空字符串"""
+        result = ""
+        for name, info in self.static_functions.items():
+            memo = info.memo
+            if memo is not None and (memo.stats.hits or memo.stats.misses):
+                result += f"function memo {name}: {memo.stats}\n"
+        return result
+
+    def _load_plugins(self):
+        """扫描并加载插件目录中的所有有效插件"""
+        plugins_path = Path(self.plugins_dir)
+
+        if not plugins_path.exists():
+            os.makedirs(plugins_path, exist_ok=True)
+            return
+
+        # 确保插件目录在Python路径中
+        if str(plugins_path) not in sys.path:
+            sys.path.append(str(plugins_path))
+
+        self._loaded_modules = set()
+        self.pending_namespaces = self._load_manifest(plugins_path) if self.lazy else {}
+        lazy_modules = {
+            module_name
+            for module_names in self.pending_namespaces.values()
+            for module_name in module_names
+        }
+
+        # 扫描所有.py文件（排除__init__.py）, 清单中的模块延迟导入
+        for file_path in plugins_path.glob("*.py"):
+            if file_path.name == "__init__.py" or file_path.stem in lazy_modules:
+                continue
+            self._import_plugin(file_path.stem)
+
+    @staticmethod
+    def _load_manifest(plugins_path: Path) -> Dict[str, List[str]]:
+        """读取插件清单, 返回命名空间到模块名列表; 没有清单时返回空字典
+
+        清单格式（YAML）:
+            math: template_plugins       # 命名空间可写作math或math:
+            text: [text_plugins, extra]  # 一个命名空间可以由多个模块提供
+        """
+        manifest_path = plugins_path / PLUGIN_MANIFEST
+        if not manifest_path.exists():
+            return {}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = yaml.safe_load(f) or {}
+            if not isinstance(manifest, dict):
+                raise ValueError("manifest must be a mapping")
+        except Exception as e:
+            print(f"Failed to load plugin manifest {manifest_path}: {str(e)}")
+            return {}
+
+        namespaces: Dict[str, List[str]] = {}
+        for namespace, module_names in manifest.items():
+            if isinstance(module_names, str):
+                module_names = [module_names]
+            namespaces[str(namespace).rstrip(":")] = [str(name) for name in module_names]
+        return namespaces
+
+    def _import_plugin(self, module_name: str) -> List[Type[FunctionPlugin]]:
+        """导入并注册插件模块, 返回新注册的插件类"""
+        # 防止重复加载
+        if module_name in self._loaded_modules:
+            return []
+        try:
+            module = importlib.import_module(module_name)
+            self._loaded_modules.add(module_name)
+            return self._register_plugin(module)
+        except Exception as e:
+            print(f"Failed to load plugin {module_name}: {str(e)}")
+            return []
+
+    def load_namespace(self, namespace: str) -> bool:
+        """导入延迟加载的命名空间的插件模块
+
+        Returns:
+            bool: 是否注册了新的插件
+        """
+        module_names = self.pending_namespaces.pop(namespace, None)
+        if not module_names:
+            return False
+        plugin_classes: List[Type[FunctionPlugin]] = []
+        for module_name in module_names:
+            plugin_classes.extend(self._import_plugin(module_name))
+        self._collect_static_functions(plugin_classes)
+        self._collect_dynamic_namespaces(plugin_classes)
+        self._collect_batch_functions(plugin_classes)
+        return bool(plugin_classes)
+
+    def _register_plugin(self, module) -> List[Type[FunctionPlugin]]:
+        """注册插件模块, 返回新注册的插件类"""
+        registered: List[Type[FunctionPlugin]] = []
+        for attr_name in dir(module):
+            attr = getattr(module, attr_name)
+
+            if (
+                isinstance(attr, type)
+                and issubclass(attr, FunctionPlugin)
+                and attr != FunctionPlugin
+                and attr not in self.plugin_classes
+            ):
+
+                plugin_class = attr
+                try:
+                    # 调用插件初始化方法
+                    plugin_class.on_plugin_load()
+                    self.plugin_classes.append(plugin_class)
+                    registered.append(plugin_class)
+                    print(f"Loaded plugin: {plugin_class.__name__}")
+                except Exception as e:
+                    print(
+                        f"Error initializing plugin {plugin_class.__name__}: {str(e)}"
+                    )
+        return registered
+
+    def _collect_static_functions(
+        self, plugin_classes: Optional[List[Type[FunctionPlugin]]] = None
+    ):
+        """收集插件的静态函数, plugin_classes为None时重新收集所有插件"""
+        # 内置静态函数
+        # builtin_static = {
+        #     "user:double": UserFunctionInfo(
+        #         name="user:double",
+        #         arg_range=[1, 1],
+        #         description="Double the input value",
+        #         handler=lambda x: 2 * x.value,
+        #     ),
+        #     "util:uppercase": UserFunctionInfo(
+        #         name="util:uppercase",
+        #         arg_range=[1, 1],
+        #         description="Convert string to uppercase",
+        #         handler=lambda s: s.upper(),
+        #     ),
+        # }
+
+        # 收集插件静态函数, 延迟加载的插件加入已有的静态函数表
+        if plugin_classes is None:
+            plugin_static = {}
+            plugin_classes = self.plugin_classes
+        else:
+            plugin_static = self.static_functions
+        for plugin_class in plugin_classes:
+            try:
+                for func_info in plugin_class.static_functions():
+                    self._attach(func_info, plugin_class)
+                    # 防止函数名冲突
+                    if func_info.name in plugin_static:
+                        print(
+                            f"Warning: Duplicate static function name '{func_info.name}' in plugin {plugin_class.__name__}"
+                        )
+                    else:
+                        plugin_static[func_info.name] = func_info
+            except Exception as e:
+                print(
+                    f"Error collecting static functions from {plugin_class.__name__}: {str(e)}"
+                )
+
+        # 合并所有静态函数
+        if plugin_static is not self.static_functions:
+            self.static_functions = {**plugin_static}
+            self.static_table = MappingProxyType(self.static_functions)
+
+    def _attach(self, info: UserFunctionInfo, plugin_class: Type[FunctionPlugin]) -> None:
+        """记录函数所属的插件, 并按配置设置调用统计"""
+        if info.plugin is None:
+            info.plugin = plugin_class.__name__
+        if self.profiler is not None:
+            info.profiler = self.profiler
+
+    def _collect_batch_functions(
+        self, plugin_classes: Optional[List[Type[FunctionPlugin]]] = None
+    ):
+        """收集插件的批量函数, plugin_classes为None时重新收集所有插件"""
+        if plugin_classes is None:
+            self.batch_functions = {}
+            plugin_classes = self.plugin_classes
+        for plugin_class in plugin_classes:
+            try:
+                for batch_info in plugin_class.batch_functions():
+                    if batch_info.plugin is None:
+                        batch_info.plugin = plugin_class.__name__
+                    if (
+                        batch_info.name in self.batch_functions
+                        or batch_info.name in self.static_functions
+                    ):
+                        print(
+                            f"Warning: Duplicate batch function name '{batch_info.name}' in plugin {plugin_class.__name__}"
+                        )
+                    elif inspect.iscoroutinefunction(batch_info.handler):
+                        print(
+                            f"Warning: Batch function '{batch_info.name}' in plugin {plugin_class.__name__} must be synchronous"
+                        )
+                    else:
+                        self.batch_functions[batch_info.name] = batch_info
+            except Exception as e:
+                print(
+                    f"Error collecting batch functions from {plugin_class.__name__}: {str(e)}"
+                )
+
+    def prepare_batch(self, nodes: Iterable[DataNode], scope: BatchScope) -> None:
+        """登记一组节点, 其中任一节点首次调用批量函数时对整组节点调用一次
+
+        没有该范围的批量函数时不读取nodes。
+        """
+        if any(info.scope is scope for info in self.batch_functions.values()):
+            self.batch_store.register(nodes, scope)
+
+    def bind_batch_function(
+        self, batch_info: BatchFunctionInfo, node: DataNode
+    ) -> UserFunctionInfo:
+        """创建节点上调用批量函数的无参函数, 返回该节点的批量结果"""
+        info = UserFunctionInfo(
+            name=batch_info.name,
+            arg_range=(0, 0),
+            description=batch_info.description,
+            handler=partial(self.batch_store.result, batch_info, node),
+            plugin=batch_info.plugin,
+            tree_dependent=True,  # 结果取决于同组的其他节点
+        )
+        if self.profiler is not None:
+            info.profiler = self.profiler
+        return info
+
+    def _collect_dynamic_namespaces(
+        self, plugin_classes: Optional[List[Type[FunctionPlugin]]] = None
+    ):
+        """以空节点调用一次插件的dynamic_functions, 记录其函数所在的命名空间
+
+        plugin_classes为None时重新收集所有插件。
+        """
+        if plugin_classes is None:
+            self.dynamic_namespaces = {}
+            plugin_classes = self.plugin_classes
+        for plugin_class in plugin_classes:
+            try:
+                namespaces = {
+                    function_namespace(info.name)
+                    for info in plugin_class.dynamic_functions(None)
+                }
+            except Exception:
+                # 动态函数需要节点才能创建, 在任何未找到的函数查找时创建
+                namespaces = {None}
+            for namespace in namespaces:
+                self.dynamic_namespaces.setdefault(namespace, []).append(plugin_class)
+
+    def _create_dynamic_functions(
+        self,
+        node: DataNode,
+        data_handler: DataHandler,
+        plugin_classes: Optional[List[Type[FunctionPlugin]]] = None,
+    ) -> List[UserFunctionInfo]:
+        """创建内置和插件的动态函数, plugin_classes为None时使用所有插件"""
+        # 内置动态函数
+        # builtin_dynamic = [
+        #     UserFunctionInfo(
+        #         name="node:name",
+        #         arg_range=[0, 0],
+        #         description="Get current node name",
+        #         handler=lambda: node.name,
+        #     ),
+        #     UserFunctionInfo(
+        #         name="node:path",
+        #         arg_range=[0, 0],
+        #         description="Get node absolute path",
+        #         handler=lambda: node.get_absolute_path(),
+        #     ),
+        #     UserFunctionInfo(
+        #         name="node:get_rel",
+        #         arg_range=[1, 1],
+        #         description="Find node by relative path",
+        #         handler=lambda x: self.data_handler.find_by_file_path(node, x)[0],
+        #     ),
+        #     UserFunctionInfo(
+        #         name="node:get_attr",
+        #         arg_range=[2, 2],
+        #         description="Get node attribute",
+        #         handler=lambda x, attr: str(x.data.get(attr, "")),
+        #     ),
+        # ]
+
+        # 插件动态函数
+        plugin_dynamic = []
+        if plugin_classes is None:
+            plugin_classes = self.plugin_classes
+        for plugin_class in plugin_classes:
+            try:
+                # 获取插件的动态函数
+                funcs = plugin_class.dynamic_functions(node)
+                for func_info in funcs:
+                    self._attach(func_info, plugin_class)
+                plugin_dynamic.extend(funcs)
+            except Exception as e:
+                print(
+                    f"Error creating dynamic functions from {plugin_class.__name__}: {str(e)}"
+                )
+
+        return plugin_dynamic
+
+    def create_resolver(
+        self, node: DataNode, data_handler: DataHandler
+    ) -> UserFunctionResolver:
+        """创建函数解析器
+
+        解析器共享静态函数表, 动态函数在首次查找其命名空间中的函数时才创建。
+        """
+        return OverlayFunctionResolver(self, node, data_handler)
+
+    def reload_plugins(self):
+        """重新加载所有插件"""
+        # 清理现有插件
+        for plugin_class in self.plugin_classes:
+            try:
+                plugin_class.on_plugin_unload()
+            except Exception as e:
+                print(f"Error unloading plugin {plugin_class.__name__}: {str(e)}")
+
+        self.plugin_classes.clear()
+        self._load_plugins()
+        self._collect_static_functions()
+        self._collect_dynamic_namespaces()
+        self._collect_batch_functions()
+
+
+class _BatchGroup:
+    """一组批量计算的节点, 以弱引用保存, 不延长数据树的生命周期"""
+
+    __slots__ = ("refs",)
+
+    def __init__(self, nodes: List[DataNode]) -> None:
+        self.refs: Tuple["weakref.ref[DataNode]", ...] = tuple(
+            weakref.ref(node) for node in nodes
+        )
+
+    def nodes(self) -> List[DataNode]:
+        return [node for node in (ref() for ref in self.refs) if node is not None]
+
+
+class BatchFunctionStore:
+    """批量函数的节点分组与结果
+
+    分组与结果均以节点的弱引用为键, 数据树释放后随之释放, 重新渲染时创建的
+    新数据树会重新登记分组。
+    """
+
+    def __init__(self) -> None:
+        self._groups: Dict[BatchScope, "weakref.WeakKeyDictionary[DataNode, _BatchGroup]"] = {
+            scope: weakref.WeakKeyDictionary() for scope in BatchScope
+        }
+        self._results: Dict[str, "weakref.WeakKeyDictionary[DataNode, Any]"] = {}
+        self.batches = 0  # 批量函数handler的调用次数
+
+    def register(self, nodes: Iterable[DataNode], scope: BatchScope) -> None:
+        """登记一组节点, 节点已属于同一范围的其他分组时以新分组为准"""
+        members = list(nodes)
+        group = _BatchGroup(members)
+        groups = self._groups[scope]
+        for node in members:
+            groups[node] = group
+
+    def result(self, batch_info: BatchFunctionInfo, node: DataNode) -> Any:
+        """返回节点的批量结果, 首次调用时对节点所在的整组调用handler
+
+        Raises:
+            ValueError: handler返回的结果数量与节点数量不一致
+        """
+        results = self._results.setdefault(batch_info.name, weakref.WeakKeyDictionary())
+        if node in results:
+            return results[node]
+
+        group = self._groups[batch_info.scope].get(node)
+        nodes = group.nodes() if group is not None else [node]
+        values = list(batch_info.handler(nodes))
+        self.batches += 1
+        if len(values) != len(nodes):
+            raise ValueError(
+                f"Batch function {batch_info.name} returned {len(values)} results for {len(nodes)} nodes"
+            )
+        for member, value in zip(nodes, values):
+            results[member] = value
+        return results[node]
+
+
+def function_namespace(name: str) -> str:
+    """函数名中:之前的命名空间, 没有命名空间时为空字符串"""
+    namespace, separator, _ = name.partition(":")
+    return namespace if separator else ""
+
+
+class OverlayFunctionResolver(UserFunctionResolver):
+    """叠加在共享静态函数表之上的节点函数解析器
+
+    创建时不复制静态函数, 也不创建动态函数; 查找静态表中没有的函数时,
+    先导入其命名空间中延迟加载的插件, 再调用命名空间内插件的dynamic_functions(node),
+    每个插件只创建一次。
+    """
+
+    def __init__(
+        self,
+        factory: UserFunctionResolverFactory,
+        node: Optional[DataNode] = None,
+        data_handler: Optional[DataHandler] = None,
+    ):
+        """
+        Args:
+            factory: 提供静态函数表与动态函数插件的工厂
+            node: 解析器所属的数据节点
+            data_handler: 数据处理器, 传给动态函数的创建
+        """
+        self.node = node
+        self.tree_dependent = False
+        # 已创建的动态函数与通过add_function添加的函数
+        self.info: Dict[str, UserFunctionInfo] = {}
+        self._factory = factory
+        self._data_handler = data_handler
+        self._bound: Set[Type[FunctionPlugin]] = set()
+
+    def find_info(self, func_name: str) -> Optional[UserFunctionInfo]:
+        info = self._factory.static_table.get(func_name)
+        if info is None:
+            info = self.info.get(func_name)
+        if info is None and self._factory.load_namespace(function_namespace(func_name)):
+            info = self._factory.static_table.get(func_name)
+        if info is None and self.node is not None:
+            batch_info = self._factory.batch_functions.get(func_name)
+            if batch_info is not None:
+                info = self._factory.bind_batch_function(batch_info, self.node)
+                self.info[func_name] = info
+        if info is None:
+            self._bind(function_namespace(func_name))
+            self._bind(None)
+            info = self.info.get(func_name)
+        if info is not None and info.tree_dependent:
+            self.mark_tree_dependent()
+        return info
+
+    def mark_tree_dependent(self) -> None:
+        super().mark_tree_dependent()
+        if self.node is not None:
+            self._factory.tree_dependent_nodes.add(self.node)
+
+    def add_function(self, function_info: UserFunctionInfo) -> bool:
+        if function_info.name in self._factory.static_table:
+            raise UserFunctionError(
+                UserFunctionErrorType.RESOLVER_INIT_ERROR,
+                message=f"Duplicate function found: {function_info.name}",
+            )
+        return super().add_function(function_info)
+
+    def _bind(self, namespace: Optional[str]) -> None:
+        """创建命名空间内尚未创建的插件动态函数, 插件的其他命名空间的函数一并加入"""
+        plugin_classes = [
+            plugin_class
+            for plugin_class in self._factory.dynamic_namespaces.get(namespace, [])
+            if plugin_class not in self._bound
+        ]
+        if not plugin_classes:
+            return
+        self._bound.update(plugin_classes)
+        for info in self._factory._create_dynamic_functions(
+            self.node, self._data_handler, plugin_classes
+        ):
+            self.add_function(info)
@@ -1,3 +1,51 @@
-"""
-Generic library for common functions used across the project.
-"""
\ No newline at end of file
+"""
+Generic library for common functions used across the project.
+"""
+
+import hashlib
+from typing import Any, Callable, Mapping
+
+
+def canonical_fingerprint(value: Any) -> str:
+    """计算数据的规范化指纹
+
+    字典按键排序后编码, 因此键的插入顺序不影响结果; 不同类型的相等值
+    （如1与"1"）得到不同的指纹。用于构建渲染缓存键。
+
+    Args:
+        value: 由字典、列表、集合及标量组成的数据
+
+    Returns:
+        str: 十六进制的指纹字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _feed(digest.update, value)
+    return digest.hexdigest()
+
+
+def _feed(update: Callable[[bytes], None], value: Any) -> None:
+    """将值的规范化编码写入摘要"""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        update(f"{type(value).__name__}:{value!r};".encode("utf-8"))
+    elif isinstance(value, Mapping):
+        update(f"map:{len(value)}{{".encode("utf-8"))
+        # 以键的指纹排序, 键可以是不可相互比较的类型
+        for key_print, item in sorted(
+            ((canonical_fingerprint(key), item) for key, item in value.items()),
+            key=lambda entry: entry[0],
+        ):
+            update(key_print.encode("ascii"))
+            _feed(update, item)
+        update(b"}")
+    elif isinstance(value, (list, tuple)):
+        update(f"seq:{len(value)}[".encode("utf-8"))
+        for item in value:
+            _feed(update, item)
+        update(b"]")
+    elif isinstance(value, (set, frozenset)):
+        update(f"set:{len(value)}(".encode("utf-8"))
+        for item_print in sorted(canonical_fingerprint(item) for item in value):
+            update(item_print.encode("ascii"))
+        update(b")")
+    else:
+        update(f"{type(value).__name__}:{value!r};".encode("utf-8"))
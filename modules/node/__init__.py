@@ -1,3 +1,3 @@
-"""
-Node Package - Contains AST node definitions and related classes
-"""
+"""
+Node Package - Contains AST node definitions and related classes
+"""
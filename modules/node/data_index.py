@@ -0,0 +1,215 @@
+"""
+Data Path Index Module
+数据树的路径索引, 在create_data_tree时为每棵树构建一次,
+用于将XPath解析为节点或节点数据中的值, 避免每次查找都遍历整棵树。
+
+路径语法:
+    title                   当前节点数据中的键
+    info/version            嵌套数据（字典按键, 列表按下标）
+    ../b.yaml/title         父节点的子节点b.yaml的数据
+    /services.yaml/port     从树的根节点开始
+    .                       当前节点的数据
+
+路径的各段先按子节点名称匹配, 第一个不是子节点名称的段开始按数据键查找。
+同一父节点下同名的子节点只能通过路径访问第一个。
+
+索引还提供按数据属性查找节点（data[key] == value）, 每个键的属性索引在首次查找时构建。
+数据树重新创建时索引随之重建。
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from .data_node import DataNode
+from .expr_node import resolve_data_path
+from ..lib import canonical_fingerprint
+
+NodePath = Tuple[str, ...]
+
+
+class DataPathIndex:
+    """数据树路径索引: 节点路径到节点, 节点到其路径"""
+
+    def __init__(self, root: DataNode) -> None:
+        """
+        Args:
+            root: 数据树的根节点, 根节点的路径为空元组
+        """
+        self.root = root
+        self._nodes: Dict[NodePath, DataNode] = {}
+        self._paths: Dict[int, NodePath] = {}
+        self._order: List[DataNode] = []  # 深度优先的节点顺序
+        # 数据键 -> 属性值的键 -> 节点, 按需构建
+        self._attributes: Dict[str, Dict[Hashable, List[DataNode]]] = {}
+        self.stale = False  # 树结构已被修改, 下次使用时重建
+        self._build()
+
+    def _build(self) -> None:
+        """深度优先遍历整棵树, 非递归以支持较深的树"""
+        stack: List[Tuple[DataNode, NodePath]] = [(self.root, ())]
+        while stack:
+            node, path = stack.pop()
+            self._order.append(node)
+            self._nodes.setdefault(path, node)
+            self._paths.setdefault(id(node), path)
+            for child in reversed(node.children):
+                if isinstance(child, DataNode):
+                    stack.append((child, path + (child.name,)))
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def node_at(self, path: NodePath) -> Optional[DataNode]:
+        """按节点路径查找节点"""
+        return self._nodes.get(path)
+
+    def path_of(self, node: DataNode) -> Optional[NodePath]:
+        """返回节点在树中的路径, 节点不在树中时返回None"""
+        return self._paths.get(id(node))
+
+    def find(self, key: str, value: Any) -> List[DataNode]:
+        """返回数据中key的值等于value的所有节点, 按深度优先顺序
+
+        Args:
+            key: 数据键
+            value: 要匹配的值, 布尔值只匹配布尔值, 非标量按内容比较
+
+        Returns:
+            List[DataNode]: 匹配的节点, 没有匹配时为空列表
+        """
+        by_value = self._attributes.get(key)
+        if by_value is None:
+            by_value = self._attributes[key] = self._build_attribute(key)
+        return list(by_value.get(_attribute_key(value), ()))
+
+    def find_one(self, key: str, value: Any) -> Optional[DataNode]:
+        """返回数据中key的值等于value的第一个节点, 没有时返回None"""
+        nodes = self.find(key, value)
+        return nodes[0] if nodes else None
+
+    def _build_attribute(self, key: str) -> Dict[Hashable, List[DataNode]]:
+        by_value: Dict[Hashable, List[DataNode]] = {}
+        for node in self._order:
+            if isinstance(node.data, dict) and key in node.data:
+                by_value.setdefault(_attribute_key(node.data[key]), []).append(node)
+        return by_value
+
+    def resolve(self, node: DataNode, parts: List[Any]) -> Any:
+        """以node为当前节点解析XPath
+
+        Args:
+            node: 当前节点
+            parts: XPath的各部分, 字符串部分可以包含以/分隔的多段
+
+        Returns:
+            Any: 路径指向的节点数据或数据中的值
+
+        Raises:
+            ValueError: 如果路径不存在
+        """
+        segments = _split(parts)
+        start = self.path_of(node)
+        if start is None:
+            raise ValueError(f"节点 {node.name} 不在索引的数据树中")
+
+        path = list(start)
+        index = 0
+        if segments and segments[0] == "":
+            path = []  # 以/开头的绝对路径
+        while index < len(segments):
+            segment = segments[index]
+            if segment in ("", "."):
+                index += 1
+            elif segment == "..":
+                if not path:
+                    raise ValueError(f"XPath超出数据树的根节点: {_join(parts)}")
+                path.pop()
+                index += 1
+            elif isinstance(segment, str) and tuple(path) + (segment,) in self._nodes:
+                path.append(segment)
+                index += 1
+            else:
+                break
+
+        target = self._nodes[tuple(path)]
+        return resolve_data_path(target.data, segments[index:])
+
+
+def _attribute_key(value: Any) -> Hashable:
+    """属性值的索引键: 数值与字符串按值（1与1.0相同）, 布尔值与其他数据单独区分"""
+    if isinstance(value, bool) or value is None:
+        return (type(value), value)
+    if isinstance(value, (str, int, float)):
+        return value
+    return ("fingerprint", canonical_fingerprint(value))
+
+
+def _split(parts: List[Any]) -> List[Any]:
+    segments: List[Any] = []
+    for part in parts:
+        if isinstance(part, str):
+            segments.extend(part.split("/"))
+        else:
+            segments.append(part)
+    return segments
+
+
+def _join(parts: List[Any]) -> str:
+    return "/".join(str(part) for part in parts)
+
+
+def _root(node: DataNode) -> DataNode:
+    current = node
+    while current.parent is not None and isinstance(current.parent, DataNode):
+        current = current.parent
+    return current
+
+
+def find_index(node: DataNode) -> Optional[DataPathIndex]:
+    """沿父节点找到树的根节点, 返回其路径索引, 索引已失效时先按当前结构重建"""
+    root = _root(node)
+    if root.path_index is not None and root.path_index.stale:
+        root.path_index = DataPathIndex(root)
+    return root.path_index
+
+
+def tree_index(node: DataNode) -> DataPathIndex:
+    """返回节点所在树的索引, 树尚未建立索引时（如手动创建的树）为其构建并缓存在根节点上
+
+    手动修改已建立索引的树后需要调用invalidate_index。
+    """
+    root = _root(node)
+    if root.path_index is None or root.path_index.stale:
+        root.path_index = DataPathIndex(root)
+    return root.path_index
+
+
+def invalidate_index(node: DataNode) -> None:
+    """标记节点所在树的索引失效, 下次使用时按当前结构重新构建
+
+    只标记而不丢弃索引: 丢弃后resolve_xpath会把树当作未建立索引的树,
+    只在当前节点的数据中查找。
+    """
+    index = _root(node).path_index
+    if index is not None:
+        index.stale = True
+
+
+def resolve_xpath(node: DataNode, parts: List[Any]) -> Any:
+    """解析相对于node的XPath
+
+    树已建立索引时使用索引解析; 否则（如手动创建的节点）只在当前节点的数据中查找。
+
+    Args:
+        node: 当前节点
+        parts: XPath的各部分
+
+    Returns:
+        Any: 路径指向的值
+
+    Raises:
+        ValueError: 如果路径不存在
+    """
+    index = find_index(node)
+    if index is None or index.path_of(node) is None:
+        return resolve_data_path(node.data, parts)
+    return index.resolve(node, parts)
@@ -1,47 +1,103 @@
-"""
-通用数据节点类，用于表示数据结构中的节点。
-该类可以包含任意类型的数据，并且可以添加子节点。
-它主要用于处理数据结构中的目录和文件节点。
-"""
-
-from enum import Enum
-from typing import Optional, List, Dict, Any, TypeVar, Iterable
-from dataclasses import dataclass
-
-from .file_node import FileType, FileNode, DirectoryNode, T
-
-
-class DataNode(DirectoryNode["DataNode"]):
-    def __init__(
-        self, data: Dict[str, Any], name: str, parent: Optional["DataNode"] = None
-    ):
-        super().__init__(name, parent)
-        self.data: Dict[str, Any] = data
-        self.children_group_number: List[int] = [] # 记录子节点组的数量
-        
-    def serialize_tree(self, indent: int = 0) -> str:
-        """Serialize the data node to a dictionary representation."""
-        return f"""
-{" " * indent}{{
-{"  " * (indent)}"name": {self.name},
-{"  " * (indent)}"data": {self.data},
-{"  " * (indent)}"children": {''.join([child.serialize_tree(indent + 2) for child in self.children])}
-{" " * indent}}}
-"""
-
-    def iter_data_nodes(self) -> Iterable["DataNode"]:
-        """深度优先遍历所有数据节点"""
-        for child in self.children:
-            if isinstance(child, DataNode):
-                yield from child.iter_data_nodes()
-        yield self
-
-    def get_data(self) -> Iterable[Dict[str, Any]]:
-        """深度优先遍历，获取所有数据节点的数据"""
-        for node in self.iter_data_nodes():
-            yield node.data
-
-    from ..jinja.user_func.func_handler import (
-        UserFunctionResolver,
-        UserFunctionInfo,
-    )
+"""
+通用数据节点类，用于表示数据结构中的节点。
+该类可以包含任意类型的数据，并且可以添加子节点。
+它主要用于处理数据结构中的目录和文件节点。
+"""
+
+from enum import Enum
+from typing import Optional, List, Dict, Any, Tuple, TypeVar, Iterable, TYPE_CHECKING
+from dataclasses import dataclass
+import hashlib
+
+from .file_node import FileType, FileNode, DirectoryNode, T
+from ..lib import canonical_fingerprint
+
+if TYPE_CHECKING:
+    from .data_index import DataPathIndex
+
+
+class DataNode(DirectoryNode["DataNode"]):
+    def __init__(
+        self, data: Dict[str, Any], name: str, parent: Optional["DataNode"] = None
+    ):
+        super().__init__(name, parent)
+        self.data: Dict[str, Any] = data
+        self.children_group_number: List[int] = [] # 记录子节点组的数量
+        self.path_index: Optional["DataPathIndex"] = None  # 根节点上的路径索引, 由数据处理器构建
+        # 子树内容指纹（数据与子节点指纹的Merkle哈希）, 由compute_fingerprints计算
+        self.fingerprint: Optional[str] = None
+        
+    def serialize_tree(self, indent: int = 0) -> str:
+        """Serialize the data node to a dictionary representation."""
+        return f"""
+{" " * indent}{{
+{"  " * (indent)}"name": {self.name},
+{"  " * (indent)}"data": {self.data},
+{"  " * (indent)}"children": {''.join([child.serialize_tree(indent + 2) for child in self.children])}
+{" " * indent}}}
+"""
+
+    def iter_data_nodes(self) -> Iterable["DataNode"]:
+        """深度优先遍历所有数据节点"""
+        for child in self.children:
+            if isinstance(child, DataNode):
+                yield from child.iter_data_nodes()
+        yield self
+
+    def compute_fingerprints(self) -> str:
+        """自底向上计算子树中所有节点的内容指纹
+
+        节点指纹由节点数据（包含模板路径）的规范化指纹、子节点组的划分以及
+        按组顺序排列的子节点指纹组成, 子树内容相同的节点指纹相同。
+        共享同一数据对象的节点只计算一次数据指纹。
+
+        Returns:
+            str: 本节点的指纹
+        """
+        data_fingerprints: Dict[int, str] = {}
+        stack: List[Tuple["DataNode", bool]] = [(self, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                node._update_own_fingerprint(data_fingerprints)
+                continue
+            stack.append((node, True))
+            stack.extend(
+                (child, False) for child in node.children if isinstance(child, DataNode)
+            )
+        return self.fingerprint  # type: ignore
+
+    def update_fingerprint(self) -> None:
+        """节点数据变化后重新计算本节点及其祖先的指纹, 子节点的指纹保持不变"""
+        node: Optional[DataNode] = self
+        while isinstance(node, DataNode):
+            node._update_own_fingerprint({})
+            node = node.parent  # type: ignore
+
+    def _update_own_fingerprint(self, data_fingerprints: Dict[int, str]) -> None:
+        data_fingerprint = data_fingerprints.get(id(self.data))
+        if data_fingerprint is None:
+            data_fingerprint = data_fingerprints[id(self.data)] = canonical_fingerprint(
+                self.data
+            )
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(data_fingerprint.encode("ascii"))
+        digest.update(repr(self.children_group_number).encode("ascii"))
+        for child in self.children:
+            if isinstance(child, DataNode):
+                if child.fingerprint is None:
+                    child.compute_fingerprints()
+                digest.update(child.fingerprint.encode("ascii"))  # type: ignore
+            else:
+                digest.update(b"-")
+        self.fingerprint = digest.hexdigest()
+
+    def get_data(self) -> Iterable[Dict[str, Any]]:
+        """深度优先遍历，获取所有数据节点的数据"""
+        for node in self.iter_data_nodes():
+            yield node.data
+
+    from ..jinja.user_func.func_handler import (
+        UserFunctionResolver,
+        UserFunctionInfo,
+    )
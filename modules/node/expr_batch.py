@@ -0,0 +1,323 @@
+"""
+Expression Batch Module
+对一组数据节点批量求值同一个表达式（求值形式）。
+
+表达式中的XPath被提取为列, 算术、比较与逻辑运算按列计算: 安装了NumPy时
+数值列使用数组运算, 否则（或列中包含非数值数据时）逐行使用ExpressionOperator计算。
+包含用户函数或动态路径的表达式不做批量求值, 由调用者逐个节点求值。
+"""
+
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Union
+import weakref
+
+try:
+    import numpy as np
+except ImportError:  # NumPy是可选依赖
+    np = None
+
+from .data_node import DataNode
+from .expr_node import (
+    ExprASTNode,
+    XPathNode,
+    ExpressionNode,
+    ExpressionOperator,
+    LiteralNode,
+)
+from .data_index import resolve_xpath
+from .expr_compiler import CompiledExpression
+
+# lookup未找到批量结果时的返回值
+MISSING = object()
+
+# 整数数组运算结果超过该范围时改为逐行计算, 避免int64溢出
+_INT_LIMIT = 2**62
+
+_NUMPY_OPERATORS = (
+    {
+        ExpressionOperator.ADD: np.add,
+        ExpressionOperator.SUB: np.subtract,
+        ExpressionOperator.MUL: np.multiply,
+        ExpressionOperator.DIV: np.true_divide,
+        ExpressionOperator.MOD: np.mod,
+        ExpressionOperator.AND: np.logical_and,
+        ExpressionOperator.OR: np.logical_or,
+        ExpressionOperator.EQ: np.equal,
+        ExpressionOperator.NEQ: np.not_equal,
+        ExpressionOperator.LT: np.less,
+        ExpressionOperator.GT: np.greater,
+        ExpressionOperator.LE: np.less_equal,
+        ExpressionOperator.GE: np.greater_equal,
+    }
+    if np is not None
+    else {}
+)
+
+
+class _NotBatchable(Exception):
+    """表达式包含不能按列计算的部分"""
+
+
+@dataclass
+class _Scalar:
+    """对所有行相同的值"""
+
+    value: Any
+
+
+# 一列值: 标量、Python列表或NumPy数组
+Column = Union[_Scalar, List[Any], Any]
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class ExprBatchEvaluator:
+    """批量表达式求值器"""
+
+    def __init__(self, use_numpy: bool = True) -> None:
+        """
+        Args:
+            use_numpy: 是否在NumPy可用时使用数组运算
+        """
+        self.use_numpy = use_numpy and np is not None
+
+    def evaluate(
+        self, compiled: CompiledExpression, nodes: Sequence[DataNode]
+    ) -> Optional[List[Any]]:
+        """对每个节点求值表达式
+
+        Args:
+            compiled: 编译后的表达式
+            nodes: 数据节点, XPath相对于每个节点解析
+
+        Returns:
+            Optional[List[Any]]: 与nodes一一对应的结果; 表达式不能批量求值,
+                或某个节点求值失败时返回None, 由调用者逐个节点求值以得到准确的错误
+        """
+        root, _ = compiled.optimized(True)
+        try:
+            column = self._column(root, nodes)
+            if isinstance(column, _Scalar):
+                return [column.value] * len(nodes)
+            if self.use_numpy and isinstance(column, np.ndarray):
+                return column.tolist()
+            return list(column)
+        except Exception:
+            return None
+
+    def _column(self, node: ExprASTNode, nodes: Sequence[DataNode]) -> Column:
+        if isinstance(node, LiteralNode):
+            return _Scalar(node.data_type(node.value))
+
+        if isinstance(node, XPathNode):
+            if not all(isinstance(part, LiteralNode) for part in node.parts):
+                raise _NotBatchable()
+            parts = [part.data_type(part.value) for part in node.parts]  # type: ignore
+            values = [resolve_xpath(data_node, parts) for data_node in nodes]
+            return self._to_array(values)
+
+        if isinstance(node, ExpressionNode):
+            operator = ExpressionOperator(node.operator)
+            operands = [self._column(operand, nodes) for operand in node.operands]
+            if self.use_numpy:
+                result = self._apply_numpy(operator, operands)
+                if result is not None:
+                    return result
+            return self._apply_rows(operator, operands, len(nodes))
+
+        # 用户函数可能依赖节点或有副作用, 不批量调用
+        raise _NotBatchable()
+
+    def _to_array(self, values: List[Any]) -> Column:
+        """数值列转换为NumPy数组, 其他数据保持为列表
+
+        只转换类型相同的列: 整数与浮点数混合的列转换后整数会变为浮点数,
+        结果类型与逐个节点求值不同; 超出int64范围的整数同样保持为列表。
+        """
+        if not self.use_numpy or not values:
+            return values
+        kinds = {type(value) for value in values}
+        if len(kinds) != 1 or not kinds <= {int, float, bool}:
+            return values
+        if int in kinds and any(abs(value) >= _INT_LIMIT for value in values):
+            return values
+        array = np.asarray(values)
+        if array.dtype.kind in "biuf":
+            return array
+        return values
+
+    @staticmethod
+    def _is_numeric(column: Column, allow_bool: bool) -> bool:
+        kinds = "biuf" if allow_bool else "iuf"
+        if isinstance(column, _Scalar):
+            value = column.value
+            if isinstance(value, bool):
+                return allow_bool
+            return isinstance(value, (int, float)) and abs(value) < _INT_LIMIT
+        return isinstance(column, np.ndarray) and column.dtype.kind in kinds
+
+    def _apply_numpy(
+        self, operator: ExpressionOperator, operands: List[Column]
+    ) -> Optional[Column]:
+        """以数组运算计算, 与Python语义可能不一致时返回None"""
+        if all(isinstance(operand, _Scalar) for operand in operands):
+            return None
+        arithmetic = operator in (
+            ExpressionOperator.ADD,
+            ExpressionOperator.SUB,
+            ExpressionOperator.MUL,
+            ExpressionOperator.DIV,
+            ExpressionOperator.MOD,
+        )
+        # 布尔值的算术运算在NumPy中是逻辑运算, 与Python不同
+        if not all(self._is_numeric(operand, not arithmetic) for operand in operands):
+            return None
+        arrays = [
+            operand.value if isinstance(operand, _Scalar) else operand
+            for operand in operands
+        ]
+
+        # 除零等浮点错误改为逐行计算, 以得到与单节点求值一致的异常
+        with np.errstate(all="raise"):
+            try:
+                if operator is ExpressionOperator.NOT:
+                    if len(arrays) != 1:
+                        return None
+                    return np.logical_not(arrays[0])
+                if operator is ExpressionOperator.SUB and len(arrays) == 1:
+                    result = np.negative(arrays[0])
+                elif operator in (
+                    ExpressionOperator.EQ,
+                    ExpressionOperator.NEQ,
+                    ExpressionOperator.LT,
+                    ExpressionOperator.GT,
+                    ExpressionOperator.LE,
+                    ExpressionOperator.GE,
+                ):
+                    if len(arrays) < 2:
+                        return None
+                    # 链式比较: 每对相邻操作数均满足
+                    compare = _NUMPY_OPERATORS[operator]
+                    result = compare(arrays[0], arrays[1])
+                    for left, right in zip(arrays[1:], arrays[2:]):
+                        result = np.logical_and(result, compare(left, right))
+                    return result
+                else:
+                    func = _NUMPY_OPERATORS[operator]
+                    result = arrays[0]
+                    for array in arrays[1:]:
+                        result = func(result, array)
+            except FloatingPointError:
+                return None
+
+        if arithmetic and np.asarray(result).dtype.kind in "iu":
+            # 整数运算可能溢出, 用浮点结果检查范围
+            check = np.asarray(arrays[0], dtype=float)
+            if operator is ExpressionOperator.SUB and len(arrays) == 1:
+                check = -check
+            else:
+                func = _NUMPY_OPERATORS[operator]
+                for array in arrays[1:]:
+                    check = func(check, np.asarray(array, dtype=float))
+            if np.any(np.abs(check) >= _INT_LIMIT):
+                return None
+        return result
+
+    @staticmethod
+    def _apply_rows(
+        operator: ExpressionOperator, operands: List[Column], size: int
+    ) -> Column:
+        """逐行使用ExpressionOperator计算"""
+        if all(isinstance(operand, _Scalar) for operand in operands):
+            return _Scalar(
+                operator.apply([partial(_identity, operand.value) for operand in operands])  # type: ignore
+            )
+        rows = [
+            [operand.value] * size
+            if isinstance(operand, _Scalar)
+            # NumPy标量的运算语义与Python不同, 转换回Python值
+            else (operand.tolist() if np is not None and isinstance(operand, np.ndarray) else operand)
+            for operand in operands
+        ]
+        return [
+            operator.apply([partial(_identity, column[index]) for column in rows])
+            for index in range(size)
+        ]
+
+
+@dataclass
+class ExprBatchStats:
+    """批量求值统计"""
+
+    batches: int = 0  # 批量求值的次数
+    rows: int = 0  # 批量求值得到的节点结果数量
+    hits: int = 0  # 直接使用批量结果的次数
+    fallbacks: int = 0  # 不能批量求值, 回退到逐个节点求值的次数
+
+    def __str__(self) -> str:
+        return (
+            f"expr batch: {self.batches} batches, {self.rows} rows, "
+            f"{self.hits} hits, {self.fallbacks} fallbacks"
+        )
+
+
+class ExprBatchCache:
+    """同级节点的批量求值结果
+
+    某个节点首次求值表达式时, 对其所有同级数据节点批量求值并缓存,
+    之后渲染同级节点时直接取得结果。表达式与节点以弱引用为键,
+    数据树或编译缓存释放后结果随之释放。
+    """
+
+    def __init__(self, evaluator: Optional[ExprBatchEvaluator] = None) -> None:
+        self.evaluator = evaluator or ExprBatchEvaluator()
+        self._results: "weakref.WeakKeyDictionary[CompiledExpression, weakref.WeakKeyDictionary]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # 已尝试批量求值但失败的父节点, 不再重复尝试
+        self._failed: "weakref.WeakKeyDictionary[CompiledExpression, weakref.WeakSet]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.stats = ExprBatchStats()
+
+    def lookup(self, compiled: CompiledExpression, node: Optional[DataNode]) -> Any:
+        """取得节点的批量求值结果
+
+        Args:
+            compiled: 编译后的表达式
+            node: 当前渲染的数据节点
+
+        Returns:
+            Any: 求值结果, 不能批量求值时返回MISSING
+        """
+        if node is None or node.parent is None:
+            return MISSING
+        per_node = self._results.get(compiled)
+        if per_node is not None and node in per_node:
+            self.stats.hits += 1
+            return per_node[node]
+
+        parent = node.parent
+        failed = self._failed.setdefault(compiled, weakref.WeakSet())
+        if parent in failed:
+            self.stats.fallbacks += 1
+            return MISSING
+
+        siblings = [child for child in parent.children if isinstance(child, DataNode)]
+        values = self.evaluator.evaluate(compiled, siblings)
+        if values is None:
+            failed.add(parent)
+            self.stats.fallbacks += 1
+            return MISSING
+
+        self.stats.batches += 1
+        self.stats.rows += len(values)
+        if per_node is None:
+            per_node = self._results[compiled] = weakref.WeakKeyDictionary()
+        for sibling, value in zip(siblings, values):
+            per_node[sibling] = value
+        self.stats.hits += 1
+        return per_node[node]
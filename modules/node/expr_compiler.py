@@ -0,0 +1,388 @@
+"""
+Expression Compiler Module
+将ExprAST树编译为嵌套闭包, 打印形式与ExprPrintVistor一致,
+求值形式按ExpressionOperator语义计算结果。
+编译前经ExprOptimizer化简, 编译结果按源数据的规范化指纹缓存,
+求值时只绑定当前节点的函数解析器。
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Set, Tuple
+import asyncio
+import inspect
+
+from .expr_node import (
+    ExprASTNode,
+    ExprASTParser,
+    XPathNode,
+    FunctionNode,
+    ExpressionNode,
+    ExpressionOperator,
+    LiteralNode,
+)
+from .data_index import resolve_xpath
+from .expr_optimizer import ExprOptimizer
+from ..jinja.user_func.func_handler import (
+    UserFunctionInfo,
+    UserFunctionResolver,
+    UserFunctionError,
+    UserFunctionErrorType,
+)
+from ..lib import canonical_fingerprint
+
+# 编译后的求值函数, 参数为当前节点的函数解析器和本次求值的公共子表达式结果槽
+CompiledFn = Callable[[UserFunctionResolver, List[Any]], Any]
+AsyncCompiledFn = Callable[[UserFunctionResolver, List[Any]], Awaitable[Any]]
+
+# 结果槽尚未求值的标记
+_UNSET = object()
+
+
+class CompiledExpression:
+    """编译后的表达式
+
+    提供两种求值形式: 打印形式与ExprPrintVistor一致, 返回表达式的字符串表示;
+    求值形式按ExpressionOperator语义计算结果, &&与||短路, XPath相对于当前节点解析
+    （见data_index）。
+    每种形式的同步/异步闭包在首次使用时生成。
+    """
+
+    __slots__ = ("ast", "_optimizer", "_optimized", "_forms", "_reads_outside", "__weakref__")
+
+    def __init__(self, ast: ExprASTNode, optimizer: ExprOptimizer) -> None:
+        """
+        Args:
+            ast: 解析得到的表达式树
+            optimizer: 生成闭包前化简表达式树的优化器
+        """
+        self.ast = ast
+        self._optimizer = optimizer
+        self._optimized: Dict[bool, Tuple[ExprASTNode, Set[int]]] = {}
+        # (求值形式, 异步) 到 (闭包, 结果槽数量)
+        self._forms: Dict[Tuple[bool, bool], Tuple[Any, int]] = {}
+        self._reads_outside: Optional[bool] = None
+
+    @property
+    def reads_outside_node(self) -> bool:
+        """求值形式中是否有XPath可能读取当前节点子树以外的数据
+
+        以..或/开头的路径, 以及各部分不全是常量的路径视为读取子树以外的数据。
+        """
+        if self._reads_outside is None:
+            self._reads_outside = _reads_outside_node(self.ast)
+        return self._reads_outside
+
+    def optimized(self, evaluate: bool) -> Tuple[ExprASTNode, Set[int]]:
+        """返回化简后的表达式树及共享节点
+
+        Args:
+            evaluate: 是否为求值形式
+        """
+        if evaluate not in self._optimized:
+            self._optimized[evaluate] = self._optimizer.optimize(self.ast, evaluate)
+        return self._optimized[evaluate]
+
+    def _form(self, evaluate: bool, is_async: bool) -> Tuple[Any, int]:
+        form = self._forms.get((evaluate, is_async))
+        if form is None:
+            root, shared = self.optimized(evaluate)
+            codegen = _CodeGen(shared, evaluate)
+            func = codegen.compile_async(root) if is_async else codegen.compile_sync(root)
+            form = self._forms[(evaluate, is_async)] = (func, len(codegen.slots))
+        return form
+
+    def __call__(self, resolver: UserFunctionResolver) -> Any:
+        """以给定的函数解析器求值打印形式"""
+        func, slots = self._form(False, False)
+        return func(resolver, [_UNSET] * slots)
+
+    async def evaluate_async(self, resolver: UserFunctionResolver) -> Any:
+        """异步求值打印形式, 支持async用户函数, 函数参数并发求值"""
+        func, slots = self._form(False, True)
+        return await func(resolver, [_UNSET] * slots)
+
+    def evaluate_value(self, resolver: UserFunctionResolver) -> Any:
+        """按操作符语义计算表达式的值"""
+        func, slots = self._form(True, False)
+        return func(resolver, [_UNSET] * slots)
+
+    async def evaluate_value_async(self, resolver: UserFunctionResolver) -> Any:
+        """evaluate_value的异步版本, 支持async用户函数"""
+        func, slots = self._form(True, True)
+        return await func(resolver, [_UNSET] * slots)
+
+
+def _reads_outside_node(node: ExprASTNode) -> bool:
+    if isinstance(node, XPathNode):
+        segments: List[Any] = []
+        for part in node.parts:
+            if not isinstance(part, LiteralNode):
+                return True
+            value = part.data_type(part.value)
+            segments.extend(value.split("/") if isinstance(value, str) else [value])
+        return bool(segments) and (segments[0] == "" or ".." in segments)
+    if isinstance(node, FunctionNode):
+        return any(_reads_outside_node(arg) for arg in node.args)
+    if isinstance(node, ExpressionNode):
+        return any(_reads_outside_node(operand) for operand in node.operands)
+    return False
+
+
+@dataclass
+class ExprCompilerStats:
+    """表达式编译缓存统计"""
+
+    hits: int = 0  # 命中已编译表达式的次数
+    compiles: int = 0  # 解析并编译表达式的次数
+
+    def __str__(self) -> str:
+        total = self.hits + self.compiles
+        rate = self.hits / total if total else 0.0
+        return f"expr compiler: {self.hits} hits, {self.compiles} compiles ({rate:.1%} hit rate)"
+
+
+class ExprCompiler:
+    """ExprAST编译器"""
+
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        pure_functions: Optional[Mapping[str, UserFunctionInfo]] = None,
+    ) -> None:
+        """
+        Args:
+            cache_size: 缓存的已编译表达式数量
+            pure_functions: 可在编译时折叠的纯静态函数, 函数名到函数信息
+        """
+        self.cache_size = cache_size
+        self._parser = ExprASTParser()
+        self._optimizer = ExprOptimizer(pure_functions)
+        # 指纹到编译结果的LRU缓存
+        self._cache: "OrderedDict[str, CompiledExpression]" = OrderedDict()
+        # 源对象标识到(源对象, 编译结果), 模板循环中反复传入同一个字典时跳过计算指纹;
+        # 保存源对象的引用以保证其标识在条目存活期间不被复用
+        self._by_id: Dict[int, Tuple[Any, CompiledExpression]] = {}
+        self.stats = ExprCompilerStats()
+
+    def compile(self, source: Any) -> CompiledExpression:
+        """解析并编译表达式源数据, 结果被缓存
+
+        Args:
+            source: 表达式字典或字面量
+
+        Returns:
+            CompiledExpression: 编译后的表达式
+
+        Raises:
+            ValueError: 如果表达式格式无效
+        """
+        entry = self._by_id.get(id(source))
+        if entry is not None and entry[0] is source:
+            self.stats.hits += 1
+            return entry[1]
+
+        fingerprint = canonical_fingerprint(source)
+        compiled = self._cache.get(fingerprint)
+        if compiled is not None:
+            self._cache.move_to_end(fingerprint)
+            self.stats.hits += 1
+        else:
+            compiled = CompiledExpression(self._parser.parse(source), self._optimizer)
+            self.stats.compiles += 1
+            self._cache[fingerprint] = compiled
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        if len(self._by_id) >= self.cache_size:
+            self._by_id.clear()
+        self._by_id[id(source)] = (source, compiled)
+        return compiled
+
+
+class _CodeGen:
+    """为一棵化简后的表达式树生成闭包
+
+    被多处引用的节点分配一个结果槽, 一次求值中只计算一次（且只在被用到时计算）。
+    """
+
+    def __init__(self, shared: Set[int], evaluate: bool) -> None:
+        self.shared = shared
+        self.evaluate = evaluate
+        self.slots: Dict[int, int] = {}
+        # 共享节点只生成一次闭包
+        self._compiled: Dict[int, Any] = {}
+
+    def compile_sync(self, node: ExprASTNode) -> CompiledFn:
+        """将AST节点编译为同步闭包"""
+        if id(node) not in self.shared:
+            return self._compile_sync(node)
+        if id(node) in self._compiled:
+            return self._compiled[id(node)]
+        func = self._compile_sync(node)
+        slot = self.slots.setdefault(id(node), len(self.slots))
+
+        def memoized(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+            value = frame[slot]
+            if value is _UNSET:
+                value = frame[slot] = func(resolver, frame)
+            return value
+
+        self._compiled[id(node)] = memoized
+        return memoized
+
+    def compile_async(self, node: ExprASTNode) -> AsyncCompiledFn:
+        """将AST节点编译为异步闭包, 子节点并发求值"""
+        if id(node) not in self.shared:
+            return self._compile_async(node)
+        if id(node) in self._compiled:
+            return self._compiled[id(node)]
+        func = self._compile_async(node)
+        slot = self.slots.setdefault(id(node), len(self.slots))
+
+        async def memoized(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+            # 并发的引用者等待同一个任务
+            task = frame[slot]
+            if task is _UNSET:
+                task = frame[slot] = asyncio.ensure_future(func(resolver, frame))
+            return await task
+
+        self._compiled[id(node)] = memoized
+        return memoized
+
+    def _compile_sync(self, node: ExprASTNode) -> CompiledFn:
+        if isinstance(node, LiteralNode):
+            value = node.data_type(node.value)
+            return lambda resolver, frame: value
+
+        if isinstance(node, XPathNode) and self.evaluate:
+            parts = [self.compile_sync(part) for part in node.parts]
+            return lambda resolver, frame: resolve_xpath(
+                _resolver_node(resolver), [part(resolver, frame) for part in parts]
+            )
+
+        if isinstance(node, XPathNode):
+            parts = [self.compile_sync(part) for part in node.parts]
+            return lambda resolver, frame: "/".join([part(resolver, frame) for part in parts])
+
+        if isinstance(node, ExpressionNode) and self.evaluate:
+            operator = ExpressionOperator(node.operator)
+            operands = [self.compile_sync(operand) for operand in node.operands]
+            return lambda resolver, frame: operator.apply(
+                [partial(operand, resolver, frame) for operand in operands]
+            )
+
+        if isinstance(node, ExpressionNode):
+            separator = str(node.operator)
+            operands = [self.compile_sync(operand) for operand in node.operands]
+            return lambda resolver, frame: (
+                f"({separator.join([str(operand(resolver, frame)) for operand in operands])})"
+            )
+
+        if isinstance(node, FunctionNode):
+            name = node.name
+            args = [self.compile_sync(arg) for arg in node.args]
+            argc = len(args)  # 参数数量固定, 在取得处理器时检查一次
+
+            def call_function(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                func_handler = resolver.get_handler(name, argc)
+                if func_handler and resolver.is_lazy(name):
+                    # 参数以无参函数传入, 由用户函数决定是否求值
+                    values = [partial(arg, resolver, frame) for arg in args]
+                else:
+                    values = [arg(resolver, frame) for arg in args]
+                if not func_handler:
+                    return f"{name}({', '.join(values)})"
+                result = func_handler(*values)
+                if inspect.isawaitable(result):
+                    # 异步函数只能在异步渲染中调用
+                    if inspect.iscoroutine(result):
+                        result.close()
+                    raise UserFunctionError(
+                        error_type=UserFunctionErrorType.EXECUTION_FAILED,
+                        message=f"Function {name} is async and requires async rendering",
+                    )
+                return result
+
+            return call_function
+
+        raise ValueError(f"未知节点类型: {type(node).__name__}")
+
+    def _compile_async(self, node: ExprASTNode) -> AsyncCompiledFn:
+        if isinstance(node, LiteralNode):
+            value = node.data_type(node.value)
+
+            async def literal(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                return value
+
+            return literal
+
+        if isinstance(node, XPathNode):
+            parts = [self.compile_async(part) for part in node.parts]
+
+            async def xpath(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                values = await _gather(parts, resolver, frame)
+                if self.evaluate:
+                    return resolve_xpath(_resolver_node(resolver), values)
+                return "/".join(values)
+
+            return xpath
+
+        if isinstance(node, ExpressionNode) and self.evaluate:
+            operator = ExpressionOperator(node.operator)
+            operands = [self.compile_async(operand) for operand in node.operands]
+
+            async def evaluate(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                return await operator.apply_async(
+                    [partial(operand, resolver, frame) for operand in operands]
+                )
+
+            return evaluate
+
+        if isinstance(node, ExpressionNode):
+            separator = str(node.operator)
+            operands = [self.compile_async(operand) for operand in node.operands]
+
+            async def expression(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                values = await _gather(operands, resolver, frame)
+                return f"({separator.join(str(value) for value in values)})"
+
+            return expression
+
+        if isinstance(node, FunctionNode):
+            name = node.name
+            args = [self.compile_async(arg) for arg in node.args]
+            argc = len(args)  # 参数数量固定, 在取得处理器时检查一次
+
+            async def call_function(resolver: UserFunctionResolver, frame: List[Any]) -> Any:
+                func_handler = resolver.get_handler(name, argc)
+                if func_handler and resolver.is_lazy(name):
+                    # 参数函数返回协程, 由用户函数决定是否等待
+                    values = [partial(arg, resolver, frame) for arg in args]
+                else:
+                    values = await _gather(args, resolver, frame)
+                if not func_handler:
+                    return f"{name}({', '.join(values)})"
+                result = func_handler(*values)
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+
+            return call_function
+
+        raise ValueError(f"未知节点类型: {type(node).__name__}")
+
+
+def _resolver_node(resolver: UserFunctionResolver) -> Any:
+    """取得解析器所属的节点, 求值形式中的XPath相对于该节点"""
+    if resolver.node is None:
+        raise ValueError("XPath求值需要所属数据节点的函数解析器")
+    return resolver.node
+
+
+async def _gather(
+    funcs: List[AsyncCompiledFn], resolver: UserFunctionResolver, frame: List[Any]
+) -> List[Any]:
+    """并发求值一组异步闭包"""
+    return list(await asyncio.gather(*(func(resolver, frame) for func in funcs)))
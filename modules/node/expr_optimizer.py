@@ -0,0 +1,185 @@
+"""
+Expression Optimizer Module
+在编译前化简ExprAST: 折叠只包含常量的表达式和纯静态函数调用,
+并对结构相同的子树做哈希合并（hash-consing）, 使其在一次求值中只计算一次。
+只有不包含非纯函数调用的子树会被合并, 非纯函数每次出现都会被调用。
+"""
+
+from collections import Counter
+from functools import partial
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Set, Tuple
+import inspect
+
+from .expr_node import (
+    ExprASTNode,
+    XPathNode,
+    FunctionNode,
+    ExpressionNode,
+    ExpressionOperator,
+    LiteralNode,
+)
+from ..jinja.user_func.func_handler import UserFunctionInfo
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class ConstantNode(LiteralNode):
+    """优化过程中折叠得到的常量, 值保持原样（不做类型转换）"""
+
+    def __init__(self, value: Any, source: Optional[Dict] = None):
+        super().__init__(value, source)
+        self.data_type = _identity  # type: ignore
+
+
+class ExprOptimizer:
+    """ExprAST优化器
+
+    打印形式下常量表达式折叠为其字符串形式（与ExprPrintVistor一致）,
+    求值形式下按ExpressionOperator语义计算; 纯函数在编译时以常量参数调用一次。只有标记为pure的静态函数会被折叠,
+    动态函数依赖当前节点, 始终在求值时调用。
+    """
+
+    def __init__(self, pure_functions: Optional[Mapping[str, UserFunctionInfo]] = None):
+        """
+        Args:
+            pure_functions: 可在编译时折叠的静态函数, 函数名到函数信息
+        """
+        self.pure_functions: Mapping[str, UserFunctionInfo] = pure_functions or {}
+
+    def optimize(
+        self, node: ExprASTNode, evaluate: bool = False
+    ) -> Tuple[ExprASTNode, Set[int]]:
+        """化简表达式树
+
+        Args:
+            node: 解析得到的表达式树
+            evaluate: 为True时按ExpressionOperator语义折叠常量表达式,
+                否则折叠为其字符串形式
+
+        Returns:
+            Tuple[ExprASTNode, Set[int]]: 化简后的树, 以及被多处引用的
+                (需要在一次求值中缓存结果的)节点对象id
+        """
+        interned: Dict[Hashable, ExprASTNode] = {}
+        uses: Counter = Counter()
+        root, _ = self._visit(node, evaluate, interned, uses)
+        shared = {id(interned[key]) for key, count in uses.items() if count > 1}
+        return root, shared
+
+    def _visit(
+        self,
+        node: ExprASTNode,
+        evaluate: bool,
+        interned: Dict[Hashable, ExprASTNode],
+        uses: Counter,
+    ) -> Tuple[ExprASTNode, Optional[Hashable]]:
+        """返回化简后的节点及其结构键, 子树包含非纯函数调用时结构键为None"""
+        if isinstance(node, LiteralNode):
+            return self._constant(node.data_type(node.value), node.source)
+
+        if isinstance(node, XPathNode):
+            parts, keys = self._visit_all(node.parts, evaluate, interned, uses)
+            values = self._constant_values(parts)
+            # 求值形式下XPath读取节点数据, 不能折叠
+            if not evaluate and values is not None and all(isinstance(v, str) for v in values):
+                return self._constant("/".join(values), node.source)
+            return self._intern(
+                ("xpath", *keys), XPathNode(parts, node.source), interned, uses
+            )
+
+        if isinstance(node, ExpressionNode):
+            operands, keys = self._visit_all(node.operands, evaluate, interned, uses)
+            values = self._constant_values(operands)
+            separator = str(node.operator)
+            if values is not None and not evaluate:
+                folded = f"({separator.join(str(value) for value in values)})"
+                return self._constant(folded, node.source)
+            if values is not None:
+                computed = self._fold_operator(node.operator, values)
+                if computed is not None:
+                    return self._constant(computed[0], node.source)
+            return self._intern(
+                ("expression", separator, *keys),
+                ExpressionNode(node.operator, operands, node.source),
+                interned,
+                uses,
+            )
+
+        if isinstance(node, FunctionNode):
+            args, keys = self._visit_all(node.args, evaluate, interned, uses)
+            values = self._constant_values(args)
+            if values is not None and node.name in self.pure_functions:
+                folded = self._fold_call(self.pure_functions[node.name], values)
+                if folded is not None:
+                    return self._constant(folded[0], node.source)
+            # 非纯函数（动态函数、未知或延迟加载的函数）每次调用的结果可能不同
+            return self._intern(
+                ("function", node.name, *keys) if node.name in self.pure_functions else None,
+                FunctionNode(node.name, args, node.source),
+                interned,
+                uses,
+            )
+
+        raise ValueError(f"未知节点类型: {type(node).__name__}")
+
+    def _visit_all(
+        self,
+        nodes: List[ExprASTNode],
+        evaluate: bool,
+        interned: Dict[Hashable, ExprASTNode],
+        uses: Counter,
+    ) -> Tuple[List[ExprASTNode], List[Optional[Hashable]]]:
+        results = [self._visit(node, evaluate, interned, uses) for node in nodes]
+        return [node for node, _ in results], [key for _, key in results]
+
+    @staticmethod
+    def _constant(value: Any, source: Optional[Dict]) -> Tuple[ExprASTNode, Hashable]:
+        return ConstantNode(value, source), ("constant", type(value).__name__, repr(value))
+
+    @staticmethod
+    def _constant_values(nodes: List[ExprASTNode]) -> Optional[List[Any]]:
+        """所有节点均为常量时返回其值, 否则返回None"""
+        if all(isinstance(node, ConstantNode) for node in nodes):
+            return [node.value for node in nodes]  # type: ignore
+        return None
+
+    @staticmethod
+    def _intern(
+        key: Optional[Hashable],
+        node: ExprASTNode,
+        interned: Dict[Hashable, ExprASTNode],
+        uses: Counter,
+    ) -> Tuple[ExprASTNode, Optional[Hashable]]:
+        """结构相同的子树共享同一个节点对象, 包含非纯函数调用的子树不共享"""
+        if key is None or None in key:  # type: ignore[operator]
+            return node, None
+        uses[key] += 1
+        return interned.setdefault(key, node), key
+
+    @staticmethod
+    def _fold_operator(operator: Any, values: List[Any]) -> Optional[Tuple[Any]]:
+        """计算常量表达式, 操作符无效或计算失败时不折叠, 留到求值时报错"""
+        try:
+            return (ExpressionOperator(operator).apply([partial(_identity, v) for v in values]),)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _fold_call(info: UserFunctionInfo, args: List[Any]) -> Optional[Tuple[Any]]:
+        """在编译时调用纯函数, 参数数量不符或调用失败时不折叠, 留到求值时报错"""
+        min_args, max_args = info.arg_range
+        if len(args) < min_args or (max_args is not None and len(args) > max_args):
+            return None
+        if info.is_async or info.lazy_args:
+            return None
+        try:
+            result = info.handler(*args)
+        except Exception:
+            return None
+        if inspect.isawaitable(result):
+            if inspect.iscoroutine(result):
+                result.close()
+            return None
+        return (result,)
@@ -0,0 +1,71 @@
+"""测试公共夹具: 以modules/examples中的示例数据构建生成器"""
+
+import shutil
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pytest
+
+from modules.core.data_driven_generator import (
+    DataDrivenGenerator,
+    DataDrivenGeneratorConfig,
+)
+from modules.core.types import DataHandlerType, TemplateHandlerType
+
+EXAMPLES_DIR = Path(__file__).resolve().parent.parent / "examples"
+
+
+def write_files(directory: Path, files: Dict[str, str]) -> None:
+    """在目录下写入测试用的数据或模板文件"""
+    for name, content in files.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def count_renders(generator: DataDrivenGenerator) -> List[str]:
+    """记录生成器每次实际渲染的模板, 返回记录列表"""
+    rendered: List[str] = []
+    handler = generator.template_handler
+    render_template = handler.render_template
+
+    def counting(template_path: str, *args: Any, **kwargs: Any) -> str:
+        rendered.append(template_path)
+        return render_template(template_path, *args, **kwargs)
+
+    handler.render_template = counting  # type: ignore[method-assign]
+    return rendered
+
+
+@pytest.fixture
+def tree_source(tmp_path: Path) -> Path:
+    """复制2_tree_render示例的数据与模板到临时目录, 测试可以在其中修改或添加文件"""
+    source = tmp_path / "source"
+    shutil.copytree(
+        EXAMPLES_DIR / "2_tree_render" / "source",
+        source,
+        ignore=shutil.ignore_patterns("output"),
+    )
+    return source
+
+
+@pytest.fixture
+def make_generator() -> Callable[..., DataDrivenGenerator]:
+    """返回以source目录下的data与template创建生成器的函数"""
+
+    def create(
+        source: Path,
+        template_config: Optional[Dict[str, Any]] = None,
+        **options: Any,
+    ) -> DataDrivenGenerator:
+        return DataDrivenGenerator(
+            DataDrivenGeneratorConfig(
+                DataHandlerType("yaml"),
+                {"root_path": str(source / "data"), "file_pattern": ["*.yaml"]},
+                TemplateHandlerType("jinja"),
+                {"template_dir": str(source / "template"), **(template_config or {})},
+                **options,
+            )
+        )
+
+    return create
@@ -0,0 +1,20 @@
+"""async_render: 异步环境的渲染结果必须与同步渲染一致"""
+
+import asyncio
+
+
+def test_async_render_matches_render(tree_source, make_generator):
+    expected = make_generator(tree_source).render("services/web.yaml")
+    actual = asyncio.run(make_generator(tree_source).async_render("services/web.yaml"))
+    assert actual == expected
+    assert "<name>Web Service</name>" in actual["web.yaml"]
+
+
+def test_async_render_evaluates_expressions(tree_source, make_generator):
+    (tree_source / "template" / "web.j2").write_text(
+        "{{ {'type': 'function', 'args': ['math:square', 4]} | expr_filter }}"
+        "|{{ {'type': 'xpath', 'args': ['port']} | expr_eval }}",
+        encoding="utf-8",
+    )
+    result = asyncio.run(make_generator(tree_source).async_render("services/web.yaml"))
+    assert result["web.yaml"] == "16|8080"
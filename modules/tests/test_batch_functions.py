@@ -0,0 +1,188 @@
+"""批量用户函数: 每组节点调用一次handler, 各节点得到与逐个计算相同的结果"""
+
+import gc
+from typing import Dict, List
+
+import pytest
+
+from modules.jinja.user_func.func_handler import BatchFunctionInfo, BatchScope
+from modules.jinja.user_func.resolver import BatchFunctionStore
+from modules.node.data_node import DataNode
+
+from .conftest import write_files
+
+_ITEM = "TEMPLATE_PATH: item.j2\nCHILDREN_PATH: []\nn: {}\n"
+
+DATA = {
+    "root.yaml": 'TEMPLATE_PATH: root.j2\nCHILDREN_PATH: ["a/*.yaml", "b/*.yaml"]\nn: 100\n',
+    "a/a1.yaml": _ITEM.format(1),
+    "a/a2.yaml": _ITEM.format(2),
+    "a/a3.yaml": _ITEM.format(3),
+    "b/b1.yaml": _ITEM.format(10),
+    "b/b2.yaml": _ITEM.format(20),
+}
+
+
+def _call(name: str) -> str:
+    return "{{ {'type': 'function', 'args': ['%s']} | expr_eval }}" % name
+
+
+TEMPLATES = {
+    "root.j2": "root=" + _call("t:share") + "," + _call("t:total")
+    + "\n{{ CHILDREN_CONTEXT0 }}\n{{ CHILDREN_CONTEXT1 }}",
+    "item.j2": "{{ n }}=" + _call("t:share") + "," + _call("t:total") + ";",
+}
+
+
+def _share(node: DataNode, group: List[DataNode]) -> str:
+    """逐个节点计算: 节点值在所属分组总和中的占比"""
+    return f"{node.data['n']}/{sum(member.data['n'] for member in group)}"
+
+
+class _Calls:
+    def __init__(self) -> None:
+        self.groups: Dict[str, List[List[int]]] = {"share": [], "total": []}
+
+    def share(self, nodes: List[DataNode]) -> List[str]:
+        self.groups["share"].append(sorted(node.data["n"] for node in nodes))
+        return [_share(node, nodes) for node in nodes]
+
+    def total(self, nodes: List[DataNode]) -> List[int]:
+        self.groups["total"].append(sorted(node.data["n"] for node in nodes))
+        total = sum(node.data["n"] for node in nodes)
+        return [total] * len(nodes)
+
+
+@pytest.fixture
+def source(tmp_path):
+    write_files(tmp_path / "data", DATA)
+    write_files(tmp_path / "template", TEMPLATES)
+    return tmp_path
+
+
+def _generator(source, make_generator, calls: _Calls):
+    generator = make_generator(source)
+    factory = generator.template_handler.resolver_factory
+    for info in (
+        BatchFunctionInfo("t:share", "share of the group", calls.share, BatchScope.SIBLINGS),
+        BatchFunctionInfo("t:total", "sum of the tree", calls.total, BatchScope.TREE),
+    ):
+        factory.batch_functions[info.name] = info
+    return generator
+
+
+def _lines(output: str) -> set:
+    return {part for line in output.split("\n") for part in line.split(";") if part}
+
+
+EXPECTED = {
+    "root=100/100,136",
+    "1=1/6,136", "2=2/6,136", "3=3/6,136",
+    "10=10/30,136", "20=20/30,136",
+}
+
+
+def test_batch_results_match_per_node_values(source, make_generator):
+    calls = _Calls()
+    generator = _generator(source, make_generator, calls)
+    assert _lines(generator.render("root.yaml")["root.yaml"]) == EXPECTED
+    # 根节点组与每个子节点组各调用一次, 整棵树调用一次
+    assert sorted(calls.groups["share"]) == [[1, 2, 3], [10, 20], [100]]
+    assert calls.groups["total"] == [[1, 2, 3, 10, 20, 100]]
+
+
+def test_functions_run_on_first_call(source, make_generator):
+    calls = _Calls()
+    generator = _generator(source, make_generator, calls)
+    # 没有模板调用批量函数时不执行handler
+    write_files(source / "template", {"root.j2": "{{ n }}", "item.j2": "{{ n }}"})
+    generator.render("root.yaml")
+    assert calls.groups == {"share": [], "total": []}
+
+
+def test_tree_rendered_again_is_recomputed(source, make_generator):
+    calls = _Calls()
+    generator = _generator(source, make_generator, calls)
+    assert _lines(generator.render("root.yaml")["root.yaml"]) == EXPECTED
+    assert _lines(generator.render("root.yaml")["root.yaml"]) == EXPECTED
+    # 每次渲染创建新的数据树, 重新分组计算
+    assert len(calls.groups["share"]) == 6
+    assert len(calls.groups["total"]) == 2
+
+    write_files(source / "data", {"b/b2.yaml": _ITEM.format(50)})
+    assert _lines(generator.render("root.yaml")["root.yaml"]) == {
+        "root=100/100,166",
+        "1=1/6,166", "2=2/6,166", "3=3/6,166",
+        "10=10/60,166", "50=50/60,166",
+    }
+
+
+def test_groups_and_results_released_with_tree(source, make_generator):
+    generator = _generator(source, make_generator, _Calls())
+    store = generator.template_handler.resolver_factory.batch_store
+    generator.render("root.yaml")
+    # 数据处理器保留最近一次构建的数据树, 重新渲染后上一棵树的分组与结果随之释放
+    generator.render("root.yaml")
+    gc.collect()
+    latest = len(DATA)
+    assert all(len(groups) == latest for groups in store._groups.values())
+    assert all(len(results) == latest for results in store._results.values())
+
+
+def _siblings(*values: int) -> List[DataNode]:
+    parent = DataNode(data={"n": 0}, name="parent")
+    for index, value in enumerate(values):
+        parent.add_child(DataNode(data={"n": value}, name=f"c{index}.yaml", parent=parent))
+    return parent.children  # type: ignore[return-value]
+
+
+def test_store_calls_handler_once_per_group():
+    calls = _Calls()
+    info = BatchFunctionInfo("t:share", "", calls.share, BatchScope.SIBLINGS)
+    store = BatchFunctionStore()
+    first, second = _siblings(1, 3), _siblings(5, 5, 10)
+    store.register(first, BatchScope.SIBLINGS)
+    store.register(second, BatchScope.SIBLINGS)
+    assert store.batches == 0
+
+    for group in (first, second, first, second):
+        assert [store.result(info, node) for node in group] == [
+            _share(node, group) for node in group
+        ]
+    assert store.batches == 2
+    assert sorted(calls.groups["share"]) == [[1, 3], [5, 5, 10]]
+
+
+def test_store_scopes_are_independent():
+    calls = _Calls()
+    share = BatchFunctionInfo("t:share", "", calls.share, BatchScope.SIBLINGS)
+    total = BatchFunctionInfo("t:total", "", calls.total, BatchScope.TREE)
+    store = BatchFunctionStore()
+    nodes = _siblings(1, 2)
+    store.register(nodes[:1], BatchScope.SIBLINGS)
+    store.register(nodes, BatchScope.TREE)
+    assert store.result(share, nodes[0]) == "1/1"
+    assert store.result(total, nodes[0]) == 3
+    # 未登记分组的节点单独计算
+    assert store.result(share, nodes[1]) == "2/2"
+
+
+def test_store_rejects_wrong_result_count():
+    info = BatchFunctionInfo("t:bad", "", lambda nodes: [], BatchScope.SIBLINGS)
+    store = BatchFunctionStore()
+    nodes = _siblings(1)
+    store.register(nodes, BatchScope.SIBLINGS)
+    with pytest.raises(ValueError):
+        store.result(info, nodes[0])
+
+
+def test_store_releases_groups_with_nodes():
+    store = BatchFunctionStore()
+    info = BatchFunctionInfo("t:total", "", _Calls().total, BatchScope.TREE)
+    nodes = _siblings(1, 2)
+    store.register(nodes, BatchScope.TREE)
+    assert store.result(info, nodes[1]) == 3
+    del nodes
+    gc.collect()
+    assert len(store._groups[BatchScope.TREE]) == 0
+    assert len(store._results["t:total"]) == 0
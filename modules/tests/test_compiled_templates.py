@@ -0,0 +1,40 @@
+"""compiled_templates: 预编译的模板与从源码加载的模板渲染结果一致"""
+
+import pytest
+
+
+@pytest.mark.parametrize("target", ["templates.zip", "templates"])
+def test_compiled_templates_render_like_source(tree_source, make_generator, tmp_path, target):
+    (tree_source / "template" / "web.j2").write_text(
+        "{{ {'type': 'function', 'args': ['math:square', 4]} | expr_filter }}"
+        "|{{ {'type': 'xpath', 'args': ['port']} | expr_eval }}\n"
+        "{{ CHILDREN_CONTEXT0 }}",
+        encoding="utf-8",
+    )
+    expected = make_generator(tree_source).render("services/web.yaml")
+    assert expected["web.yaml"].startswith("16|8080\n")
+
+    compiled = tmp_path / target
+    report = make_generator(tree_source).template_handler.compile_templates(str(compiled))
+    assert "web.j2" in report.compiled
+
+    generator = make_generator(
+        tree_source, {"compiled_templates": str(compiled)}
+    )
+    assert generator.render("services/web.yaml") == expected
+
+
+def test_non_template_files_are_skipped(tree_source, make_generator, tmp_path):
+    template_dir = tree_source / "template"
+    (template_dir / "README.md").write_text("Use {{ name }} and {% missing %}", encoding="utf-8")
+    (template_dir / "values.yaml").write_text("key: {{ value", encoding="utf-8")
+
+    compiled = tmp_path / "templates.zip"
+    report = make_generator(tree_source).template_handler.compile_templates(str(compiled))
+    assert sorted(report.skipped) == ["README.md", "values.yaml"]
+    assert "web.j2" in report.compiled
+
+    generator = make_generator(tree_source, {"compiled_templates": str(compiled)})
+    assert generator.render("services/web.yaml") == make_generator(tree_source).render(
+        "services/web.yaml"
+    )
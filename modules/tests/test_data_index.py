@@ -0,0 +1,106 @@
+"""DataPathIndex: XPath解析与按树结构逐级查找的结果一致"""
+
+from typing import List
+
+import pytest
+
+from modules.node.data_index import invalidate_index, resolve_xpath
+from modules.node.data_node import DataNode
+from modules.yaml.yaml_handler import YamlDataTreeHandler
+
+from .conftest import EXAMPLES_DIR
+
+
+@pytest.fixture
+def handler() -> YamlDataTreeHandler:
+    return YamlDataTreeHandler(
+        {
+            "root_path": str(EXAMPLES_DIR / "2_tree_render" / "source" / "data"),
+            "file_pattern": ["*.yaml"],
+        }
+    )
+
+
+@pytest.fixture
+def root(handler) -> DataNode:
+    (tree,) = handler.create_data_tree("root.yaml")
+    return tree
+
+
+def _node(root: DataNode, *names: str) -> DataNode:
+    node = root
+    for name in names:
+        node = next(child for child in node.children if child.name == name)
+    return node
+
+
+def _ancestors(node: DataNode) -> List[DataNode]:
+    chain = [node]
+    while isinstance(chain[-1].parent, DataNode):
+        chain.append(chain[-1].parent)
+    return chain
+
+
+def _relative_path(source: DataNode, target: DataNode) -> str:
+    """逐级走到公共祖先再向下, 得到从source到target的相对路径"""
+    source_chain, target_chain = _ancestors(source), _ancestors(target)
+    common = next(node for node in source_chain if node in target_chain)
+    up = [".."] * source_chain.index(common)
+    down = [node.name for node in reversed(target_chain[: target_chain.index(common)])]
+    return "/".join(up + down) or "."
+
+
+def test_relative_paths_match_manual_walk(root):
+    nodes = list(root.iter_data_nodes())
+    assert len(nodes) == 5
+    for source in nodes:
+        for target in nodes:
+            assert resolve_xpath(source, [_relative_path(source, target)]) is target.data
+
+
+def test_parent_and_absolute_paths(root):
+    api = _node(root, "web.yaml", "api.yaml")
+    assert resolve_xpath(api, ["../port"]) == 8080
+    assert resolve_xpath(api, ["../../database.yaml/port"]) == 5432
+    assert resolve_xpath(api, ["/web.yaml/child1.yaml/type"]) == "service"
+    assert resolve_xpath(api, ["/version"]) == "2.0"
+    # 各部分分开传入与以/连接相同
+    assert resolve_xpath(api, ["..", "..", "database.yaml", "type"]) == "postgresql"
+    assert resolve_xpath(api, ["methods/1"]) == "POST"
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["missing", "../missing.yaml/name", "/web.yaml/missing", "methods/9", "../../.."],
+)
+def test_missing_segments_raise(root, path):
+    api = _node(root, "web.yaml", "api.yaml")
+    with pytest.raises(ValueError):
+        resolve_xpath(api, [path])
+
+
+def test_lookup_after_invalidate_sees_modified_tree(root):
+    web = _node(root, "web.yaml")
+    api = _node(web, "api.yaml")
+    child = _node(web, "child1.yaml")
+    assert resolve_xpath(api, ["../child1.yaml/type"]) == "service"
+
+    extra = DataNode(data={"name": "Extra"}, name="extra.yaml", parent=web)
+    web.add_child(extra)
+    web.children.remove(child)
+    invalidate_index(web)
+
+    assert resolve_xpath(api, ["../extra.yaml/name"]) == "Extra"
+    assert resolve_xpath(api, ["/web.yaml/extra.yaml/name"]) == "Extra"
+    assert resolve_xpath(extra, ["../../database.yaml/port"]) == 5432
+    with pytest.raises(ValueError):
+        resolve_xpath(api, ["../child1.yaml/type"])
+
+
+def test_rebuilt_tree_has_own_index(handler, root):
+    (rebuilt,) = handler.create_data_tree("root.yaml")
+    assert rebuilt is not root
+    assert rebuilt.path_index is not root.path_index
+    api = _node(rebuilt, "web.yaml", "api.yaml")
+    assert resolve_xpath(api, ["../../database.yaml/name"]) == "Database Service"
+    assert rebuilt.path_index.path_of(_node(root, "web.yaml")) is None
@@ -0,0 +1,104 @@
+"""ExprBatchEvaluator: NumPy数组运算的结果与逐个节点使用ExpressionOperator计算的结果一致"""
+
+from typing import Any, List
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from modules.node.data_node import DataNode
+from modules.node.expr_batch import ExprBatchEvaluator
+from modules.node.expr_compiler import ExprCompiler
+from modules.node.expr_node import ExpressionOperator
+
+_FAILED = object()
+
+
+def _nodes(column_a: List[Any], column_b: List[Any]) -> List[DataNode]:
+    parent = DataNode(data={}, name="parent")
+    nodes = []
+    for index, (a, b) in enumerate(zip(column_a, column_b)):
+        node = DataNode(data={"a": a, "b": b}, name=f"n{index}.yaml", parent=parent)
+        parent.add_child(node)
+        nodes.append(node)
+    return nodes
+
+
+def _expression(operator: str) -> dict:
+    return {
+        "type": "expression",
+        "args": [operator, {"type": "xpath", "args": ["a"]}, {"type": "xpath", "args": ["b"]}],
+    }
+
+
+def _per_node(operator: str, node: DataNode) -> Any:
+    values = (node.data["a"], node.data["b"])
+    try:
+        return ExpressionOperator(operator).apply([lambda v=v: v for v in values])
+    except Exception:
+        return _FAILED
+
+
+def _check(operator: str, column_a: List[Any], column_b: List[Any]) -> List[Any]:
+    nodes = _nodes(column_a, column_b)
+    compiled = ExprCompiler().compile(_expression(operator))
+    batch = ExprBatchEvaluator(use_numpy=True).evaluate(compiled, nodes)
+    expected = [_per_node(operator, node) for node in nodes]
+    if any(value is _FAILED for value in expected):
+        # 有节点求值失败时不返回批量结果, 由调用者逐个求值得到准确的错误
+        assert batch is None
+        return expected
+    assert batch == expected
+    # 类型也需一致（如int与float渲染结果不同）
+    assert [type(value) for value in batch] == [type(value) for value in expected]
+    return batch
+
+
+@pytest.mark.parametrize("operator", ["+", "-", "*"])
+def test_int_overflow(operator):
+    big = 3 * 10**18
+    result = _check(operator, [big, 1, -big], [big * 2, 2, big * 3])
+    assert all(type(value) is int for value in result)
+
+
+def test_int_beyond_int64():
+    _check("+", [2**63, 1], [1, 2])
+
+
+@pytest.mark.parametrize("operator", ["/", "%"])
+def test_division_by_zero(operator):
+    expected = _check(operator, [1, 2, 3], [1, 0, 3])
+    assert expected[1] is _FAILED
+    _check(operator, [1.5, 2.0], [0.5, 0.0])
+
+
+@pytest.mark.parametrize("operator", ["/", "%"])
+def test_division_without_zero(operator):
+    _check(operator, [7, -7, 9], [2, 2, -4])
+
+
+@pytest.mark.parametrize("operator", ["+", "-", "*", "/", "%", "==", "<", "&&"])
+def test_mixed_int_and_float(operator):
+    # 同一列中混合
+    _check(operator, [1, 2.5, 3, 0], [2, 2, 0.5, 1.0])
+    # 整数列与浮点数列
+    _check(operator, [1, 2, 3, 0], [0.5, 2.0, 4.0, 1.5])
+
+
+@pytest.mark.parametrize("operator", ["+", "-", "*", "==", "!=", "<", ">=", "&&", "||"])
+def test_bool_operands(operator):
+    _check(operator, [True, False, True, False], [True, True, 2, 0])
+
+
+def test_numeric_columns_use_numpy(monkeypatch):
+    results = []
+    apply_numpy = ExprBatchEvaluator._apply_numpy
+
+    def spy(self, operator, operands):
+        result = apply_numpy(self, operator, operands)
+        results.append(result)
+        return result
+
+    monkeypatch.setattr(ExprBatchEvaluator, "_apply_numpy", spy)
+    assert _check("*", [1, 2, 3], [4, 5, 6]) == [4, 10, 18]
+    assert isinstance(results[0], np.ndarray)
@@ -0,0 +1,75 @@
+"""表达式公共子树合并: 只合并纯函数调用, 非纯函数每次出现都调用"""
+
+from typing import Callable, Dict, Optional
+
+from modules.jinja.user_func.func_handler import UserFunctionInfo
+from modules.node.data_node import DataNode
+from modules.node.expr_compiler import ExprCompiler
+
+
+class _Resolver:
+    """只提供编译后的表达式使用的接口"""
+
+    def __init__(self, handlers: Dict[str, Callable], node: Optional[DataNode] = None):
+        self.handlers = handlers
+        self.node = node
+
+    def get_handler(self, name: str, argc: int) -> Optional[Callable]:
+        return self.handlers.get(name)
+
+    def is_lazy(self, name: str) -> bool:
+        return False
+
+
+def _counter() -> Callable[[], int]:
+    calls = []
+
+    def tick() -> int:
+        calls.append(None)
+        return len(calls)
+
+    return tick
+
+
+def _call(name: str, *args) -> dict:
+    return {"type": "function", "args": [name, *args]}
+
+
+def _plus(*operands) -> dict:
+    return {"type": "expression", "args": ["+", *operands]}
+
+
+def test_impure_calls_are_not_shared():
+    compiled = ExprCompiler().compile(_plus(_call("c:tick"), _call("c:tick")))
+    assert compiled(_Resolver({"c:tick": _counter()})) == "(1+2)"
+
+
+def test_pure_call_with_impure_argument_is_not_shared():
+    calls = []
+
+    def double(value: int) -> int:
+        calls.append(value)
+        return value * 2
+
+    pure = {"p:double": UserFunctionInfo("p:double", (1, 1), "", double, pure=True)}
+    expr = _plus(_call("p:double", _call("c:tick")), _call("p:double", _call("c:tick")))
+    compiled = ExprCompiler(pure_functions=pure).compile(expr)
+    resolver = _Resolver({"c:tick": _counter(), "p:double": double})
+    assert compiled.evaluate_value(resolver) == 6
+    assert calls == [1, 2]
+
+
+def test_pure_calls_are_shared():
+    calls = []
+
+    def double(value: int) -> int:
+        calls.append(value)
+        return value * 2
+
+    pure = {"p:double": UserFunctionInfo("p:double", (1, 1), "", double, pure=True)}
+    port = {"type": "xpath", "args": ["port"]}
+    expr = _plus(_call("p:double", port), _call("p:double", port))
+    compiled = ExprCompiler(pure_functions=pure).compile(expr)
+    node = DataNode(data={"port": 8080}, name="web.yaml")
+    assert compiled.evaluate_value(_Resolver({"p:double": double}, node)) == 32320
+    assert calls == [8080]
@@ -0,0 +1,62 @@
+"""{% cache %}片段缓存: 块内容或其引用的模板修改后旧的片段失效"""
+
+import pytest
+
+TEMPLATE = (
+    '{% cache "fragment" %}'
+    '{% include "part.j2" %}'
+    '{% from "macros.j2" import show %}{{ show() }}'
+    "{% endcache %}"
+)
+
+
+@pytest.fixture
+def cache_source(tree_source):
+    template_dir = tree_source / "template"
+    (template_dir / "web.j2").write_text(TEMPLATE, encoding="utf-8")
+    (template_dir / "part.j2").write_text('part-{% include "inner.j2" %}|', encoding="utf-8")
+    (template_dir / "inner.j2").write_text("inner1", encoding="utf-8")
+    (template_dir / "macros.j2").write_text(
+        "{% macro show() %}macro1{% endmacro %}", encoding="utf-8"
+    )
+    return tree_source
+
+
+@pytest.fixture
+def render(cache_source, make_generator, tmp_path):
+    config = {
+        "fragment_cache_dir": str(tmp_path / "fragments"),
+        "bytecode_cache_dir": str(tmp_path / "bytecode"),
+    }
+
+    def run():
+        generator = make_generator(cache_source, config)
+        result = generator.render("services/web.yaml")["web.yaml"]
+        return result, generator.template_handler.fragment_cache.stats
+
+    return run
+
+
+def test_unchanged_fragment_is_read_from_disk(render):
+    assert render()[0] == "part-inner1|macro1"
+    result, stats = render()
+    assert result == "part-inner1|macro1"
+    assert stats.disk_hits == 1 and stats.misses == 0
+
+
+@pytest.mark.parametrize(
+    "name, source, expected",
+    [
+        ("part.j2", 'part2-{% include "inner.j2" %}|', "part2-inner1|macro1"),
+        ("inner.j2", "inner2", "part-inner2|macro1"),
+        ("macros.j2", "{% macro show() %}macro2{% endmacro %}", "part-inner1|macro2"),
+    ],
+)
+def test_referenced_template_change_invalidates_fragment(
+    cache_source, render, name, source, expected
+):
+    render()
+    (cache_source / "template" / name).write_text(source, encoding="utf-8")
+    result, stats = render()
+    assert result == expected
+    assert stats.misses == 1
@@ -0,0 +1,42 @@
+"""function_stats: 插件函数的调用统计按插件分组并输出合计行"""
+
+from modules.jinja.user_func.func_handler import FunctionProfiler, UserFunctionInfo
+
+
+def _info(name: str, plugin: str) -> UserFunctionInfo:
+    return UserFunctionInfo(name, (0, 0), "", lambda: None, plugin=plugin)
+
+
+def test_table_has_plugin_subtotals():
+    profiler = FunctionProfiler()
+    square, total = _info("math:square", "math"), _info("math:sum", "math")
+    count = _info("data:count", "data")
+    profiler.record(square, 0.002)
+    profiler.record(square, 0.001)
+    profiler.record(total, 0.004)
+    profiler.record(count, 0.001, failed=True)
+
+    rows = [line.split() for line in profiler.format_table().splitlines()[2:]]
+    assert [row[:4] for row in rows] == [
+        ["math:sum", "math", "1", "0"],
+        ["math:square", "math", "2", "0"],
+        ["(subtotal)", "math", "3", "0"],
+        ["data:count", "data", "1", "1"],
+        ["(subtotal)", "data", "1", "1"],
+    ]
+    assert rows[2][4] == "7.000"
+
+
+def test_render_reports_subtotals(tree_source, make_generator):
+    (tree_source / "template" / "web.j2").write_text(
+        "{{ {'type': 'function', 'args': ['math:square', "
+        "{'type': 'xpath', 'args': ['port']}]} | expr_eval }}"
+        "|{{ {'type': 'function', 'args': ['data:count', 'type', 'http']} | expr_eval }}",
+        encoding="utf-8",
+    )
+    generator = make_generator(tree_source, {"function_stats": "table"})
+    assert generator.render("services/web.yaml")["web.yaml"] == "65286400|1"
+
+    table = generator.template_handler.show_cache_info()
+    subtotals = [line.split()[1] for line in table.splitlines() if line.startswith("(subtotal)")]
+    assert sorted(subtotals) == ["DataIndexPlugin", "MathUtilsPlugin"]
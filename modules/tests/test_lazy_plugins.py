@@ -0,0 +1,31 @@
+"""lazy_plugins: 插件清单中的模块在首次使用其命名空间中的函数时才导入"""
+
+import asyncio
+
+
+def _template(source) -> None:
+    (source / "template" / "web.j2").write_text(
+        "{{ {'type': 'function', 'args': ['math:square', "
+        "{'type': 'xpath', 'args': ['port']}]} | expr_eval }}",
+        encoding="utf-8",
+    )
+
+
+def test_namespaces_load_on_first_use(tree_source, make_generator):
+    _template(tree_source)
+    generator = make_generator(tree_source, {"lazy_plugins": True})
+    factory = generator.template_handler.resolver_factory
+    assert set(factory.pending_namespaces) == {"math", "data"}
+    assert "math:square" not in factory.static_functions
+
+    assert generator.render("services/web.yaml")["web.yaml"] == "65286400"
+    assert set(factory.pending_namespaces) == {"data"}
+    assert "math:square" in factory.static_functions
+
+
+def test_lazy_plugins_render_like_eager(tree_source, make_generator):
+    _template(tree_source)
+    eager = make_generator(tree_source).render("services/web.yaml")
+    assert make_generator(tree_source, {"lazy_plugins": True}).render("services/web.yaml") == eager
+    lazy_async = make_generator(tree_source, {"lazy_plugins": True}).async_render
+    assert asyncio.run(lazy_async("services/web.yaml")) == eager
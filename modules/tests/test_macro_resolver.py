@@ -0,0 +1,32 @@
+"""不带上下文导入的宏中也可以使用expr_filter与expr_eval"""
+
+import asyncio
+
+import pytest
+
+MACROS = (
+    "{% macro show(expr) %}[{{ expr | expr_filter }}]{% endmacro %}"
+    "{% macro value(expr) %}[{{ expr | expr_eval }}]{% endmacro %}"
+)
+TEMPLATE = (
+    '{% import "macros.j2" as m %}'
+    "{{ m.show({'type': 'function', 'args': ['math:square', 3]}) }}"
+    "{{ m.value({'type': 'xpath', 'args': ['port']}) }}"
+)
+
+
+@pytest.fixture
+def macro_source(tree_source):
+    (tree_source / "template" / "macros.j2").write_text(MACROS, encoding="utf-8")
+    (tree_source / "template" / "web.j2").write_text(TEMPLATE, encoding="utf-8")
+    return tree_source
+
+
+def test_imported_macro_uses_node_resolver(macro_source, make_generator):
+    result = make_generator(macro_source).render("services/web.yaml")
+    assert result["web.yaml"] == "[9][8080]"
+
+
+def test_imported_macro_uses_node_resolver_async(macro_source, make_generator):
+    result = asyncio.run(make_generator(macro_source).async_render("services/web.yaml"))
+    assert result["web.yaml"] == "[9][8080]"
@@ -0,0 +1,54 @@
+"""render_many: 每个模式的结果与单独调用render相同, 与同批的其他模式无关"""
+
+import pytest
+
+from .conftest import write_files
+
+PATTERNS = ["root.yaml", "sub/child.yaml"]
+
+
+@pytest.fixture
+def overlap_source(tree_source):
+    # child.yaml既是root.yaml的子节点, 也被第二个模式直接匹配
+    write_files(
+        tree_source / "data",
+        {
+            "root.yaml": (
+                'TEMPLATE_PATH: "root.j2"\nCHILDREN_PATH: ["sub/child.yaml"]\n'
+                "title: root\nkind: item\n"
+            ),
+            "sub/child.yaml": 'TEMPLATE_PATH: "child.j2"\nCHILDREN_PATH: []\ntitle: child\nkind: item\n',
+        },
+    )
+    write_files(
+        tree_source / "template",
+        {
+            "root.j2": "{{ title }}[{{ CHILDREN_CONTEXT0 }}]",
+            "child.j2": (
+                "{{ {'type': 'function', 'args': ['data:count', 'kind', 'item']} | expr_eval }}"
+                "/{{ {'type': 'xpath', 'args': ['/title']} | expr_eval }}"
+            ),
+        },
+    )
+    return tree_source
+
+
+@pytest.mark.parametrize("dedupe_renders", [False, True])
+@pytest.mark.parametrize("patterns", [PATTERNS, PATTERNS[::-1]])
+def test_render_many_matches_render(overlap_source, make_generator, patterns, dedupe_renders):
+    generator = make_generator(overlap_source, dedupe_renders=dedupe_renders)
+    results = generator.render_many(patterns)
+    for pattern in patterns:
+        assert results[pattern] == generator.render(pattern)
+    assert results["root.yaml"] == {"root.yaml": "root[2/root]"}
+    assert results["sub/child.yaml"] == {"child.yaml": "1/child"}
+
+
+def test_trees_share_parsed_data(overlap_source, make_generator):
+    handler = make_generator(overlap_source).data_handler
+    trees = handler.create_data_trees(PATTERNS)
+    (root,) = trees["root.yaml"]
+    (child,) = trees["sub/child.yaml"]
+    assert child.parent is None
+    assert root.children[0] is not child
+    assert root.children[0].data is child.data
@@ -0,0 +1,60 @@
+"""splice_output: 占位符拼接的结果必须与直接拼接子节点文本一致
+
+以services/web.yaml为根渲染, 其每个子节点组只有一个子节点, 输出顺序固定。
+"""
+
+from pathlib import Path
+
+import pytest
+
+
+def _render(make_generator, source: Path, **options) -> str:
+    return make_generator(source, **options).render("services/web.yaml")["web.yaml"]
+
+
+def test_splice_matches_string_mode(tree_source, make_generator):
+    assert _render(make_generator, tree_source, splice_output=True) == _render(
+        make_generator, tree_source
+    )
+
+
+def test_filtered_children_fall_back_to_text(tree_source, make_generator):
+    (tree_source / "template" / "web.j2").write_text(
+        "<endpoints>\n  {{ CHILDREN_CONTEXT0 | indent(2) }}\n</endpoints>\n"
+        "{% if CHILDREN_CONTEXT1 %}{{ CHILDREN_CONTEXT1 | length > 0 }}{% endif %}",
+        encoding="utf-8",
+    )
+    expected = _render(make_generator, tree_source)
+    assert "    <name>REST API</name>" in expected
+    assert expected.endswith("True")
+    assert _render(make_generator, tree_source, splice_output=True) == expected
+
+
+def test_children_plain_analysis(tree_source, make_generator):
+    (tree_source / "template" / "test.j2").write_text(
+        "{% if CHILDREN_CONTEXT1 %}{{ CHILDREN_CONTEXT0 }}{% endif %}", encoding="utf-8"
+    )
+    handler = make_generator(tree_source).template_handler
+    assert handler.analyze_template("web.j2").children_plain
+    assert not handler.analyze_template("test.j2").children_plain
+
+
+@pytest.mark.parametrize(
+    "template",
+    [
+        "[{% filter upper %}{{ CHILDREN_CONTEXT0 }}{% endfilter %}]",
+        "{% set x %}{{ CHILDREN_CONTEXT0 }}{% endset %}[{{ x | length }}]",
+        "{% macro m() %}{{ CHILDREN_CONTEXT0 }}{% endmacro %}[{{ m() | length }}]",
+        "{% macro w() %}[{{ caller() | length }}]{% endmacro %}"
+        "{% call w() %}{{ CHILDREN_CONTEXT0 }}{% endcall %}",
+        "{% autoescape true %}{{ CHILDREN_CONTEXT0 }}{% endautoescape %}",
+    ],
+    ids=["filter-block", "set-block", "macro", "call-block", "autoescape"],
+)
+def test_captured_children_fall_back_to_text(tree_source, make_generator, template):
+    (tree_source / "template" / "web.j2").write_text(template, encoding="utf-8")
+    handler = make_generator(tree_source).template_handler
+    assert not handler.analyze_template("web.j2").children_plain
+
+    expected = _render(make_generator, tree_source)
+    assert _render(make_generator, tree_source, splice_output=True) == expected
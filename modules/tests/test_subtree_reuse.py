@@ -0,0 +1,53 @@
+"""dedupe_renders: 内容指纹相同的子树只在结果不依赖其位置时复用"""
+
+from .conftest import count_renders, write_files
+
+LEAF = 'TEMPLATE_PATH: "leaf.j2"\nCHILDREN_PATH: ["sub/*.yaml"]\nname: leaf\n'
+SUB = 'TEMPLATE_PATH: "sub.j2"\nCHILDREN_PATH: []\nvalue: 1\n'
+
+
+def _tree(source, leaf_template: str, sub_template: str = "{{ value }}") -> None:
+    write_files(
+        source / "data",
+        {
+            "root.yaml": 'TEMPLATE_PATH: "root.j2"\nCHILDREN_PATH: ["p1/p1.yaml", "p2/p2.yaml"]\n',
+            "p1/p1.yaml": 'TEMPLATE_PATH: "p.j2"\nCHILDREN_PATH: ["leaf.yaml"]\ntitle: p1\n',
+            "p2/p2.yaml": 'TEMPLATE_PATH: "p.j2"\nCHILDREN_PATH: ["leaf.yaml"]\ntitle: p2\n',
+            "p1/leaf.yaml": LEAF,
+            "p2/leaf.yaml": LEAF,
+            "p1/sub/x.yaml": SUB,
+            "p2/sub/x.yaml": SUB,
+        },
+    )
+    write_files(
+        source / "template",
+        {
+            "root.j2": "{{ CHILDREN_CONTEXT0 }}|{{ CHILDREN_CONTEXT1 }}",
+            "p.j2": "{{ title }}:{{ CHILDREN_CONTEXT0 }}",
+            "leaf.j2": leaf_template,
+            "sub.j2": sub_template,
+        },
+    )
+
+
+def test_identical_subtrees_are_rendered_once(tree_source, make_generator):
+    _tree(tree_source, "{{ name }}({{ CHILDREN_CONTEXT0 }})")
+    generator = make_generator(tree_source, dedupe_renders=True)
+    rendered = count_renders(generator)
+
+    assert generator.render("root.yaml")["root.yaml"] == "p1:leaf(1)|p2:leaf(1)"
+    assert rendered.count("leaf.j2") == 1
+    # 第二棵相同子树整体复用, 其子节点不再处理
+    assert [node.name for node in generator._rendered_contents].count("x.yaml") == 1
+
+
+def test_subtree_reading_outside_is_not_reused(tree_source, make_generator):
+    # leaf.j2本身分析完整, 但子树中的sub.j2读取子树以外的数据
+    _tree(
+        tree_source,
+        "{{ name }}({{ CHILDREN_CONTEXT0 }})",
+        "{{ {'type': 'xpath', 'args': ['../../title']} | expr_eval }}",
+    )
+    expected = make_generator(tree_source).render("root.yaml")
+    assert expected["root.yaml"] == "p1:leaf(p1)|p2:leaf(p2)"
+    assert make_generator(tree_source, dedupe_renders=True).render("root.yaml") == expected
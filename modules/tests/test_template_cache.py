@@ -0,0 +1,67 @@
+"""CountingLRUCache / CountingBytecodeCache: 多线程并发使用时统计保持准确"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from jinja2.bccache import Bucket
+
+from modules.jinja.template_cache import (
+    BytecodeCacheStats,
+    CountingBytecodeCache,
+    CountingLRUCache,
+    TemplateCacheStats,
+)
+
+THREADS = 8
+ROUNDS = 300
+
+
+class _SlowTemplateStats(TemplateCacheStats):
+    """写入计数前让出GIL, 使未加锁的"读取-加一-写回"必然交错"""
+
+    def __setattr__(self, name, value):
+        time.sleep(0)
+        super().__setattr__(name, value)
+
+
+class _SlowBytecodeStats(BytecodeCacheStats):
+    def __setattr__(self, name, value):
+        time.sleep(0)
+        super().__setattr__(name, value)
+
+
+def test_lru_counts_are_exact_under_concurrency():
+    cache = CountingLRUCache(4, auto_reload=True)
+    cache.stats = _SlowTemplateStats()
+
+    def work(worker: int) -> None:
+        for index in range(ROUNDS):
+            key = (worker + index) % 8
+            if cache.get(key) is None:
+                cache[key] = object()
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(work, range(THREADS)))
+
+    stats = cache.stats
+    assert stats.hits + stats.misses + stats.reloads == THREADS * ROUNDS
+    assert stats.reload_checks == stats.hits + stats.reloads
+    # 每次未命中后写入一次, 写入要么填充空位, 要么淘汰一个模板, 要么替换已有模板
+    assert stats.misses == stats.evictions + len(cache) + stats.reloads
+
+
+def test_bytecode_counts_are_exact_under_concurrency(tmp_path):
+    cache = CountingBytecodeCache(str(tmp_path))
+    cache.stats = _SlowBytecodeStats()
+
+    def work(worker: int) -> None:
+        for index in range(ROUNDS):
+            bucket = Bucket(None, f"{worker}-{index}", "checksum")
+            cache.load_bytecode(bucket)
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(work, range(THREADS)))
+
+    # 缓存目录为空, 每次加载都需要编译
+    assert cache.stats.compiles == THREADS * ROUNDS
+    assert cache.stats.hits == 0
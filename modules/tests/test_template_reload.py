@@ -0,0 +1,45 @@
+"""模板分析缓存: 同一生成器中修改模板后, 下一次渲染使用新的分析结果"""
+
+import os
+
+import pytest
+
+
+def _edit(path, content: str) -> None:
+    path.write_text(content, encoding="utf-8")
+    # 保证修改时间与上一次不同, 加载器据此判断模板已更新
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("splice_output", [False, True])
+def test_added_children_slot_is_rendered(tree_source, make_generator, splice_output):
+    web = tree_source / "template" / "web.j2"
+    _edit(web, "<web/>")
+    generator = make_generator(tree_source, splice_output=splice_output)
+    assert generator.render("services/web.yaml")["web.yaml"] == "<web/>"
+
+    _edit(web, "<web>{{ CHILDREN_CONTEXT0 }}</web>")
+    assert "<name>REST API</name>" in generator.render("services/web.yaml")["web.yaml"]
+
+
+def test_filtered_slot_falls_back_after_edit(tree_source, make_generator):
+    web = tree_source / "template" / "web.j2"
+    generator = make_generator(tree_source, splice_output=True)
+    generator.render("services/web.yaml")
+
+    _edit(web, "{{ CHILDREN_CONTEXT0 | upper }}")
+    result = generator.render("services/web.yaml")["web.yaml"]
+    assert "<NAME>REST API</NAME>" in result
+    assert "\x00" not in result
+
+
+def test_included_template_edit_is_detected(tree_source, make_generator):
+    template_dir = tree_source / "template"
+    _edit(template_dir / "part.j2", "")
+    _edit(template_dir / "web.j2", '<web>{% include "part.j2" %}</web>')
+    generator = make_generator(tree_source)
+    assert generator.render("services/web.yaml")["web.yaml"] == "<web></web>"
+
+    _edit(template_dir / "part.j2", "{{ CHILDREN_CONTEXT0 }}")
+    assert "<name>REST API</name>" in generator.render("services/web.yaml")["web.yaml"]
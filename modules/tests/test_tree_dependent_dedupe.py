@@ -0,0 +1,57 @@
+"""dedupe_renders: 读取子树以外数据的节点不复用其他位置的渲染结果"""
+
+from .conftest import count_renders, write_files
+
+COUNT = "{{ {'type': 'function', 'args': ['data:count', 'kind', 'item']} | expr_eval }}"
+PARENT_TITLE = "{{ {'type': 'xpath', 'args': ['../title']} | expr_eval }}"
+OWN_PORT = "{{ {'type': 'xpath', 'args': ['port']} | expr_eval }}"
+
+
+def _tree(source, leaf_template: str) -> None:
+    write_files(
+        source / "data",
+        {
+            "a.yaml": 'TEMPLATE_PATH: "parent.j2"\nCHILDREN_PATH: ["common.yaml"]\ntitle: A\n',
+            "b.yaml": (
+                'TEMPLATE_PATH: "parent.j2"\n'
+                'CHILDREN_PATH: ["common.yaml", "extra.yaml"]\ntitle: B\n'
+            ),
+            "common.yaml": 'TEMPLATE_PATH: "leaf.j2"\nCHILDREN_PATH: []\nkind: item\nport: 1\n',
+            "extra.yaml": 'TEMPLATE_PATH: "extra.j2"\nCHILDREN_PATH: []\nkind: item\n',
+        },
+    )
+    write_files(
+        source / "template",
+        {
+            "parent.j2": "{{ title }}:{{ CHILDREN_CONTEXT0 }}",
+            "leaf.j2": leaf_template,
+            "extra.j2": "extra",
+        },
+    )
+
+
+def _render(make_generator, source):
+    generator = make_generator(source, dedupe_renders=True)
+    rendered = count_renders(generator)
+    results = generator.render_many(["a.yaml", "b.yaml"])
+    return results["a.yaml"]["a.yaml"], results["b.yaml"]["b.yaml"], rendered
+
+
+def test_tree_function_is_evaluated_per_tree(tree_source, make_generator):
+    _tree(tree_source, COUNT)
+    a, b, rendered = _render(make_generator, tree_source)
+    assert (a, b) == ("A:1", "B:2")
+    assert rendered.count("leaf.j2") == 2
+
+
+def test_parent_xpath_is_evaluated_per_parent(tree_source, make_generator):
+    _tree(tree_source, PARENT_TITLE)
+    a, b, _ = _render(make_generator, tree_source)
+    assert (a, b) == ("A:A", "B:B")
+
+
+def test_local_expressions_are_still_deduplicated(tree_source, make_generator):
+    _tree(tree_source, OWN_PORT)
+    a, b, rendered = _render(make_generator, tree_source)
+    assert (a, b) == ("A:1", "B:1")
+    assert rendered.count("leaf.j2") == 1
@@ -1,7 +1,7 @@
-"""
-YAML Package - Contains YAML data handling and processing implementations
-"""
-
-from .yaml_handler import YamlDataTreeHandler, YamlConfig
-from .errors import YamlError, YamlConfigError, YamlPathError, YamlLoadError, YamlStructureError
-from ..node.data_node import DataNode
+"""
+YAML Package - Contains YAML data handling and processing implementations
+"""
+
+from .yaml_handler import YamlDataTreeHandler, YamlConfig
+from .errors import YamlError, YamlConfigError, YamlPathError, YamlLoadError, YamlStructureError
+from ..node.data_node import DataNode